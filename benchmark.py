@@ -0,0 +1,408 @@
+# coding: utf-8
+"""
+BENCHMARK:
+
+    Used for timing the parsers on saved data.
+
+    Usage:
+        python benchmark.py pages [FIXTURE_DIR] [LANGUAGE]
+        python benchmark.py pipeline [FIXTURE_DIR]
+        python benchmark.py homophones [LANGUAGE] [SIZE]
+        python benchmark.py ordered_set [SIZE]
+        python benchmark.py affixes [LANGUAGE] [QUERIES]
+
+    Fixture pages are .html (or gzipped .html.gz) Wiktionary pages,
+    by default those in resources/fixtures/pages.  To time a crawled
+    corpus instead, pass WiktionaryParser.CACHE_PATH.  Each page's
+    sections & entries are compared between the single-pass and
+    soupified parsers, for all languages and for LANGUAGE alone
+    (by default Finnish).
+
+    Homophone searches run over LANGUAGE's stored pronunciations
+    (by default English), padded with made-up variants of them
+    up to SIZE pronunciations (by default 100,000).
+
+    OrderedSets are timed against the previous implementation,
+    kept here as LegacyOrderedSet, on SIZE items (by default 50,000).
+
+    Affixes are mined from LANGUAGE's full frequency list and entry
+    headwords (by default English), and QUERIES substring lookups
+    (by default 100) are timed against a scan of every word.
+"""
+import os
+import sys
+import gzip
+import time
+import random
+import multiprocessing
+from wiktionary_parser import *
+from wiktionary_pipeline import init_worker, parse_html
+from homophone_index import HomophoneIndex
+from ordered_set import OrderedSet
+from morpheme_parser import MorphemeParser
+
+
+def fixture_pages(directory=None, lim=200):
+    """
+    Returns the names & HTML of up to lim fixture pages in directory.
+
+    :param directory: Optional[str], directory of fixture pages
+    :param lim: int, most pages to return
+    :return: List[tuple(str, unicode)], name & HTML of each fixture page
+    """
+    if directory is None:
+        directory = WiktionaryParser.PATH + "/resources/fixtures/pages"
+    pages = list()
+
+    for subdirectory, subdirectories, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            path = os.path.join(subdirectory, filename)
+            if filename.endswith(".html.gz"):
+                pages.append((filename, gzip.open(path).read().decode("utf-8")))
+            elif filename.endswith(".html"):
+                pages.append((filename, open(path).read().decode("utf-8")))
+            if len(pages) >= lim:
+                return pages
+
+    return pages
+
+
+def time_page_entries(wikt_page, html, language, single_pass):
+    """
+    Returns the seconds taken to find the entries on this page,
+    and the sections & entries found.
+
+    :param wikt_page: WiktionaryPage, page to parse with
+    :param html: unicode, HTML of page to parse
+    :param language: Optional[str], language of entries to find, or None for all
+    :param single_pass: bool, whether to find sections in one walk
+    :return: tuple(float, List[tuple(str, str)], dict), parse time, sections' languages & headers, entries
+    """
+    page = BeautifulSoup(html)
+    start = time.time()
+    entries = wikt_page.page_entries(page, language, single_pass=single_pass)
+    elapsed = time.time() - start
+
+    page = BeautifulSoup(html)
+    if single_pass:
+        sections = wikt_page.page_sections(page, language)
+    else:
+        sections = wikt_page.soupified_sections(page, language)
+    return elapsed, [(lang, header) for lang, header, section in sections], entries
+
+
+def bench_pages(directory=None, language="Finnish"):
+    """
+    Prints the time per page taken to find entries on fixture
+    pages with & without the single-pass parser, and whether
+    both find the same sections & entries on each page, for
+    all languages and for the given language.
+
+    :param directory: Optional[str], directory of fixture pages
+    :param language: str, language to compare entries in besides all
+    :return: None
+    """
+    parser = WiktionaryParser()
+    wikt_page = WiktionaryPage(None, parser=parser, page=BeautifulSoup(""))
+    pages = fixture_pages(directory)
+    if len(pages) == 0:
+        print "no fixture pages found"
+        return
+
+    total_before, total_after, differing = 0.0, 0.0, 0
+    print "%-16s %-10s %9s %9s %9s %8s" % ("page", "language", "soupified", "1 pass", "sections", "entries")
+
+    for name, html in pages:
+        for lang in [None, parser.unicodize(language)]:
+            before, old_sections, old_entries = time_page_entries(wikt_page, html, lang, single_pass=False)
+            after, new_sections, new_entries = time_page_entries(wikt_page, html, lang, single_pass=True)
+            total_before += before
+            total_after += after
+            same_sections = old_sections == new_sections
+            same_entries = old_entries == new_entries
+            differing += not (same_sections and same_entries)
+            print "%-16s %-10s %7.2fms %7.2fms %9s %8s" % (name[:16], (lang or "all")[:10], before * 1000,
+                                                         after * 1000, "same" if same_sections else "DIFFER",
+                                                         "same" if same_entries else "DIFFER")
+
+    print "pages:", len(pages)
+    print "soupified: %.2f ms/page" % (total_before * 1000 / (2 * len(pages)))
+    print "single pass: %.2f ms/page" % (total_after * 1000 / (2 * len(pages)))
+    print "speedup: %.1fx" % (total_before / total_after)
+    print "parses with differing sections or entries:", differing
+
+
+def first_language(parser, html):
+    """
+    Returns the first language with a section on this page,
+    or None if it has none.
+
+    :param parser: WiktionaryParser, parser to clean headers with
+    :param html: unicode, HTML of page
+    :return: Optional[unicode], page's first language
+    """
+    for header in BeautifulSoup(html).findAll("h2"):
+        if header.find("span", attrs={"class": "mw-headline"}) is not None:
+            return parser.clean_header(header.getText())
+
+
+def bench_pipeline(directory=None, copies=20):
+    """
+    Prints the pages parsed per second by a ParsePipeline's
+    pool of processes on fixture pages, for 1 process up to
+    one per core.
+    ~
+    Each page is parsed in its first language, by workers
+    set up as a ParsePipeline sets up its own.
+
+    :param directory: Optional[str], directory of fixture pages
+    :param copies: int, number of times to parse each page
+    :return: None
+    """
+    pages = [html for name, html in fixture_pages(directory)]
+    if len(pages) == 0:
+        print "no fixture pages found"
+        return
+
+    parser = WiktionaryParser()
+    languages = [first_language(parser, html) for html in pages]
+    tasks = [(idx, 0, html, language)
+             for idx, (html, language) in enumerate(zip(pages, languages) * int(copies))]
+    print "pages:", len(tasks)
+
+    for processes in range(1, multiprocessing.cpu_count() + 1):
+        pool = multiprocessing.Pool(processes, init_worker, (parser.__class__, parser.parse_settings()))
+        pool.map(parse_html, tasks[:processes])     # let workers start up
+        start = time.time()
+        results = pool.map(parse_html, tasks, chunksize=4)
+        elapsed = time.time() - start
+        pool.terminate()
+        errors = sum(1 for idx, candidate, entries, error in results if error is not None)
+        print "%d process(es): %.1f pages/s, %d errors" % (processes, len(tasks) / elapsed, errors)
+
+
+def mutate_phonemes(phonemes, inventory, rand, edits=1):
+    """
+    Returns these phonemes with the given number of random
+    phonemes substituted, inserted or deleted.
+
+    :param phonemes: Tuple(unicode), phonemes to mutate
+    :param inventory: List[unicode], phonemes to substitute or insert
+    :param rand: random.Random, source of randomness
+    :param edits: int, number of edits to make
+    :return: Tuple(unicode), mutated phonemes
+    """
+    phonemes = list(phonemes)
+    for i in range(edits):
+        idx = rand.randint(0, len(phonemes))
+        edit = rand.choice(["substitute", "insert", "delete"])
+        if edit == "insert" or len(phonemes) == idx:
+            phonemes.insert(idx, rand.choice(inventory))
+        elif edit == "substitute":
+            phonemes[idx] = rand.choice(inventory)
+        elif len(phonemes) > 1:
+            del phonemes[idx]
+    return tuple(phonemes)
+
+
+def bench_homophones(language="English", size=100000, queries=100, k=10):
+    """
+    Prints the mean time taken to find the k nearest pronunciations
+    to each query by an exhaustive scan, and by rescoring an
+    NgramIndex's candidates, along with the share of the exhaustive
+    scan's k nearest each search finds.
+
+    :param language: str, language of pronunciations to search
+    :param size: int, number of pronunciations to search
+    :param queries: int, number of queries to time
+    :param k: int, number of pronunciations to find per query
+    :return: None
+    """
+    parser = WiktionaryParser()
+    rows = parser.ipa_index.rows(parser.unicodize(language))
+    if len(rows) == 0:
+        print "no pronunciations found for", language
+        return
+
+    rand = random.Random(0)
+    points = set(phonemes for word, ipa, phonemes in rows)
+    inventory = sorted(set(phoneme for point in points for phoneme in point))
+    seeds = sorted(points)
+    while len(points) < int(size):
+        points.add(mutate_phonemes(rand.choice(seeds), inventory, rand, rand.randint(1, 3)))
+    index = HomophoneIndex([(str(idx), u"".join(point), point) for idx, point in enumerate(sorted(points))])
+    searches = [mutate_phonemes(rand.choice(seeds), inventory, rand) for i in range(int(queries))]
+
+    start = time.time()
+    index.find_ngram_index()
+    print "pronunciations: %d" % len(index.points)
+    print "n-gram index built in %.2f s" % (time.time() - start)
+
+    start = time.time()
+    exact = [index.rescore(query, index.points, k) for query in searches]
+    scan = (time.time() - start) / len(searches)
+    print "exhaustive scan: %.1f ms/query" % (scan * 1000)
+
+    for candidates in [50, 200, 1000, 5000]:
+        start = time.time()
+        found = [index.nearest(query, k, candidates) for query in searches]
+        elapsed = (time.time() - start) / len(searches)
+        hits = sum(sum(1 for dist, word in near if dist <= best[-1][0] + 1e-9)
+                   for near, best in zip(found, exact))
+        print "%d candidates: %.1f ms/query (%.0fx), recall@%d %.3f" % \
+              (candidates, elapsed * 1000, scan / elapsed, k, hits / float(k * len(searches)))
+
+
+class LegacyOrderedSet(set):
+    """
+    The previous OrderedSet, which kept every item ever added
+    and re-sorted them on every read, for timing against.
+    """
+    def __init__(self, items=list()):
+        self.items_set = set(items)
+        set.__init__(self.items_set)
+        self.all_items = items
+        self.frequency_counts = {i: items.count(i) for i in self.all_items}
+
+    def items(self):
+        items_set = list()
+        seen = set()
+        for item in self.all_items:
+            if item not in seen:
+                items_set.append(item)
+                seen.add(item)
+        return sorted(items_set, key=lambda i: self.frequency_counts[i], reverse=True)
+
+    def add(self, item):
+        if len(item) > 0:
+            self.all_items.append(item)
+            self.items_set.add(item)
+            self.frequency_counts.setdefault(item, int())
+            self.frequency_counts[item] += 1
+
+    def __iter__(self):
+        return iter(self.items())
+
+    def __len__(self):
+        return len(self.items())
+
+
+def time_ordered_set(cls, items, adds, reads):
+    """
+    Returns the seconds taken to build an OrderedSet class from
+    items, to add each of adds while checking its length, and to
+    check reads for membership by iterating.
+
+    :param cls: class, OrderedSet class to time
+    :param items: List[str], items to build set from
+    :param adds: List[str], items to add one by one
+    :param reads: List[str], items to look for
+    :return: tuple(float, float, float), seconds to build, add & read
+    """
+    start = time.time()
+    ordered = cls(list(items))
+    ordered.items()
+    built = time.time()
+    for item in adds:
+        ordered.add(item)
+        len(ordered)
+    added = time.time()
+    for item in reads:
+        item in ordered.items()
+    return built - start, added - built, time.time() - added
+
+
+def bench_ordered_set(size=50000):
+    """
+    Prints the time taken by OrderedSet and LegacyOrderedSet to
+    build from size items (a tenth of them distinct), to add 500
+    more one by one, and to look up 50 items in their rankings.
+    Steps the legacy set would take minutes on are scaled down
+    and extrapolated.
+
+    :param size: int, number of items to build sets from
+    :return: None
+    """
+    size = int(size)
+    rand = random.Random(0)
+    items = ["item%d" % rand.randint(0, size // 10) for i in range(size)]
+    adds = ["item%d" % rand.randint(0, size // 5) for i in range(500)]
+    reads = ["item%d" % rand.randint(0, size // 5) for i in range(50)]
+
+    new = time_ordered_set(OrderedSet, items, adds, reads)
+    # LegacyOrderedSet's build is quadratic, so time it on a slice
+    legacy_size = min(size, 5000)
+    legacy_build = time_ordered_set(LegacyOrderedSet, items[:legacy_size], [], [])[0]
+    legacy_build *= (size / float(legacy_size)) ** 2
+    # and time its adds & reads on a set filled in without counting
+    legacy_set = LegacyOrderedSet([])
+    legacy_set.all_items = list(items)
+    legacy_set.items_set = set(items)
+    for item in items:
+        legacy_set.frequency_counts[item] = legacy_set.frequency_counts.get(item, 0) + 1
+    start = time.time()
+    for item in adds[:50]:
+        legacy_set.add(item)
+        len(legacy_set)
+    legacy_add = (time.time() - start) * len(adds) / 50.0
+    start = time.time()
+    for item in reads:
+        item in legacy_set.items()
+    legacy_read = time.time() - start
+
+    print "items: %d (%d distinct)" % (size, len(set(items)))
+    for name, before, after in [("build", legacy_build, new[0]),
+                                ("%d adds" % len(adds), legacy_add, new[1]),
+                                ("%d reads" % len(reads), legacy_read, new[2])]:
+        print "%s: legacy %.3f s, new %.4f s (%.0fx)" % (name, before, after, before / max(after, 1e-6))
+
+
+def bench_affixes(language="English", queries=100):
+    """
+    Prints the time taken to build language's SuffixArray, to mine
+    its prefixes & suffixes, and to find the words containing each
+    of queries substrings, by the SuffixArray and by a scan.
+
+    :param language: str, language of words to index
+    :param queries: int, number of substrings to look up
+    :return: None
+    """
+    parser = MorphemeParser(language)
+    start = time.time()
+    array = parser.find_suffix_array()
+    print "words: %d, built in %.2f s" % (len(array), time.time() - start)
+
+    for name, mine in [("prefixes", parser.mine_prefixes), ("suffixes", parser.mine_suffixes)]:
+        start = time.time()
+        affixes = mine()
+        print "%d %s mined in %.2f s, top: %s" % (len(affixes), name, time.time() - start,
+                                                  u", ".join(stats[0] for stats in affixes[:10]))
+
+    rand = random.Random(0)
+    substrings = list()
+    for i in range(int(queries)):
+        word = rand.choice(array.words)
+        start = rand.randint(0, max(0, len(word) - 3))
+        substrings.append(word[start:start + 3])
+
+    start = time.time()
+    for substring in substrings:
+        array.containing(substring)
+    indexed = (time.time() - start) / len(substrings)
+    start = time.time()
+    for substring in substrings[:10]:
+        [word for word in array.words if substring in word]
+    scan = (time.time() - start) / min(len(substrings), 10)
+    print "containing: scan %.1f ms/query, suffix array %.2f ms/query" % (scan * 1000, indexed * 1000)
+
+
+if __name__ == "__main__":
+    benches = {"pages": bench_pages,
+               "pipeline": bench_pipeline,
+               "homophones": bench_homophones,
+               "ordered_set": bench_ordered_set,
+               "affixes": bench_affixes}
+    if len(sys.argv) < 2 or sys.argv[1] not in benches:
+        print __doc__
+    else:
+        benches[sys.argv[1]](*sys.argv[2:])
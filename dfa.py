@@ -0,0 +1,144 @@
+# coding: utf-8
+"""
+DFA:
+
+    Contains DFA class for storing the transitions of a
+    deterministic finite automaton as adjacency lists.
+"""
+
+
+class DFA:
+    """
+    A class for the transitions of a deterministic finite
+    automaton, each from a state on a label to a destination.
+    ~
+    Labels are interned as integers in order of first use.  Each
+    state keeps a map of its outgoing edges, label id -> destination,
+    and each destination a map of its incoming edges, source ->
+    label ids, so a state's edges are found without scanning every
+    transition.  A DFA can still be read like the dictionary of
+    (state, label) -> destination it replaces.
+    """
+    def __init__(self):
+        self.labels = list()        # label id -> label
+        self.label_ids = dict()     # label -> label id
+        self.outgoing = dict()      # state -> label id -> destination
+        self.incoming = dict()      # state -> source -> label ids of edges to state
+        self.size = 0
+
+    def intern(self, label):
+        """
+        Returns the integer id of this label, interning it
+        if not done already.
+
+        :param label: str, label of transition
+        :return: int, id of label
+        """
+        try:
+            return self.label_ids[label]
+        except KeyError:
+            self.label_ids[label] = len(self.labels)
+            self.labels.append(label)
+            return self.label_ids[label]
+
+    def add(self, state, label, dest):
+        """
+        Adds a transition from this state on this label to dest,
+        replacing any transition from state on label.
+
+        :param state: int, state to transition from
+        :param label: str, label to transition on
+        :param dest: int, state to transition to
+        :return: None
+        """
+        label_id = self.intern(label)
+        edges = self.outgoing.setdefault(state, dict())
+        if label_id in edges:
+            self.discard_incoming(state, label_id, edges[label_id])
+        else:
+            self.size += 1
+        edges[label_id] = dest
+        self.incoming.setdefault(dest, dict()).setdefault(state, set()).add(label_id)
+
+    def discard_incoming(self, state, label_id, dest):
+        """
+        Removes the edge from this state on this label id
+        from dest's incoming edges.
+
+        :param state: int, source of edge
+        :param label_id: int, id of edge's label
+        :param dest: int, destination of edge
+        :return: None
+        """
+        sources = self.incoming[dest]
+        sources[state].discard(label_id)
+        if len(sources[state]) == 0:
+            del sources[state]
+
+    def get(self, state, label, default=None):
+        """
+        Returns the destination of the transition from this state
+        on this label, or default if there is none.
+
+        :param state: int, state to transition from
+        :param label: str, label to transition on
+        :param default: X, value to return if there is no transition
+        :return: int, destination state
+        """
+        label_id = self.label_ids.get(label, None)
+        if label_id is None:
+            return default
+        return self.outgoing.get(state, dict()).get(label_id, default)
+
+    def destinations(self, state):
+        """
+        Returns each destination of this state's outgoing
+        edges with the labels leading there.
+
+        :param state: int, state to find destinations of
+        :return: dict(int, List[str]), destinations & labels, in order interned
+        """
+        destinations = dict()
+        for label_id in sorted(self.outgoing.get(state, ())):
+            dest = self.outgoing[state][label_id]
+            destinations.setdefault(dest, list()).append(self.labels[label_id])
+        return destinations
+
+    def sources(self, state):
+        """
+        Returns each source of this state's incoming
+        edges with the labels leading here.
+
+        :param state: int, state to find sources of
+        :return: dict(int, List[str]), sources & labels, in order interned
+        """
+        return {source: [self.labels[label_id] for label_id in sorted(label_ids)]
+                for source, label_ids in self.incoming.get(state, dict()).iteritems()}
+
+    def states(self):
+        """
+        Returns every state with an outgoing edge, in order.
+
+        :return: List[int], states with outgoing edges
+        """
+        return sorted(state for state in self.outgoing if len(self.outgoing[state]) != 0)
+
+    def __getitem__(self, key):
+        dest = self.get(*key)
+        if dest is None:
+            raise KeyError(key)
+        return dest
+
+    def __setitem__(self, key, dest):
+        self.add(key[0], key[1], dest)
+
+    def __contains__(self, key):
+        return self.get(*key) is not None
+
+    def __iter__(self):
+        for state in self.states():
+            for label_id in sorted(self.outgoing[state]):
+                yield state, self.labels[label_id]
+
+    def __len__(self):
+        return self.size
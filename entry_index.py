@@ -0,0 +1,316 @@
+# coding: utf-8
+"""
+ENTRY_INDEX:
+
+    Contains EntryIndex classes for looking up Wiktionary
+    entries by the content under one of their headings.
+"""
+import os
+import json
+import unicodedata
+
+
+class EntryIndex:
+    """
+    An abstract class for indexing the words in an EntryStore
+    by the content under one heading of their language entries.
+    ~
+    Each language has its own index, a dict from each key found
+    in a word's content to the words with that key, in the order
+    they were indexed.  An index is built from the store the first
+    time its language is looked up, then kept up to date by
+    reindex as entries change, and saved to a JSON file per
+    language when the index persists.
+    ~
+    Each file is stamped with the store's generation when saved.
+    A file whose stamp is not the store's current generation (e.g.
+    the store was persisted but the index not, or the store was
+    replaced) is stale, and its index is built again instead.
+    """
+    NAME = ""
+    HEADING = None
+
+    def __init__(self, path, store):
+        """
+        Initializes this EntryIndex in the directory at path,
+        indexing entries from the given store.
+
+        :param path: str, directory to keep index files in
+        :param store: EntryStore, store of entries to index
+        """
+        self.path = path
+        self.store = store
+        self.indexes = dict()   # language -> key -> words
+        self.changed = set()    # languages whose indexes changed since last persist
+
+    def content_keys(self, content):
+        """
+        Returns the keys to index a word under, given the content
+        under this EntryIndex's heading in its entry.
+
+        :param content: List, content under heading in a language entry
+        :return: List, keys to index word under
+        """
+        return content
+
+    def language_path(self, language):
+        """
+        Returns the path of this language's index file.
+
+        :param language: str, language of index
+        :return: str, path of index file
+        """
+        return os.path.join(self.path, "%s_%s.json" % (self.NAME, language.replace(" ", "_")))
+
+    def find_index(self, language):
+        """
+        Returns this language's index, loading it from disk or
+        building it from the store if not done already.
+
+        :param language: str, language of index
+        :return: dict(str, List[str]), where...
+            key (str) - key found in content under heading
+            val (List[str]) - words with key
+        """
+        try:
+            return self.indexes[language]
+        except KeyError:
+            index = self.load_index(language)
+            if index is None:
+                index = self.build_index(language)
+                self.changed.add(language)
+            self.indexes[language] = index
+            return index
+
+    def load_index(self, language):
+        """
+        Returns this language's index from its file, or None if
+        there is no file or it is stale.
+
+        :param language: str, language of index
+        :return: Optional[dict(str, List[str])], keys & words with them
+        """
+        path = self.language_path(language)
+        if not os.path.exists(path):
+            return
+
+        generation = self.store.generation()
+        stamped = json.load(open(path))
+        if generation is None or not isinstance(stamped, list) or stamped[0] != generation:
+            return
+        return stamped[1]
+
+    def build_index(self, language):
+        """
+        Returns a new index of every entry in this language.
+
+        :param language: str, language of index
+        :return: dict(str, List[str]), keys & words with them
+        """
+        index = dict()
+        for word, entry in self.store.iter_language(language):
+            content = entry.get(self.HEADING, None)
+            if content is not None:
+                self.add_keys(index, word, self.content_keys(content))
+        return index
+
+    def add_keys(self, index, word, keys):
+        """
+        Adds this word to the index under each of these keys.
+
+        :param index: dict(str, List[str]), index to add to
+        :param word: str, word to add
+        :param keys: List, keys to add word under
+        :return: None
+        """
+        for key in keys:
+            words = index.setdefault(key, list())
+            if word not in words:
+                words.append(word)
+
+    def remove_keys(self, index, word, keys):
+        """
+        Removes this word from the index under each of these keys.
+
+        :param index: dict(str, List[str]), index to remove from
+        :param word: str, word to remove
+        :param keys: List, keys to remove word from
+        :return: None
+        """
+        for key in keys:
+            words = index.get(key, None)
+            if words is not None and word in words:
+                words.remove(word)
+                if len(words) == 0:
+                    del index[key]
+
+    def reindex(self, word, language, old_entry, new_entry):
+        """
+        Updates this language's index for this word's entry
+        changing from old_entry to new_entry.
+
+        :param word: str, word of changed entry
+        :param language: str, language of changed entry
+        :param old_entry: Optional[dict], language entry before change
+        :param new_entry: Optional[dict], language entry after change
+        :return: None
+        """
+        old_content = (old_entry or dict()).get(self.HEADING, None)
+        new_content = (new_entry or dict()).get(self.HEADING, None)
+        if old_content == new_content:
+            return
+
+        index = self.find_index(language)
+        if old_content is not None:
+            self.remove_keys(index, word, self.content_keys(old_content))
+        if new_content is not None:
+            self.add_keys(index, word, self.content_keys(new_content))
+        self.changed.add(language)
+
+    def lookup(self, key, language):
+        """
+        Returns the words indexed under this key in this language.
+
+        :param key: str, key to look up
+        :param language: str, language of index
+        :return: List[str], words with key
+        """
+        return self.find_index(language).get(key, list())
+
+    def persist(self):
+        """
+        Saves the indexes of each language changed since the
+        last persist to their JSON files.
+
+        :return: None
+        """
+        if len(self.changed) == 0:
+            return
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        # unsaved entries may be indexed, so only a saved store's generation is stamped
+        generation = self.store.generation() if len(self.store.dirty) == 0 else None
+        for language in self.changed:
+            path = self.language_path(language)
+            temp_path = path + ".tmp"
+            json.dump([generation, self.indexes[language]], open(temp_path, 'w'), encoding='utf-8')
+            os.rename(temp_path, path)
+        self.changed.clear()
+
+
+class InflectionIndex(EntryIndex):
+    """
+    An EntryIndex from each inflected form in a language's
+    declensions to the lemmas it inflects.
+    """
+    NAME = "inflections"
+    HEADING = u"Declension"
+
+
+class IPAIndex(EntryIndex):
+    """
+    An EntryIndex from each cleaned IPA in a language to the
+    words pronounced with it, for finding homophones.
+    ~
+    Only a word's first pronunciation is indexed, cleaned with the
+    given clean function.  Each language also has a table of rows
+    (word, cleaned IPA, phonemes), built once from its index and
+    kept up to date by reindex, so homophone searches can compare
+    ready-made IPAs without cleaning any.
+    """
+    NAME = "ipas"
+    HEADING = u"Pronunciation"
+
+    def __init__(self, path, store, clean):
+        """
+        Initializes this IPAIndex in the directory at path,
+        indexing entries from the given store.
+
+        :param path: str, directory to keep index files in
+        :param store: EntryStore, store of entries to index
+        :param clean: function, returns an IPA cleaned for comparison
+        """
+        EntryIndex.__init__(self, path, store)
+        self.clean = clean
+        self.tables = dict()    # language -> word -> (cleaned IPA, phonemes)
+        self.versions = dict()  # language -> number of changes to its table
+
+    def content_keys(self, content):
+        if len(content) == 0:
+            return list()
+        else:
+            return [self.clean(content[0])]
+
+    def ipa_phonemes(self, ipa):
+        """
+        Returns this IPA split into phonemes, each a letter
+        followed by any combining marks on it.
+
+        :param ipa: unicode, IPA to split
+        :return: Tuple(unicode), phonemes of IPA
+        """
+        phonemes = list()
+        for char in ipa:
+            if len(phonemes) != 0 and unicodedata.combining(char):
+                phonemes[-1] += char
+            else:
+                phonemes.append(char)
+        return tuple(phonemes)
+
+    def find_table(self, language):
+        """
+        Returns this language's table of cleaned IPAs,
+        building it from its index if not done already.
+
+        :param language: str, language of table
+        :return: dict(str, tuple), where...
+            key (str) - word with a pronunciation
+            val (Tuple(unicode, Tuple(unicode))) - word's cleaned IPA & its phonemes
+        """
+        try:
+            return self.tables[language]
+        except KeyError:
+            table = dict()
+            for ipa, words in self.find_index(language).iteritems():
+                phonemes = self.ipa_phonemes(ipa)
+                for word in words:
+                    table[word] = (ipa, phonemes)
+            self.tables[language] = table
+            return table
+
+    def rows(self, language):
+        """
+        Returns every (word, cleaned IPA, phonemes) row
+        in this language's table.
+
+        :param language: str, language of table
+        :return: List[Tuple(str, unicode, Tuple(unicode))], rows of table
+        """
+        return [(word, ipa, phonemes) for word, (ipa, phonemes)
+                in self.find_table(language).iteritems()]
+
+    def version(self, language):
+        """
+        Returns the number of times this language's table has
+        changed, for telling whether data built from it is stale.
+
+        :param language: str, language of table
+        :return: int, version of table
+        """
+        return self.versions.get(language, 0)
+
+    def reindex(self, word, language, old_entry, new_entry):
+        if (old_entry or dict()).get(self.HEADING, None) == (new_entry or dict()).get(self.HEADING, None):
+            return
+
+        EntryIndex.reindex(self, word, language, old_entry, new_entry)
+        self.versions[language] = self.version(language) + 1
+        table = self.tables.get(language, None)
+        if table is not None:
+            content = (new_entry or dict()).get(self.HEADING, None)
+            keys = self.content_keys(content) if content is not None else list()
+            if len(keys) == 0:
+                table.pop(word, None)
+            else:
+                table[word] = (keys[0], self.ipa_phonemes(keys[0]))
@@ -0,0 +1,490 @@
+# coding: utf-8
+"""
+ENTRY_STORE:
+
+    Contains EntryStore classes for keeping Wiktionary entries
+    on disk and fetching them on demand.
+"""
+import os
+import json
+import uuid
+import sqlite3
+
+
+class EntryStore:
+    """
+    An abstract class for storing Wiktionary entries.
+    ~
+    An EntryStore behaves like the dict of wiktionary_entries:
+    each key is a word and each value is a dict of that word's
+    language entries.  Entries are loaded only when first requested
+    and kept in memory afterwards, so edits to a loaded entry are
+    visible to every later lookup.
+    ~
+    Edits made inside an entry cannot be seen by the store, so
+    whoever edits an entry should mark its word as dirty.  Only
+    dirty entries are written to disk when the store persists.
+    ~
+    Each store on disk has a generation, which changes whenever
+    its entries on disk do, so data built from the entries (e.g.
+    an EntryIndex's files) can tell whether it is stale.
+    """
+    EXTENSION = ""
+
+    def __init__(self, path):
+        """
+        Initializes this EntryStore at the given path.
+
+        :param path: str, path to entry file, without its extension
+        """
+        self.path = path + self.EXTENSION
+        self.entries = dict()   # entries loaded so far
+        self.dirty = set()      # words whose entries changed since last persist
+
+    def unicodize(self, word):
+        """
+        Returns the given word in unicode.
+
+        :param word: str, word to decode to unicode
+        :return: unicode, word in unicode
+        """
+        if isinstance(word, str):
+            word = word.decode("utf-8")
+        return word
+
+    # LOADING
+    # -------
+    def load_entry(self, word):
+        """
+        Returns the entry for this word from disk.
+        ~
+        Returns None if no entry for this word exists.
+
+        :param word: unicode, word of entry to load
+        :return: dict(str, dict), where str is language and dict is language entry
+        """
+        return
+
+    def load_words(self):
+        """
+        Returns all words with entries on disk.
+
+        :return: List[unicode], all words with entries on disk
+        """
+        return list()
+
+    def load_language(self, language):
+        """
+        Yields each word-entry pair on disk in this language.
+
+        :param language: str, language of entries to yield
+        :return: Iterator[tuple(unicode, dict)], words & their language entries
+        """
+        for word in self.load_words():
+            entry = self.load_entry(word)
+            if entry is not None and language in entry:
+                yield word, entry[language]
+
+    def generation(self):
+        """
+        Returns this EntryStore's generation, or None if its
+        entries are not kept on disk.
+
+        :return: Optional[str], generation of entries on disk
+        """
+        return
+
+    def words(self):
+        """
+        Returns all words in this EntryStore, whether on disk
+        or only in memory.
+
+        :return: List[unicode], all words in this EntryStore
+        """
+        words = self.load_words()
+        seen = set(words)
+        words += [word for word in self.entries if word not in seen]
+        return words
+
+    def iter_language(self, language):
+        """
+        Yields each word-entry pair in this language.
+        ~
+        Entries already in memory take precedence over those on disk.
+        Entries read from disk are not kept in memory, so scanning a
+        whole language does not load the whole store.
+
+        :param language: str, language of entries to yield
+        :return: Iterator[tuple(unicode, dict)], words & their language entries
+        """
+        for word, entry in self.load_language(language):
+            if word not in self.entries:
+                yield word, entry
+
+        for word in self.entries.keys():
+            entry = self.entries[word].get(language, None)
+            if entry is not None:
+                yield word, entry
+
+    # SAVING
+    # ------
+    def mark_dirty(self, word):
+        """
+        Marks this word's entry as changed, so that it is
+        saved the next time this EntryStore persists.
+
+        :param word: str, word of changed entry
+        :return: None
+        """
+        self.dirty.add(self.unicodize(word))
+
+    def persist(self):
+        """
+        Saves this EntryStore's dirty entries to disk.
+
+        :return: None
+        """
+        self.dirty.clear()
+
+    def export_json(self, path):
+        """
+        Dumps every entry in this EntryStore (prettily) to the
+        JSON file at path.
+
+        :param path: str, path of .json file to dump to
+        :return: None
+        """
+        data = {word: self[word] for word in self.words()}
+        json.dump(data, open(path, 'w'), indent=1, sort_keys=True, encoding='utf-8')
+
+    # DICT INTERFACE
+    # --------------
+    def __getitem__(self, word):
+        word = self.unicodize(word)
+        try:
+            return self.entries[word]
+        except KeyError:
+            entry = self.load_entry(word)
+            if entry is None:
+                raise KeyError(word)
+            self.entries[word] = entry
+            return entry
+
+    def __setitem__(self, word, entry):
+        word = self.unicodize(word)
+        self.entries[word] = entry
+        self.dirty.add(word)
+
+    def __contains__(self, word):
+        try:
+            self[word]
+        except KeyError:
+            return False
+        else:
+            return True
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def __len__(self):
+        return len(self.words())
+
+    def get(self, word, default=None):
+        try:
+            return self[word]
+        except KeyError:
+            return default
+
+    def setdefault(self, word, default=None):
+        try:
+            return self[word]
+        except KeyError:
+            self[word] = default
+            return default
+
+    def keys(self):
+        return self.words()
+
+
+class JSONEntryStore(EntryStore):
+    """
+    An EntryStore kept in a single JSON file.
+    ~
+    Loads every entry at once, as WiktionaryParser has always done.
+    ~
+    Rather than rewrite the whole file on each persist, appends the
+    dirty entries to a journal beside it, one JSON line per entry.
+    The journal is replayed on loading and folded back into the
+    JSON file once it holds COMPACT_SIZE entries.
+    """
+    EXTENSION = ".json"
+    JOURNAL_EXTENSION = ".journal"
+    COMPACT_SIZE = 1000
+
+    def __init__(self, path):
+        EntryStore.__init__(self, path)
+        self.journal_path = path + self.JOURNAL_EXTENSION
+        self.journal_size = 0
+        if os.path.exists(self.path):
+            self.entries = json.load(open(self.path))
+        self.replay_journal()
+
+    def replay_journal(self):
+        """
+        Applies every entry in this JSONEntryStore's journal
+        to its entries, in the order they were written.
+        ~
+        A truncated last line (e.g. from a crash mid-write) is ignored
+        and cut from the journal, so later entries are not appended to it.
+
+        :return: None
+        """
+        if not os.path.exists(self.journal_path):
+            return
+
+        end = 0
+        with open(self.journal_path, "rb") as journal:
+            for line in journal:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    word, entry = json.loads(line)
+                except ValueError:
+                    break
+                self.entries[word] = entry
+                self.journal_size += 1
+                end += len(line)
+
+        if end != os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as journal:
+                journal.truncate(end)
+
+    def generation(self):
+        """
+        Returns this JSONEntryStore's generation, from the sizes
+        and modification times of its JSON file & journal.
+
+        :return: str, generation of entries on disk
+        """
+        stamps = list()
+        for path in [self.path, self.journal_path]:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stamps.append("%d@%r" % (stat.st_size, stat.st_mtime))
+            else:
+                stamps.append("-")
+        return "/".join(stamps)
+
+    def persist(self):
+        if len(self.dirty) == 0:
+            return
+
+        with open(self.journal_path, 'a') as journal:
+            for word in self.dirty:
+                journal.write(json.dumps([word, self.entries[word]]) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+        self.journal_size += len(self.dirty)
+        self.dirty.clear()
+
+        if self.journal_size >= self.COMPACT_SIZE:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites this JSONEntryStore's JSON file with all its entries
+        and empties its journal.
+        ~
+        The JSON file is replaced atomically, so a crash leaves either
+        the old file & journal or the new file behind.
+
+        :return: None
+        """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as temp:
+            json.dump(self.entries, temp, indent=1, sort_keys=True, encoding='utf-8')
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.rename(temp_path, self.path)
+        open(self.journal_path, 'w').close()
+        self.journal_size = 0
+
+
+class SQLiteEntryStore(EntryStore):
+    """
+    An EntryStore kept in an SQLite database, with one row
+    per word and language.
+    ~
+    Only the entries that are asked for are read from disk, so
+    opening an SQLiteEntryStore takes the same time however many
+    entries it holds.
+    ~
+    Persisting writes only the dirty rows, in one transaction.  The
+    database runs in write-ahead-log mode, so each commit appends to
+    its log and SQLite checkpoints the log back into the database.
+    ~
+    The database's generation is a random id, drawn when it is
+    created, and a count of the transactions that changed its
+    entries, bumped within each of them.
+    """
+    EXTENSION = ".db"
+    NO_LANGUAGE = u""   # marks a word whose page had no language entries
+
+    def __init__(self, path):
+        EntryStore.__init__(self, path)
+        self.json_path = path + JSONEntryStore.EXTENSION
+        self.connection = None
+
+    def connect(self):
+        """
+        Returns this SQLiteEntryStore's database connection,
+        opening it first if need be.
+        ~
+        If no database exists yet, builds one from the JSON
+        file of the same name.
+
+        :return: sqlite3.Connection, connection to this store's database
+        """
+        if self.connection is None:
+            if not os.path.exists(self.path) and os.path.exists(self.json_path):
+                self.migrate_json()
+            self.connection = self.open_database(self.path)
+        return self.connection
+
+    def open_database(self, path):
+        """
+        Returns a connection to the database at path, creating
+        its tables if need be.
+
+        :param path: str, path of .db file to open
+        :return: sqlite3.Connection, connection to database
+        """
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS entries ("
+                           "word TEXT NOT NULL, "
+                           "language TEXT NOT NULL, "
+                           "entry TEXT NOT NULL, "
+                           "PRIMARY KEY (word, language))")
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_language "
+                           "ON entries (language)")
+        connection.execute("CREATE TABLE IF NOT EXISTS generation ("
+                           "id TEXT NOT NULL, "
+                           "count INTEGER NOT NULL)")
+        with connection:
+            if connection.execute("SELECT COUNT(*) FROM generation").fetchone()[0] == 0:
+                connection.execute("INSERT INTO generation (id, count) VALUES (?, 0)",
+                                   (uuid.uuid4().hex,))
+        return connection
+
+    def migrate_json(self):
+        """
+        Builds this store's database from the JSON file of the same name.
+        ~
+        The database is built beside its path and renamed into place
+        once the import commits, so an interrupted import leaves no
+        database behind and is run again on the next connect.
+
+        :return: None
+        """
+        temp_path = self.path + ".tmp"
+        for path in [temp_path, temp_path + "-wal", temp_path + "-shm"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.connection = self.open_database(temp_path)
+        try:
+            self.import_json(self.json_path)
+        finally:
+            self.connection.close()
+            self.connection = None
+        os.rename(temp_path, self.path)
+
+    def import_json(self, path):
+        """
+        Adds every entry in the JSON file at path to this store's database.
+
+        :param path: str, path of .json file to import
+        :return: None
+        """
+        data = json.load(open(path))
+        with self.connect():
+            for word in data:
+                self.write_entry(word, data[word])
+            self.bump_generation()
+
+    def generation(self):
+        """
+        Returns this SQLiteEntryStore's generation, from its
+        database's id & count of changes.
+
+        :return: str, generation of entries on disk
+        """
+        return "%s:%d" % self.connect().execute("SELECT id, count FROM generation").fetchone()
+
+    def bump_generation(self):
+        """
+        Counts a change to this store's entries in its generation,
+        in the transaction making the change.
+
+        :return: None
+        """
+        self.connect().execute("UPDATE generation SET count = count + 1")
+
+    def entry_rows(self, word, entry):
+        """
+        Returns the database rows for this word's entry.
+
+        :param word: unicode, word of entry
+        :param entry: dict(str, dict), where str is language and dict is language entry
+        :return: List[tuple(unicode, unicode, str)], word, language & JSON entry rows
+        """
+        if len(entry) == 0:
+            return [(word, self.NO_LANGUAGE, "{}")]
+        else:
+            return [(word, self.unicodize(language), json.dumps(entry[language], separators=(",", ":")))
+                    for language in entry]
+
+    def write_entry(self, word, entry):
+        """
+        Replaces this word's rows in the database with the given entry.
+
+        :param word: unicode, word of entry to write
+        :param entry: dict(str, dict), where str is language and dict is language entry
+        :return: None
+        """
+        word = self.unicodize(word)
+        connection = self.connect()
+        connection.execute("DELETE FROM entries WHERE word = ?", (word,))
+        connection.executemany("INSERT INTO entries (word, language, entry) VALUES (?, ?, ?)",
+                               self.entry_rows(word, entry))
+
+    def load_entry(self, word):
+        rows = self.connect().execute("SELECT language, entry FROM entries WHERE word = ?",
+                                      (self.unicodize(word),)).fetchall()
+        if len(rows) == 0:
+            return
+        else:
+            return {language: json.loads(entry) for language, entry in rows
+                    if language != self.NO_LANGUAGE}
+
+    def load_words(self):
+        rows = self.connect().execute("SELECT DISTINCT word FROM entries")
+        return [row[0] for row in rows]
+
+    def load_language(self, language):
+        rows = self.connect().execute("SELECT word, entry FROM entries WHERE language = ?",
+                                      (self.unicodize(language),))
+        for word, entry in rows:
+            yield word, json.loads(entry)
+
+    def persist(self):
+        if len(self.dirty) == 0:
+            return
+
+        with self.connect():
+            for word in self.dirty:
+                self.write_entry(word, self.entries[word])
+            self.bump_generation()
+        self.dirty.clear()
@@ -0,0 +1,171 @@
+# coding: utf-8
+"""
+ETYMOLOGY_INDEX:
+
+    Contains EtymologyIndex class for finding every morpheme
+    a word derives from, directly or through its morphemes.
+"""
+
+
+class EtymologyIndex:
+    """
+    A class for finding the closure of each word's etymology in
+    an EntryStore: the word, its morphemes, their morphemes, etc.
+    ~
+    Words and morphemes are nodes of a graph, with an edge from each
+    to the morphemes in its entry's etymology.  Closures are found
+    over the graph's strongly connected components with Tarjan's
+    algorithm, so etymologies citing each other cannot loop, and
+    each component's closure is found once from those already found
+    below it.  Every closure found is kept until an entry it was
+    found from changes: the nodes which read that entry, and every
+    node with a path to them, are then forgotten.
+    """
+    HEADING = u"Etymology"
+
+    def __init__(self, store, expandable):
+        """
+        Initializes this EtymologyIndex over entries in the given store.
+
+        :param store: EntryStore, store of entries to find etymologies in
+        :param expandable: function, returns whether a morpheme's etymology is looked up
+        """
+        self.store = store
+        self.expandable = expandable
+        self.closures = dict()  # language -> node -> closure of node
+        self.readers = dict()   # language -> entry word -> nodes found from its entry
+        self.parents = dict()   # language -> node -> nodes with an edge to node
+
+    def node_morphemes(self, node, language):
+        """
+        Returns the morphemes in the etymology of this node's
+        entry, found as with WiktionaryParser.entry_word, and
+        notes which entries were read to find them.
+
+        :param node: str, word or morpheme to find morphemes of
+        :param language: str, language of entry
+        :return: List[str], non-empty morphemes in node's etymology
+        """
+        if len(node) == 0 or not self.expandable(node):
+            return list()
+        readers = self.readers.setdefault(language, dict())
+
+        for word in (node, node.lower(), node.title()):
+            word = self.store.unicodize(word)
+            readers.setdefault(word, set()).add(node)
+            try:
+                entry = self.store[word][language]
+            except KeyError:
+                continue
+            else:
+                return [morpheme for morpheme in entry.get(self.HEADING) or list() if len(morpheme) != 0]
+
+        return list()
+
+    def closure(self, word, language):
+        """
+        Returns this word followed by every morpheme it derives
+        from, each once, finding the closure if not done already.
+        ~
+        Morphemes in the same component as word come first, in the
+        order found, then those of the components below, in the order
+        of word's etymology.
+
+        :param word: str, word to find morphemes of
+        :param language: str, language of etymologies
+        :return: Tuple(str), word & its morphemes
+        """
+        closures = self.closures.setdefault(language, dict())
+        if word in closures:
+            return closures[word]
+        parents = self.parents.setdefault(language, dict())
+
+        order = dict()      # node -> index in order first visited
+        low = dict()        # node -> lowest order of a node reachable on the stack
+        edges = dict()      # node -> morphemes in node's etymology
+        stack = list()
+        on_stack = set()
+        work = [(word, 0)]  # (node, index of next edge to follow)
+
+        while len(work) != 0:
+            node, idx = work.pop()
+            if idx == 0:
+                order[node] = low[node] = len(order)
+                stack.append(node)
+                on_stack.add(node)
+                edges[node] = self.node_morphemes(node, language)
+                for morpheme in edges[node]:
+                    parents.setdefault(morpheme, set()).add(node)
+            elif edges[node][idx - 1] in on_stack:
+                low[node] = min(low[node], low[edges[node][idx - 1]])
+
+            if idx < len(edges[node]):
+                work.append((node, idx + 1))
+                morpheme = edges[node][idx]
+                if morpheme not in closures and morpheme not in order:
+                    work.append((morpheme, 0))
+            elif low[node] == order[node]:
+                component = list()
+                while len(component) == 0 or component[-1] != node:
+                    component.append(stack.pop())
+                    on_stack.discard(component[-1])
+                self.close_component(component[::-1], edges, closures)
+
+        return closures[word]
+
+    def close_component(self, component, edges, closures):
+        """
+        Finds the closure of each node in this strongly connected
+        component, from the closures of the morphemes below it.
+
+        :param component: List[str], nodes of component, in order visited
+        :param edges: dict(str, List[str]), morphemes in each node's etymology
+        :param closures: dict(str, Tuple(str)), closures found so far
+        :return: None
+        """
+        members = set(component)
+        below = list()
+        seen = set()
+
+        for node in component:
+            for morpheme in edges[node]:
+                if morpheme not in members:
+                    for submorpheme in closures[morpheme]:
+                        if submorpheme not in seen:
+                            seen.add(submorpheme)
+                            below.append(submorpheme)
+
+        for node in component:
+            closures[node] = (node,) + tuple(member for member in component if member != node) + tuple(below)
+
+    def reindex(self, word, language, old_entry, new_entry):
+        """
+        Forgets the closures found from this word's entry in this
+        language, and those of every node with a path to them,
+        when the entry appears, disappears or its etymology changes.
+
+        :param word: str, word of changed entry
+        :param language: str, language of changed entry
+        :param old_entry: Optional[dict], language entry before change
+        :param new_entry: Optional[dict], language entry after change
+        :return: None
+        """
+        if old_entry is not None and new_entry is not None and \
+                old_entry.get(self.HEADING, None) == new_entry.get(self.HEADING, None):
+            return
+
+        closures = self.closures.get(language, dict())
+        parents = self.parents.get(language, dict())
+        stale = list(self.readers.get(language, dict()).pop(self.store.unicodize(word), ()))
+        while len(stale) != 0:
+            node = stale.pop()
+            if closures.pop(node, None) is not None:
+                stale.extend(parents.pop(node, ()))
+
+    def persist(self):
+        """
+        Does nothing, as closures are only kept in memory.
+
+        :return: None
+        """
+        return
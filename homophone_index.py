@@ -0,0 +1,323 @@
+# coding: utf-8
+"""
+HOMOPHONE_INDEX:
+
+    Contains VPTree class for nearest-neighbour search under
+    a metric, NgramIndex class for finding pronunciations sharing
+    many phoneme n-grams, HomophoneIndex class for finding the
+    words of a language which sound nearest to a pronunciation,
+    and nearest_in_rows for finding the nearest without an index.
+"""
+import heapq
+import random
+import numpy as np
+from phonetic_distance import phonetic_distance, INFINITY
+
+
+class VPTree:
+    """
+    A vantage-point tree over points under a metric distance.
+    ~
+    Each node picks a vantage point and splits the other points
+    at their median distance from it.  A search can then skip
+    any side of a node which the triangle inequality shows is
+    too far away to hold a nearer point than those found so far.
+    ~
+    Internal nodes are tuples (vantage, radius, inside, outside),
+    where inside holds the points nearer than radius to vantage,
+    and leaves are lists of up to LEAF_SIZE points.
+    """
+    LEAF_SIZE = 8
+
+    def __init__(self, points, distance, seed=0):
+        """
+        Initializes this VPTree over the given points.
+
+        :param points: List[X], points to search
+        :param distance: function, metric distance between 2 points
+        :param seed: int, seed for choosing vantage points
+        """
+        self.distance = distance
+        self.random = random.Random(seed)
+        self.size = len(points)
+        self.root = self.build(list(points))
+
+    def build(self, points):
+        """
+        Returns a node holding the given points.
+
+        :param points: List[X], points to hold
+        :return: tuple|list, node over points
+        """
+        if len(points) <= self.LEAF_SIZE:
+            return points
+
+        idx = self.random.randrange(len(points))
+        points[idx], points[-1] = points[-1], points[idx]
+        vantage = points.pop()
+
+        distances = [(self.distance(vantage, point), point) for point in points]
+        distances.sort(key=lambda pair: pair[0])
+        middle = len(distances) // 2
+        radius = distances[middle][0]
+
+        inside = [point for dist, point in distances if dist < radius]
+        outside = [point for dist, point in distances if dist >= radius]
+        return vantage, radius, self.build(inside), self.build(outside)
+
+    def nearest(self, query, k):
+        """
+        Returns the k points nearest to query, with their
+        distances, from nearest to farthest.
+
+        :param query: X, point to search near
+        :param k: int, number of points to return
+        :return: List[tuple(float, X)], distances & nearest points
+        """
+        if k <= 0:
+            return list()
+
+        found = list()  # heap of (-distance, order, point), farthest first
+        order = [0]
+
+        def consider(point):
+            dist = self.distance(query, point)
+            if len(found) < k:
+                heapq.heappush(found, (-dist, order[0], point))
+            elif dist < -found[0][0]:
+                heapq.heapreplace(found, (-dist, order[0], point))
+            order[0] += 1
+            return dist
+
+        def bound():
+            return -found[0][0] if len(found) == k else float("inf")
+
+        def search(node):
+            if isinstance(node, list):
+                for point in node:
+                    consider(point)
+                return
+
+            vantage, radius, inside, outside = node
+            dist = consider(vantage)
+            if dist < radius:
+                search(inside)
+                if dist + bound() >= radius:
+                    search(outside)
+            else:
+                search(outside)
+                if dist - bound() < radius:
+                    search(inside)
+
+        search(self.root)
+        return [(-neg_dist, point) for neg_dist, idx, point in sorted(found, reverse=True)]
+
+    def __len__(self):
+        return self.size
+
+
+class NgramIndex:
+    """
+    An inverted index from each phoneme n-gram to the ids of
+    the points (sequences of phonemes) containing it.
+    ~
+    Points are padded with BOUNDARY at both ends, so n-grams at
+    the start or end of a point only match those at the start or
+    end of another.  Each edit to a point changes at most n of its
+    n-grams, so points missing few of a query's n-grams (or having
+    few the query is missing) are likely to be few edits away.
+    Candidates for a query are the points missing the fewest,
+    counted for every point at once from the postings.
+    """
+    BOUNDARY = None
+
+    def __init__(self, points, n=2):
+        """
+        Initializes this NgramIndex over the given points.
+
+        :param points: List[Tuple(unicode)], points to index
+        :param n: int, number of phonemes in each n-gram
+        """
+        self.points = points
+        self.n = n
+        postings = dict()   # n-gram -> ids of points containing it
+        self.sizes = np.empty(len(points), dtype=np.intp)  # number of distinct n-grams in each point
+
+        for idx, point in enumerate(points):
+            grams = self.ngrams(point)
+            self.sizes[idx] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, list()).append(idx)
+
+        self.postings = dict((gram, np.array(ids, dtype=np.intp)) for gram, ids in postings.iteritems())
+
+    def ngrams(self, phonemes):
+        """
+        Returns the distinct n-grams of these phonemes,
+        padded with BOUNDARY.
+
+        :param phonemes: Tuple(unicode), phonemes to split
+        :return: Set(Tuple), n-grams of phonemes
+        """
+        padded = (self.BOUNDARY,) * (self.n - 1) + tuple(phonemes) + (self.BOUNDARY,) * (self.n - 1)
+        return set(padded[i:i + self.n] for i in xrange(max(1, len(padded) - self.n + 1)))
+
+    def candidates(self, phonemes, limit):
+        """
+        Returns the ids of up to limit points whose n-grams differ
+        least from these phonemes', from most to least similar.
+        ~
+        Points are ranked by how many n-grams the larger of their
+        n-grams & the phonemes' has beyond those they share.  Points
+        sharing no n-grams are never candidates.
+
+        :param phonemes: Tuple(unicode), phonemes to search near
+        :param limit: int, most candidates to return
+        :return: np.ndarray, ids of candidate points
+        """
+        grams = self.ngrams(phonemes)
+        postings = [self.postings[gram] for gram in grams if gram in self.postings]
+        if len(postings) == 0 or limit <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.points))
+        missing = np.maximum(len(grams), self.sizes) - shared
+        ids = np.flatnonzero(shared)
+        if len(ids) > limit:
+            ids = ids[np.argpartition(missing[ids], limit - 1)[:limit]]
+        return ids[np.argsort(missing[ids], kind="mergesort")]
+
+    def __len__(self):
+        return len(self.points)
+
+
+def nearest_in_rows(phonemes, rows):
+    """
+    Returns the row whose phonemes are nearest to the given
+    phonemes by phonetic_distance, and its distance.
+    ~
+    Each distance is bounded by the nearest distance found so far,
+    so farther rows are given up on early.  Ties go to the row found
+    first, and an exact match ends the search.
+
+    :param phonemes: Tuple(unicode), phonemes to search near
+    :param rows: List[tuple(str, unicode, Tuple(unicode))], words, cleaned IPAs & phonemes
+    :return: tuple(tuple, float), nearest row & its distance, or (None, None) if no rows
+    """
+    nearest_row = None
+    nearest = None
+
+    for row in rows:
+        dist = phonetic_distance(phonemes, row[2], nearest)
+        if nearest is None or dist < nearest:
+            nearest_row, nearest = row, dist
+            if dist == 0:
+                break
+
+    return nearest_row, nearest
+
+
+class HomophoneIndex:
+    """
+    A class for finding the words of a language whose
+    pronunciations sound nearest to a given pronunciation.
+    ~
+    Built from an IPAIndex's rows of (word, cleaned IPA, phonemes).
+    Words with the same IPA share one point.  Exact searches use a
+    VPTree of the points under phonetic_distance, so a query compares
+    against far fewer pronunciations than the whole language holds.
+    ~
+    Approximate searches only rescore the candidates an NgramIndex
+    finds, trading recall for speed: the more candidates, the more
+    likely the true nearest words are among them.  Each structure is
+    built the first time a search needs it.
+    """
+    def __init__(self, rows, version=None, n=2):
+        """
+        Initializes this HomophoneIndex over the given rows.
+
+        :param rows: List[tuple(str, unicode, Tuple(unicode))], words, cleaned IPAs & phonemes
+        :param version: X, version of the rows this index was built from
+        :param n: int, number of phonemes in each n-gram of the NgramIndex
+        """
+        self.version = version
+        self.n = n
+        self.words = dict()     # phonemes -> words pronounced with them
+        for word, ipa, phonemes in rows:
+            self.words.setdefault(phonemes, list()).append(word)
+        self.points = sorted(self.words)
+        self.tree = None
+        self.ngram_index = None
+
+    def find_tree(self):
+        """
+        Returns this HomophoneIndex's VPTree, building it
+        if not done already.
+
+        :return: VPTree, tree of points
+        """
+        if self.tree is None:
+            self.tree = VPTree(self.points, phonetic_distance)
+        return self.tree
+
+    def find_ngram_index(self):
+        """
+        Returns this HomophoneIndex's NgramIndex, building it
+        if not done already.
+
+        :return: NgramIndex, n-gram index of points
+        """
+        if self.ngram_index is None:
+            self.ngram_index = NgramIndex(self.points, self.n)
+        return self.ngram_index
+
+    def rescore(self, phonemes, points, k):
+        """
+        Returns the k of these points nearest to these phonemes,
+        with their distances, from nearest to farthest.
+
+        :param phonemes: Tuple(unicode), phonemes to search near
+        :param points: List[Tuple(unicode)], points to compare with phonemes
+        :param k: int, number of points to return
+        :return: List[tuple(float, Tuple(unicode))], distances & nearest points
+        """
+        found = list()  # heap of (-distance, order, point), farthest first
+        for order, point in enumerate(points):
+            limit = -found[0][0] if len(found) == k else None
+            dist = phonetic_distance(phonemes, point, limit)
+            if dist == INFINITY:
+                continue
+            if len(found) < k:
+                heapq.heappush(found, (-dist, order, point))
+            elif dist < limit:
+                heapq.heapreplace(found, (-dist, order, point))
+        return [(-neg_dist, point) for neg_dist, order, point in sorted(found, reverse=True)]
+
+    def nearest(self, phonemes, k, candidates=None):
+        """
+        Returns the k words nearest in sound to these phonemes,
+        with their distances, from nearest to farthest.
+        ~
+        If candidates is given, only that many pronunciations found
+        by the NgramIndex are compared with the phonemes, so fewer
+        words may be returned, or not the nearest ones.
+
+        :param phonemes: Tuple(unicode), phonemes to search near
+        :param k: int, number of words to return
+        :param candidates: Optional[int], number of candidates to rescore, or None for an exact search
+        :return: List[tuple(float, str)], distances & nearest words
+        """
+        phonemes = tuple(phonemes)
+        if candidates is None:
+            points = self.find_tree().nearest(phonemes, k)
+        elif k <= 0:
+            points = list()
+        else:
+            ids = self.find_ngram_index().candidates(phonemes, max(k, candidates))
+            points = self.rescore(phonemes, [self.points[idx] for idx in ids], k)
+
+        nearest = list()
+        for dist, point in points:
+            for word in sorted(self.words[point]):
+                nearest.append((dist, word))
+        return nearest[:k]
@@ -0,0 +1,222 @@
+# coding: utf-8
+"""
+HOMOPHONE_JOB:
+
+    Contains HomophoneJob class for finding the nearest homophones
+    in one language for a whole list of words in another, on a pool
+    of processes, writing each result as a line of JSON.
+
+    Usage:
+        python homophone_job.py WORDS SOURCE_LANGUAGE TARGET_LANGUAGE OUTPUT [-p PROCESSES] [-c CHUNK_SIZE]
+
+    WORDS holds one word per line.  If OUTPUT already holds results,
+    as after an interrupted run, only the words missing from it are
+    searched for and their results appended.
+"""
+import os
+import json
+import codecs
+import argparse
+import multiprocessing
+from collections import deque
+from homophone_index import nearest_in_rows
+
+worker_rows = None  # each pool process's rows of the target language, set by init_worker
+
+
+def init_worker(rows):
+    """
+    Gives this pool process the rows of the target language
+    to search for homophones in.
+
+    :param rows: List[tuple(str, unicode, Tuple(unicode))], words, cleaned IPAs & phonemes
+    :return: None
+    """
+    global worker_rows
+    worker_rows = rows
+
+
+def find_homophones(chunk):
+    """
+    Returns the result of searching the target language for
+    the nearest homophone of each word in this chunk.
+    ~
+    Words without an IPA are not searched for, and get a
+    result with no homophone & no distance.
+
+    :param chunk: List[tuple(unicode, Optional[unicode], Optional[Tuple(unicode)])], words, cleaned IPAs & phonemes
+    :return: List[dict], results for each word in chunk
+    """
+    results = list()
+    for word, ipa, phonemes in chunk:
+        result = {"word": word, "ipa": ipa, "homophone": None, "homophone_ipa": None, "distance": None}
+        if phonemes is not None:
+            row, result["distance"] = nearest_in_rows(phonemes, worker_rows)
+            if row is not None:
+                result["homophone"], result["homophone_ipa"] = row[0], row[1]
+        results.append(result)
+    return results
+
+
+class HomophoneJob:
+    """
+    A class for finding the nearest homophone in a target language
+    for each of many words in an IPAParser's language.
+    ~
+    Words are looked up in the main process and searched for in
+    chunks on a pool of processes, each holding its own copy of
+    the target language's rows, while the next chunk is looked up.
+    Each result is written to the output file as a line of JSON
+    once its chunk and every chunk before it are done, so the
+    output file is also the job's checkpoint: a job run again on
+    the same file skips every word already in it.
+    """
+    def __init__(self, parser, language, path, processes=None, chunk_size=50):
+        """
+        Initializes this HomophoneJob for homophones in the given
+        language, written to the file at path.
+
+        :param parser: IPAParser, parser of the words' language
+        :param language: str, language to find homophones in
+        :param path: str, path of JSON lines file to write results to
+        :param processes: Optional[int], number of processes to search with (default: all cores)
+        :param chunk_size: int, number of words searched for in each task
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.parser = parser
+        self.language = language
+        self.path = path
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+    def done_words(self):
+        """
+        Returns the words with results in this HomophoneJob's
+        output file, cutting off any line left half-written.
+
+        :return: Set(unicode), words already searched for
+        """
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+
+        end = 0
+        with open(self.path, "rb") as output:
+            for line in output:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["word"])
+                except ValueError:
+                    break
+                end += len(line)
+
+        if end != os.path.getsize(self.path):
+            with open(self.path, "r+b") as output:
+                output.truncate(end)
+        return done
+
+    def word_row(self, word):
+        """
+        Returns this word's row of (word, cleaned IPA, phonemes),
+        with None for the IPA & phonemes if it has no IPA.
+
+        :param word: unicode, word to look up
+        :return: tuple(unicode, Optional[unicode], Optional[Tuple(unicode)]), word's row
+        """
+        ipa = self.parser.word_ipa(word)
+        if ipa is None:
+            return word, None, None
+        ipa = self.parser.clean_ipa(ipa, scrub=True)
+        return word, ipa, self.parser.ipa_index.ipa_phonemes(ipa)
+
+    def chunks(self, words):
+        """
+        Yields each chunk of these words' rows to search for,
+        in the order of words.
+        ~
+        Words without an IPA stay in their chunks, so their results
+        are written in order with the rest.
+
+        :param words: List[unicode], words to look up
+        :return: Iterator[List[tuple]], chunks of rows
+        """
+        chunk = list()
+        for word in words:
+            chunk.append(self.word_row(word))
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = list()
+        if len(chunk) != 0:
+            yield chunk
+
+    def run(self, words):
+        """
+        Searches for the nearest homophone of each of these words
+        not yet in this HomophoneJob's output file, and appends
+        their results to it.
+
+        :param words: List[str], words to find homophones for
+        :return: int, number of results written
+        """
+        done = self.done_words()
+        todo = list()
+        for word in words:
+            word = self.parser.unicodize(word)
+            if word not in done:
+                done.add(word)
+                todo.append(word)
+        if len(todo) == 0:
+            return 0
+
+        rows = self.parser.ipa_index.rows(self.language)
+        pool = multiprocessing.Pool(self.processes, init_worker, (rows,))
+        tasks = deque()
+
+        try:
+            with codecs.open(self.path, "a", "utf-8") as output:
+                for chunk in self.chunks(todo):
+                    tasks.append(pool.apply_async(find_homophones, [chunk]))
+                    while len(tasks) != 0 and tasks[0].ready():
+                        self.write_results(output, tasks.popleft().get())
+                while len(tasks) != 0:
+                    self.write_results(output, tasks.popleft().get())
+        finally:
+            pool.terminate()
+            self.parser.refresh_wiktionary_entries()
+        return len(todo)
+
+    def write_results(self, output, results):
+        """
+        Writes these results to output as lines of JSON.
+
+        :param output: file, output file to write to
+        :param results: List[dict], results to write
+        :return: None
+        """
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + u"\n")
+        output.flush()
+
+
+if __name__ == "__main__":
+    from ipa_parser import IPAParser
+
+    arg_parser = argparse.ArgumentParser(description="Find the nearest homophones in one language "
+                                                     "for a list of words in another.")
+    arg_parser.add_argument("words", help="file of words to find homophones for, one per line")
+    arg_parser.add_argument("source", help="language of words")
+    arg_parser.add_argument("target", help="language to find homophones in")
+    arg_parser.add_argument("output", help="JSON lines file to write or resume results in")
+    arg_parser.add_argument("-p", "--processes", type=int, default=None,
+                            help="number of processes to search with (default: all cores)")
+    arg_parser.add_argument("-c", "--chunk-size", type=int, default=50,
+                            help="number of words searched for in each task")
+    args = arg_parser.parse_args()
+
+    with codecs.open(args.words, "r", "utf-8") as word_file:
+        words = [line.strip() for line in word_file if len(line.strip()) != 0]
+    job = HomophoneJob(IPAParser(args.source), args.target, args.output,
+                       args.processes, args.chunk_size)
+    print "%d results written to %s" % (job.run(words), args.output)
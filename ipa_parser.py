@@ -5,6 +5,9 @@ IPA_PARSER:
     Contains IPAParser class for parsing IPA pronunciation data.
 """
 from morpheme_parser import *
+from homophone_index import HomophoneIndex, nearest_in_rows
+from trie import Trie
+import phoneme_features
 
 
 class IPAParser(MorphemeParser):
@@ -17,6 +20,8 @@ class IPAParser(MorphemeParser):
         self.vowels = OrderedSet([])
         self.consonants = OrderedSet([])
         self.phoneme_dict = {}
+        self.phoneme_trie = self.build_phoneme_trie()
+        self.homophone_indexes = dict()     # language -> HomophoneIndex
 
     def merge_dicts(self, first, other):
         """
@@ -42,7 +47,12 @@ class IPAParser(MorphemeParser):
     def nearest_homophones(self, word, language):
         """
         Returns the nearest homophones in the given language
-        to the given word in this IPAParser's native language.
+        to the given word in this IPAParser's native language,
+        one for each of the word's pronunciations.
+        ~
+        Pronunciations are compared by phonetic_distance, bounded
+        by the nearest distance found so far so that farther words
+        are given up on early.  Ties go to the word found first.
 
         :param word: str, word in IPAParser's native language
         :param language: str, language of desired output homophones
@@ -53,27 +63,13 @@ class IPAParser(MorphemeParser):
         homophones = list()
 
         if len(word_ipas) != 0:
-            foreign = self.all_ipas(language)
+            foreign = self.ipa_index.rows(language)
 
             for word_ipa in word_ipas:
-                homophone = None
-
-                for fw in foreign:
-                    ipas = foreign[fw]
-
-                    if len(ipas) != 0:
-                        ipa = self.clean_ipa(ipas[0], scrub=True)
-                        if homophone is None:
-                            homophone = IPAWord(fw, language, parser=self)
-                            continue
-                        homo = self.nearer_homophone(word_ipa, homophone.get_cleaned_ipa(), ipa)
-                        if homo == ipa:
-                            homophone = IPAWord(fw, language, parser=self)
-                        if word_ipa == ipa:
-                            break
+                homophone = self.nearest_row(self.ipa_index.ipa_phonemes(word_ipa), foreign)
 
                 if homophone is not None:
-                    homophones.append(homophone.word)
+                    homophones.append(homophone)
 
         if len(homophones) == 0:
             homophones.append(None)
@@ -85,6 +81,8 @@ class IPAParser(MorphemeParser):
         Returns the nearest homophone in the given language
         to the given word in this IPAParser's native language.
         ~
+        Pronunciations are compared as in nearest_homophones.
+        ~
         e.g. nearest_homophone("droit", "English") -> "draw"
 
         :param word: str, word in IPAParser's native language
@@ -96,28 +94,68 @@ class IPAParser(MorphemeParser):
 
         if word_ipa is not None:
             word_ipa = self.clean_ipa(word_ipa, scrub=True)
-            foreign = self.all_ipas(language)
-
-            for fw in foreign:
-                ipas = foreign[fw]
-
-                if len(ipas) != 0:
-                    ipa = self.clean_ipa(ipas[0], scrub=True)
-                    if homophone is None:
-                        homophone = IPAWord(fw, language, parser=self)
-                        continue
-                    elif word_ipa == ipa:
-                        return fw
-                    else:
-                        homo = self.nearer_homophone(word_ipa, homophone.get_cleaned_ipa(), ipa)
-                        if homo == ipa:
-                            homophone = IPAWord(fw, language, parser=self)
-
-            if homophone is not None:
-                return homophone.word
+            phonemes = self.ipa_index.ipa_phonemes(word_ipa)
+            homophone = self.nearest_row(phonemes, self.ipa_index.rows(language))
 
         return homophone
 
+    def nearest_row(self, phonemes, rows):
+        """
+        Returns the word in these rows whose phonemes are
+        nearest to the given phonemes by phonetic_distance,
+        or None if there are no rows.
+
+        :param phonemes: Tuple(unicode), phonemes to search near
+        :param rows: List[tuple(str, unicode, Tuple(unicode))], words, cleaned IPAs & phonemes
+        :return: Optional[str], nearest word in rows
+        """
+        row, dist = nearest_in_rows(phonemes, rows)
+        if row is not None:
+            return row[0]
+
+    def top_k_homophones(self, word, language, k=10, candidates=None):
+        """
+        Returns the k words in the given language which sound
+        nearest to the given word in this IPAParser's native
+        language, from nearest to farthest.
+        ~
+        Words are compared by phonetic_distance between their
+        cleaned IPAs, searched in the language's HomophoneIndex.
+        If candidates is given, only that many words sharing the
+        most phoneme n-grams with the word are compared, which is
+        faster for large languages but may miss nearer words.
+        ~
+        e.g. top_k_homophones("talo", "English", 2) -> ["tallow", "taller"]
+
+        :param word: str, word in IPAParser's native language
+        :param language: str, language of desired output homophones
+        :param k: int, number of homophones to return
+        :param candidates: Optional[int], number of candidates to compare, or None for all
+        :return: List[str], k nearest homophones for word in given language
+        """
+        word_ipa = self.word_ipa(word)
+        if word_ipa is None:
+            return list()
+
+        phonemes = self.ipa_index.ipa_phonemes(self.clean_ipa(word_ipa, scrub=True))
+        homophone_index = self.find_homophone_index(language)
+        return [homophone for dist, homophone in homophone_index.nearest(phonemes, k, candidates)]
+
+    def find_homophone_index(self, language):
+        """
+        Returns the HomophoneIndex for the given language,
+        building it again if its IPAs changed since it was built.
+
+        :param language: str, language of HomophoneIndex
+        :return: HomophoneIndex, index of language's pronunciations
+        """
+        version = self.ipa_index.version(language)
+        homophone_index = self.homophone_indexes.get(language, None)
+        if homophone_index is None or homophone_index.version != version:
+            homophone_index = HomophoneIndex(self.ipa_index.rows(language), version)
+            self.homophone_indexes[language] = homophone_index
+        return homophone_index
+
     def nearer_homophone(self, ipa, ipa1, ipa2):
         """
         If ipa1 is closer to ipa than ipa2,
@@ -142,46 +180,24 @@ class IPAParser(MorphemeParser):
             sim1 += self.same_ipas(ipa, ipa1)
             sim2 += self.same_ipas(ipa, ipa2)
 
-            print ipa, "vs", ipa1, ":\t", sim1
-            print ipa, "vs", ipa2, ":\t", sim2
-
             if sim1 >= sim2:
-                print "winner:", ipa1
                 return ipa1
             else:
-                print "winner:", ipa2
                 return ipa2
 
     def same_ipas(self, ipa1, ipa2):
         """
         Returns an integer representing the number of IPA characters
         shared at the same indices by ipa1 and ipa2.
+        ~
+        IPALetters at the same index score their IPALetter.compare
+        similarity, looked up in phoneme_features.SIMILARITIES.
 
         :param ipa1: str, first string to compare
         :param ipa2: str, second string to compare
         :return: int, number of IPA characters shared by ipa1 and ipa2
         """
-        sims = 0
-        i = 0
-
-        try:
-            while True:
-                char1 = ipa1[i]
-                char2 = ipa2[i]
-
-                letter1 = self.ipa_to_ipaletter(char1)
-                letter2 = self.ipa_to_ipaletter(char2)
-
-                if letter1 is None or letter2 is None:
-                    sims += (ipa1[i] == ipa2[i])
-                else:
-                    add = letter1.compare(letter2)
-                    sims += add
-
-                i += 1
-        except IndexError:
-            pass
-
+        sims = phoneme_features.same_ipas(self.unicodize(ipa1), self.unicodize(ipa2))
         sims -= abs(len(ipa1) - len(ipa2))
         return sims
 
@@ -362,6 +378,10 @@ class IPAParser(MorphemeParser):
         ~
         N.B. Phonemes are in a language's native lettering system,
         while their forms are in IPA.
+        ~
+        phoneme_trie is rebuilt from the merged phoneme_dict, so it
+        learns phonemes found by IPAWords of any parser and forgets
+        those merge_dicts dropped.
 
         :param ipa_words: Set(IPAWord), IPAWords to return phonemes of
         :return: dict, where...
@@ -374,8 +394,115 @@ class IPAParser(MorphemeParser):
             phoneme_dict = ipa_word.find_phoneme_dict()
             self.phoneme_dict = self.merge_dicts(self.phoneme_dict, phoneme_dict)
 
+        self.phoneme_trie = self.build_phoneme_trie()
         return self.phoneme_dict
 
+    # PHONEME TOKENIZER
+    # -----------------
+    def build_phoneme_trie(self):
+        """
+        Returns a Trie of every IPA letter and every phoneme
+        learned in this IPAParser's phoneme_dict, each with
+        whether it is a vowel.
+
+        :return: Trie, IPA phonemes & whether each is a vowel
+        """
+        trie = Trie((symbol, letter.is_vowel) for symbol, letter in IPALETTERS.iteritems())
+        for ipas in self.phoneme_dict.itervalues():
+            for ipa in ipas:
+                self.learn_phoneme(ipa, trie)
+        return trie
+
+    def learn_phoneme(self, ipa, trie=None):
+        """
+        Adds this IPA phoneme to the given Trie (by default
+        this IPAParser's phoneme_trie), if its IPA letters are
+        all vowels or all consonants.
+
+        :param ipa: unicode, IPA phoneme to add
+        :param trie: Optional[Trie], trie to add phoneme to
+        :return: None
+        """
+        if trie is None:
+            trie = self.phoneme_trie
+        if len(ipa) < 2 or ipa in trie:
+            return
+
+        are_vowels = set(IPALETTERS[sym].is_vowel for sym in ipa if sym in IPALETTERS)
+        if len(are_vowels) == 1:
+            trie.add(ipa, are_vowels.pop())
+
+    def match_phoneme(self, ipa, start=0, stop=None):
+        """
+        Returns the end of the phoneme starting at start in ipa,
+        and whether it is a vowel.
+        ~
+        The phoneme is the longest one in phoneme_trie starting
+        there, or its first character if none does, along with any
+        diacritics after it and any phoneme tied on to it (as in
+        the affricate "t͡ɕ").
+
+        :param ipa: unicode, IPA to find phoneme in
+        :param start: int, index of ipa where phoneme starts
+        :param stop: Optional[int], index of ipa where phoneme must end by
+        :return: tuple(int, bool), end of phoneme & whether it is a vowel (None if unknown)
+        """
+        if stop is None:
+            stop = len(ipa)
+        end, is_vowel = self.phoneme_trie.longest_match(ipa, start, stop)
+        if end == start:
+            end += 1
+
+        while end < stop and ipa[end] in SYMBOLS and ipa[end] not in self.STRESS_MARKS:
+            if ipa[end] in AFFRICATES and end + 1 < stop:
+                tied_end, tied_is_vowel = self.phoneme_trie.longest_match(ipa, end + 1, stop)
+                end = max(tied_end, end + 2)
+            else:
+                end += 1
+
+        return end, is_vowel
+
+    def ipa_spans(self, ipa):
+        """
+        Returns the span of each phoneme in this IPA, in order,
+        with whether it is a vowel.  Stress & syllable marks are
+        skipped, and no phoneme spans them.
+
+        :param ipa: unicode, IPA to split into phonemes
+        :return: List[tuple(int, int, bool)], start & end of each phoneme & whether it is a vowel
+        """
+        spans = list()
+        marks = self.STRESS_MARKS + u"."
+        start = 0
+
+        while start < len(ipa):
+            if ipa[start] in marks:
+                start += 1
+                continue
+            stop = start + 1
+            while stop < len(ipa) and ipa[stop] not in marks:
+                stop += 1
+            while start < stop:
+                end, is_vowel = self.match_phoneme(ipa, start, stop)
+                spans.append((start, end, is_vowel))
+                start = end
+
+        return spans
+
+    def ipa_phonemes(self, ipa, use_syllables=True):
+        """
+        Returns the phonemes of this IPA, in order.
+        ~
+        e.g. ipa_phonemes("ɔˈba.lat͡ɕ") -> ["ɔ", "b", "a", "l", "a", "t͡ɕ"]
+
+        :param ipa: unicode, IPA to split into phonemes
+        :param use_syllables: bool, whether to keep ipa's diacritics & markers
+        :return: List[unicode], phonemes of IPA
+        """
+        if not use_syllables:
+            ipa = self.clean_ipa(ipa)
+        return [ipa[start:end] for start, end, is_vowel in self.ipa_spans(ipa)]
+
     def next_phoneme(self, ipa, remove=True, use_syllables=True):
         """
         Returns the given ipa's next phoneme.
@@ -383,49 +510,32 @@ class IPAParser(MorphemeParser):
         If remove is set to True, this method finds and
         removes ipa's first phoneme, returning a 2-tuple of
         1) the phoneme and 2) given ipa with phoneme removed.
+        If use_syllables is False, ipa is cleaned first.
         ~
-        e.g. next_phoneme("ɔˈba.lat͡ɕ") -> ("ɔ", "balat͡ɕ")
+        e.g. next_phoneme("ɔˈba.lat͡ɕ") -> ("ɔ", "ˈba.lat͡ɕ")
 
         :param ipa: unicode, IPA word to return next phoneme of
         :param remove: bool, whether to return ipa with vowels removed
         :param use_syllables: bool, whether to calculate next phoneme with ipa's syllables
         :return: tuple((both unicode) str, str), IPA's first phoneme and rest of IPA
         """
-        phoneme = str()  # next phoneme so far
+        if not use_syllables:
+            ipa = self.clean_ipa(ipa)
 
-        if len(ipa) == 0:
-            next_phoneme = (phoneme, ipa) if remove else phoneme
-            return next_phoneme
-
-        if use_syllables:
-            # ensure uniform stress marks
-            new_ipa = self.restress(ipa)
-            # end ipa @ 1st syllable marker
-            new_ipa = new_ipa.split(u".", 1)[0]
-        else:
-            new_ipa = self.clean_ipa(ipa)
-
-        # search for polyphonemes first
-        end = 1
-        # TODO: change to end <= min([longest IPA phoneme in phoneme_dict], len(new_ipa))
-        while end <= 3:
-            new_sym = new_ipa[:end]
-            filtered_sym = "".join(filter((lambda x: x if x not in SEMIVOWELS else ""), new_sym))
-            # check to make sure phonemes are all vowels xor all consonants
-            are_vowels = self.is_ipa_vowel(filtered_sym)
-            if are_vowels is None:
-                end -= 1
-                break
-            elif self.is_ipa_phoneme(new_sym):
-                phoneme = new_sym
-            end += 1
+        marks = self.STRESS_MARKS + u"."
+        start = 0
+        while start < len(ipa) and ipa[start] in marks:
+            start += 1
+        stop = start
+        while stop < len(ipa) and ipa[stop] not in marks:
+            stop += 1
 
-        # if no polyphonemes found,
-        # set phoneme to first IPA character
-        if len(phoneme) == 0:
-            phoneme = new_ipa[0]
-            end = 1
+        if start == stop:
+            end = len(ipa)
+        else:
+            end, is_vowel = self.match_phoneme(ipa, start, stop)
 
+        phoneme = ipa[start:end] if start != stop else ipa[:0]
         next_phoneme = (phoneme, ipa[end:]) if remove else phoneme
         return next_phoneme
 
@@ -444,7 +554,7 @@ class IPAParser(MorphemeParser):
         :return: bool, whether given character(s) are a vowel
         """
         if chars in self.phoneme_dict:
-            return chars in self.vowels.get_items()
+            return chars in self.vowels
 
     def is_letter_consonant(self, chars):
         """
@@ -459,7 +569,7 @@ class IPAParser(MorphemeParser):
         :return: bool, whether given character(s) are a consonant
         """
         if chars in self.phoneme_dict:
-            return chars in self.consonants.get_items()
+            return chars in self.consonants
 
     def is_letter_phoneme(self, chars):
         """
@@ -524,16 +634,10 @@ class IPAParser(MorphemeParser):
         :param ipa: unicode, IPA symbol to determine whether phoneme
         :return: bool, whether given IPA symbol is a phoneme
         """
-        for phoneme in self.phoneme_dict:
-            items = self.phoneme_dict[phoneme]
-            for item in iter(items):
-                if ipa == item:
-                    return True
+        if any(ipa in items for items in self.phoneme_dict.itervalues()):
+            return True
         else:
-            if self.is_ipa_vowel(ipa) is not None:
-                return True
-            else:
-                return False
+            return self.is_ipa_vowel(ipa) is not None
 
     def add_vowel(self, chars):
         """
@@ -566,6 +670,7 @@ class IPAParser(MorphemeParser):
         """
         self.phoneme_dict.setdefault(chars, OrderedSet([]))
         self.phoneme_dict[chars].add(ipas)
+        self.learn_phoneme(ipas)
 
     def destress(self, ipa):
         """
@@ -1042,17 +1147,7 @@ class IPAWord:
         :param use_syllables: bool, whether to calculate phonemes with ipa's syllables
         :return: List[(unicode) str], this IPAWord's phonemes in IPA
         """
-        if len(ipa) == 0:
-            return []
-        else:
-            phonemes = []
-            next_ipa = ipa
-
-            while len(next_ipa) != 0:
-                next_phoneme, next_ipa = self.parser.next_phoneme(next_ipa, use_syllables)
-                phonemes.append(next_phoneme)
-
-            return phonemes
+        return self.parser.ipa_phonemes(ipa, use_syllables)
 
     def find_word_phonemes(self, word, ipa):
         """
@@ -1264,14 +1359,9 @@ class IPAWord:
         :param ipa: (unicode) str, IPA to add syllable marks to
         :return: (unicode) str, IPA with syllable marks added
         """
-        syllables = []
-        next_ipa = ipa
-
-        while len(next_ipa) != 0:
-            syllable, next_ipa = self.parser.next_syllable(next_ipa)
-            syllables.append(syllable)
-
-        return u".".join(syllables)
+        if len(ipa) == 0:
+            return ipa
+        return u".".join(self.parser.split_syllables(ipa, use_syllables=False))
 
     def equal_word_ipa_syllables(self, word, ipa):
         """
@@ -1356,6 +1446,18 @@ class IPAWord:
         """
         Returns number of syllables in the given IPA.
 
+        :param ipa: (unicode) str, IPA to count syllables of
+        :return: int, number of syllables in word with given IPA
+        """
+        return self.parser.cached_syllables("count_ipa_syllables", ipa, True,
+                                            lambda: self.find_ipa_syllables_count(ipa))
+
+    def find_ipa_syllables_count(self, ipa):
+        """
+        Returns number of syllables in the given IPA, as
+        count_ipa_syllables but without looking in the
+        parser's syllable_cache.
+
         :param ipa: (unicode) str, IPA to count syllables of
         :return: int, number of syllables in word with given IPA
         """
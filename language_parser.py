@@ -6,11 +6,16 @@ LANGUAGE_PARSER:
     a particular language from Wiktionary.
 """
 from wiktionary_parser import *
+from lexicon import Lexicon, CompiledLexicon, compile_lexicon
+from suffix_array import SuffixArray
 
 
 class LanguageParser(WiktionaryParser):
     ALPHABETS = {}
     LEXICA = {}
+    COMPILED_LEXICA = {}    # path -> CompiledLexicon
+    FREQUENCY_PATH = WiktionaryParser.PATH + "/resources/frequency_words/content/2016/%s/%s_%s.txt"
+    LEXICA_PATH = WiktionaryParser.PATH + "/resources/cache/lexica"
 
     def __init__(self, language):
         WiktionaryParser.__init__(self)
@@ -18,14 +23,14 @@ class LanguageParser(WiktionaryParser):
         self.url = self.url % self.language
 
         # --> lexica
-        self.lexicon = self.init_lexicon(self.language)
-        self.add_lexicon(self.language, self.lexicon)
+        self.lexicon = self.find_lexicon(self.language)
         # --> alphabets
         self.alphabets = self.fetch_alphabets()
         self.alphabet = self.find_alphabet(self.language)
 
         self.wordnet_words = self.get_wordnet_words()
         self.words = self.wordnet_words.intersection(self.lexicon)
+        self.suffix_arrays = dict()     # language -> SuffixArray, built by find_suffix_array
 
     def reset_language(self, language):
         """
@@ -40,60 +45,99 @@ class LanguageParser(WiktionaryParser):
 
     # LEXICA
     # ------
-    def init_lexicon(self, language=None, lim=None):
+    def init_lexicon(self, language=None):
         """
-        Returns a set of all words in this language, up to lim.
+        Returns a Lexicon of all words in this language,
+        with their counts from this language's frequency list.
         ~
-        If lim is None, returns all words.
+        The full frequency list is read from its compiled lexicon
+        (see compiled_lexicon), which is memory-mapped rather than
+        read into memory.  If this language has no full frequency
+        list, its 50k list is used.
 
         :param language: str, language of lexicon to retrieve
-        :param lim: int, number of words in lexicon to retrieve
-        :return: List[str], words in LanguageParser's language
+        :return: Lexicon, words in LanguageParser's language
+        """
+        lexicon = self.compiled_lexicon(language, "full")
+        if lexicon is None:
+            lexicon = self.compiled_lexicon(language, "50k")
+        if lexicon is None:
+            lexicon = Lexicon()
+        return lexicon
+
+    def compiled_lexicon(self, language, size="full"):
+        """
+        Returns the CompiledLexicon for this language's frequency
+        list of this size, or None if there is no such list.
+        ~
+        The list is compiled into LEXICA_PATH the first time it is
+        asked for, and again whenever the list is newer than its
+        compiled lexicon.
+
+        :param language: str, language of lexicon to retrieve
+        :param size: str, size of frequency list, either "full" or "50k"
+        :return: Optional[CompiledLexicon], compiled lexicon for language
         """
         lang_code = self.get_lang_code(language)
-        words = list()
+        if lang_code is None:
+            return
 
-        if lang_code is not None:
-            path = self.PATH + "/resources/frequency_words/content/2016/%s/%s_full.txt" % (lang_code, lang_code)
+        source = self.FREQUENCY_PATH % (lang_code, lang_code, size)
+        if not os.path.exists(source):
+            return
 
-            with open(path, 'r') as lexicon:
-                line_no = 0
-                for line in lexicon:
-                    word = line.split(" ", 1)[0]
-                    words.append(self.unicodize(word))
-                    if lim:
-                        if line_no > lim:
-                            break
-                        line_no += 1
+        path = "%s/%s_%s.lex" % (self.LEXICA_PATH, lang_code, size)
+        try:
+            stale = os.path.getmtime(path) < os.path.getmtime(source)
+        except OSError:
+            stale = True
+
+        if stale:
+            compile_lexicon(source, path)
+            self.COMPILED_LEXICA.pop(path, None)
+        if path not in self.COMPILED_LEXICA:
+            try:
+                self.COMPILED_LEXICA[path] = CompiledLexicon(path)
+            except ValueError:  # compiled in an older layout
+                compile_lexicon(source, path)
+                self.COMPILED_LEXICA[path] = CompiledLexicon(path)
+        return self.COMPILED_LEXICA[path]
+
+    def compile_lexica(self):
+        """
+        Compiles the full & 50k frequency lists of every language
+        in LANG_CODES which has them.
 
-        return words
+        :return: None
+        """
+        for language in sorted(self.LANG_CODES):
+            for size in ["full", "50k"]:
+                self.compiled_lexicon(language, size)
 
     def add_lexicon(self, language, lexicon):
         """
         Adds the given lexicon to LEXICA under the given language.
 
         :param language: str, language of lexicon
-        :param lexicon: List[str], all words in given language
+        :param lexicon: Lexicon, all words in given language
         :return: None
         """
         self.LEXICA[language] = lexicon
 
-    def find_lexicon(self, language, lim=100000):
+    def find_lexicon(self, language):
         """
         Returns the lexicon for the given language.
         ~
-        If no lexicon for this language exists, creates new
-        lexicon for language, adds to LEXICA, and returns the result.
+        If no lexicon for this language exists, creates new lexicon
+        for language, adds to LEXICA, and returns the result.  Every
+        lexicon holds its whole frequency list.
 
         :param language: str, language of lexicon
-        :return: List[str], all words in given language
+        :return: Lexicon, all words in given language
         """
-        try:
-            return self.LEXICA[language]
-        except KeyError:
-            lexicon = self.init_lexicon(language, lim)
-            self.add_lexicon(language, lexicon)
-            return lexicon
+        if language not in self.LEXICA:
+            self.add_lexicon(language, self.init_lexicon(language))
+        return self.LEXICA[language]
 
     def in_lexicon(self, word, language=None):
         """
@@ -243,6 +287,8 @@ class LanguageParser(WiktionaryParser):
         :return: List[str], alphabet letters in this language
         """
         page = self.url_page(self.lemma_url(language))
+        if page is None:
+            return list()   # offline & lemma page not cached
         table = page.find("table", attrs={"id": "toc"})
         alphabet = set()
         rows = table.findAll("tr")
@@ -322,7 +368,7 @@ class LanguageParser(WiktionaryParser):
         """
         Dumps this LanguageParser's data from...
             alphabets to alphabets.json, and
-            wiktionary_entries to wiktionary_entries.json.
+            wiktionary_entries to its EntryStore.
 
         :return: None
         """
@@ -340,6 +386,10 @@ class LanguageParser(WiktionaryParser):
         :param dict_name: str, name of language dictionary to refresh
         :return: None
         """
+        if dict_name == "wiktionary_entries":
+            self.refresh_wiktionary_entries()
+            return
+
         dict_obj = getattr(self, dict_name, None)
 
         if dict_obj is not None:
@@ -425,12 +475,9 @@ class LanguageParser(WiktionaryParser):
         :return: str, word uninflected
         """
         language = self.verify_language(language)
-        for word_entry in self.wiktionary_entries:
-            inflections = self.lookup_word_inflections(word_entry, language)
-            if inflections is not None:
-                for inflection in inflections:
-                    if inflection == word:
-                        return word_entry
+        lemmas = self.inflection_index.lookup(self.unicodize(word), language)
+        if len(lemmas) != 0:
+            return lemmas[0]
         else:
             return self.lemmatize(word)
 
@@ -462,6 +509,8 @@ class LanguageParser(WiktionaryParser):
         """
         language = self.verify_language(language)
         entry = self.find_wiktionary_subentry(word, language, u"Pronunciation")
+        if entry is None:   # no entry or no pronunciation in language
+            return list()
         if len(entry) == 0:
             ipa = self.etymology_ipa(word, language)
             if ipa is not None:
@@ -602,41 +651,27 @@ class LanguageParser(WiktionaryParser):
         :return: List[str], word's morphemes
         """
         language = self.verify_language(language)
-        word_morphemes = self.word_morphemes(word, language)
-        if word_morphemes is not None:
-            submorphemes = OrderedSet(word_morphemes)
-            for morpheme in word_morphemes:
-                print morpheme
-                submorphemes.update(self.recursive_all_word_morphemes(morpheme))
-        else:
-            submorphemes = OrderedSet([])
-        return submorphemes
+        return OrderedSet(self.all_word_morphemes(word, language)[1:])
 
     def all_word_morphemes(self, word, language=None):
         """
         Returns a set of morphemes in this word, including the
         morphemes for all its sub-morphemes.
         ~
-        e.g. all_word_morphemes("undeniable", "English") -> ["un-", "deny", "-able"]
+        Closures are kept in this LanguageParser's etymology_index,
+        shared by every word with the same sub-morphemes and kept
+        up to date as entries change.
+        ~
+        e.g. all_word_morphemes("undeniable", "English") -> ["undeniable", "un-", "deny", "-able"]
 
         :param word: str, word to find morphemes of
         :param language: str, language of morpehemes
-        :return: List[str], word's morphemes
+        :return: List[str], word & its morphemes
         """
         language = self.verify_language(language)
-        morphemes = OrderedSet([])
-        todo = {word}
-
-        while len(todo) != 0:
-            curr_word = todo.pop()
-            if len(curr_word) != 0 and curr_word not in morphemes.items_set and not self.contains_punct(curr_word):
-                morphemes.add(curr_word)
-                word_morphemes = self.word_morphemes(curr_word, language)
-                if word_morphemes is not None:
-                    morphemes.update(word_morphemes)
-                    todo.update(word_morphemes)
-
-        return morphemes.order_items()
+        if len(word) == 0 or self.contains_punct(word):
+            return list()
+        return list(self.etymology_index.closure(word, language))
 
     def words_morphemes(self, words, language=None):
         """
@@ -706,21 +741,15 @@ class LanguageParser(WiktionaryParser):
     def all_inflections(self, language=None):
         """
         Returns a dictionary of all words in this language's declensions.
+        ~
+        The dictionary is this language's InflectionIndex, so it is
+        shared and kept up to date as entries change; do not edit it.
 
         :param language: str, language of declension dicts
-        :return: dict(str, str), inflection-lemma pairs in this language
+        :return: dict(str, List[str]), inflections & their lemmas in this language
         """
         language = self.verify_language(language)
-        declensions = dict()
-
-        for word in self.wiktionary_entries:
-            inflections = self.lookup_word_inflections(word, language)
-            if inflections is not None:
-                for inflection in inflections:
-                    declensions.setdefault(inflection, list())
-                    declensions[inflection] += word
-
-        return declensions
+        return self.inflection_index.find_index(language)
 
     def all_morphemes(self, language=None):
         """
@@ -729,15 +758,23 @@ class LanguageParser(WiktionaryParser):
         :param language: str, language of inflection dict
         :return: List[str], all morphemes in this language
         """
+        return list(self.iter_morphemes(language))
+
+    def iter_morphemes(self, language=None):
+        """
+        Yields every morpheme in this language's etymologies,
+        one entry at a time.
+
+        :param language: str, language of etymologies
+        :return: Iterator[str], all morphemes in this language
+        """
         language = self.verify_language(language)
-        morphemes = list()
 
-        for word in self.wiktionary_entries:
-            etyms = self.word_morphemes(word, language)
+        for word, entry in self.wiktionary_entries.iter_language(language):
+            etyms = entry.get(u"Etymology", None)
             if etyms is not None:
-                morphemes += etyms
-
-        return morphemes
+                for morpheme in etyms:
+                    yield morpheme
 
     def all_ipas(self, language=None):
         """
@@ -749,14 +786,75 @@ class LanguageParser(WiktionaryParser):
         language = self.verify_language(language)
         ipas = dict()
 
-        for word in self.wiktionary_entries:
-            word_ipas = self.find_word_ipas(word, language)
+        for word, entry in self.wiktionary_entries.iter_language(language):
+            word_ipas = entry.get(u"Pronunciation", list())
             if word_ipas is not None:
                 ipas.setdefault(word, list())
                 ipas[word] = OrderedSet(ipas[word] + word_ipas).items()
 
         return ipas
 
+    # SUBSTRINGS
+    # ----------
+    def find_suffix_array(self, language=None):
+        """
+        Returns the SuffixArray over this language's lexicon and
+        entry headwords, building it if not done already.
+        ~
+        Words keep their counts from this language's frequency list,
+        and headwords missing from it count once.  The SuffixArray is
+        built once per language; pop it from suffix_arrays to rebuild
+        it with headwords added since.
+
+        :param language: str, language of words
+        :return: SuffixArray, suffix array over words in language
+        """
+        language = self.verify_language(language)
+
+        if language not in self.suffix_arrays:
+            lexicon = self.init_lexicon(language)
+            words = list(lexicon)
+            counts = lexicon.counts_between(0, len(words))
+            seen = set(words)
+            for word, entry in self.wiktionary_entries.iter_language(language):
+                if word not in seen:
+                    seen.add(word)
+                    words.append(word)
+                    counts.append(None)
+            self.suffix_arrays[language] = SuffixArray(words, counts)
+
+        return self.suffix_arrays[language]
+
+    def words_containing(self, substring, language=None):
+        """
+        Returns the words in this language containing this substring.
+
+        :param substring: unicode, substring to look up
+        :param language: str, language of words
+        :return: List[unicode], words containing substring, most frequent first
+        """
+        return self.find_suffix_array(language).containing(substring)
+
+    def words_starting_with(self, prefix, language=None):
+        """
+        Returns the words in this language starting with this prefix.
+
+        :param prefix: unicode, prefix to look up
+        :param language: str, language of words
+        :return: List[unicode], words starting with prefix, most frequent first
+        """
+        return self.find_suffix_array(language).starting_with(prefix)
+
+    def words_ending_with(self, suffix, language=None):
+        """
+        Returns the words in this language ending with this suffix.
+
+        :param suffix: unicode, suffix to look up
+        :param language: str, language of words
+        :return: List[unicode], words ending with suffix, most frequent first
+        """
+        return self.find_suffix_array(language).ending_with(suffix)
+
     # WORDNET
     # -------
     def get_wordnet_words(self):
@@ -816,25 +914,12 @@ class LanguageParser(WiktionaryParser):
         :param language: Optional[str], language of common words
         :return: List[str], 50k most common words in language
         """
-        lang_code = self.get_lang_code(language)
+        lexicon = self.compiled_lexicon(language, "50k")
 
-        if lang_code is None:
+        if lexicon is None:
             return
 
-        words = list()
-        path = self.PATH + "/resources/frequency_words/content/2016/%s/%s_50k.txt" % (lang_code, lang_code)
-
-        with open(path, 'r') as fifty_k:
-            line_no = 0
-            for line in fifty_k:
-                word = line.split(" ", 1)[0]
-                word = self.unicodize(word)
-                words.append(word)
-                if line_no > lim:
-                    break
-                line_no += 1
-
-        return words
+        return lexicon.top(lim)
 
     def common_word_pairs(self, language=None, lim=50000):
         """
@@ -876,24 +961,31 @@ class LanguageParser(WiktionaryParser):
         :return: List[str], up to 50k most common words in LanguageParser's language
         """
         language = self.verify_language(language)
-        lexicon = self.find_lexicon(language, lim)
-        common_words = lexicon[:lim]
+        lexicon = self.find_lexicon(language)
+        common_words = lexicon.top(lim)
         morphemes = self.words_morphemes(common_words, language)
         return morphemes
 
-    def add_common_wiktionary_entries(self, language=None, lim=50000):
+    def add_common_wiktionary_entries(self, language=None, lim=50000, workers=None, rate=None, processes=None):
         """
         Adds Wiktionary entries for the most common words in
         this language to this WiktionaryParser's wiktionary_entries.
+        ~
+        If workers is given, fetches that many pages at once,
+        parsing them on processes if given (see add_wiktionary_entries).
 
         :param words: List[str], words of Wiktionary entries to add
         :param language: Optional[str], language of entries to add
+        :param workers: Optional[int], number of pages to fetch at once
+        :param rate: Optional[float], most requests per second to send
+        :param processes: Optional[int], number of processes to parse pages on
         :return: dict(str, dict), where str is language and dict is...
             key (str) - title of subentry heading (e.g. Etymology)
             val (list) - value(s) associated with subentry
         """
         language = self.verify_language(language)
-        return self.add_wiktionary_entries(self.common_words(language, lim), language)
+        return self.add_wiktionary_entries(self.common_words(language, lim), language,
+                                           workers, rate, processes)
 
     # URLS
     # ----
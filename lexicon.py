@@ -0,0 +1,314 @@
+# coding: utf-8
+"""
+LEXICON:
+
+    Contains Lexicon class for looking up words by
+    their frequency in a language, and CompiledLexicon
+    class for reading lexica compiled to binary files.
+"""
+import os
+import mmap
+import struct
+
+
+class Lexicon:
+    """
+    A class for the words of a language in order of frequency,
+    with their counts from a frequency list.
+    ~
+    Words are indexed by rank (0 for the most frequent word), so
+    checking whether a word is in the lexicon, or finding its rank
+    or count, takes constant time.
+    ~
+    Indexing or slicing a Lexicon indexes or slices its words,
+    so lexicon[:k] returns the k most frequent words as before.
+    """
+    def __init__(self, words=None, counts=None):
+        """
+        Initializes this Lexicon with the given words & counts.
+
+        :param words: Optional[List[unicode]], words from most to least frequent
+        :param counts: Optional[List[int]], count of each word in words
+        """
+        self.words = list()
+        self.counts = list()
+        self.ranks = dict()     # word -> index in words
+
+        if words is not None:
+            if counts is None:
+                counts = [None] * len(words)
+            for word, count in zip(words, counts):
+                self.add(word, count)
+
+    def add(self, word, count=None):
+        """
+        Adds this word to the end of this Lexicon, unless
+        it is already in this Lexicon.
+
+        :param word: unicode, word to add
+        :param count: Optional[int], number of times word was counted
+        :return: None
+        """
+        if word not in self.ranks:
+            self.ranks[word] = len(self.words)
+            self.words.append(word)
+            self.counts.append(count)
+
+    def rank(self, word):
+        """
+        Returns this word's frequency rank in this Lexicon
+        (0 for the most frequent word), or None if absent.
+
+        :param word: unicode, word to rank
+        :return: Optional[int], rank of word
+        """
+        return self.ranks.get(word, None)
+
+    def count(self, word):
+        """
+        Returns the number of times this word was counted,
+        or None if absent or uncounted.
+
+        :param word: unicode, word to count
+        :return: Optional[int], count of word
+        """
+        rank = self.rank(word)
+        if rank is not None:
+            return self.counts[rank]
+
+    def top(self, k):
+        """
+        Returns the k most frequent words in this Lexicon.
+
+        :param k: int, number of words to return
+        :return: List[unicode], k most frequent words
+        """
+        return self.words[:k]
+
+    def counts_between(self, start, end):
+        """
+        Returns the counts of the words ranked from start up to end.
+
+        :param start: int, rank of first word
+        :param end: int, rank after last word
+        :return: List[Optional[int]], count of each word, or None if uncounted
+        """
+        return self.counts[max(0, start):end]
+
+    def __contains__(self, word):
+        return word in self.ranks
+
+    def __getitem__(self, idx):
+        return self.words[idx]
+
+    def __getslice__(self, start, end):
+        return self.words[start:end]
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+
+class CompiledLexicon:
+    """
+    A class for a Lexicon read from a binary file made by
+    compile_lexicon, without reading the whole file.
+    ~
+    The file is memory-mapped, so opening a CompiledLexicon takes
+    the same time however many words it holds, and top, indexing &
+    slicing decode only the words asked for.  Its layout (all
+    little-endian) is:
+        header  - MAGIC, then the number of words n as uint32
+        offsets - n+1 uint32 offsets of each word in the blob
+        counts  - n uint64 counts, NO_COUNT for words without one
+        blob    - every word in UTF-8 followed by a newline,
+                  from most to least frequent
+    ~
+    Membership, rank & count lookups go through a dict of each
+    word's rank, decoded from the blob in one pass the first time
+    one is asked for, so each takes constant time as in a Lexicon.
+    A CompiledLexicon answers the same queries as a Lexicon.
+    """
+    MAGIC = "LEX2"
+    HEADER = struct.Struct("<4sI")
+    NO_COUNT = 2 ** 64 - 1
+
+    def __init__(self, path):
+        """
+        Initializes this CompiledLexicon from the file at path.
+
+        :param path: str, path of compiled lexicon file
+        """
+        self.path = path
+        self.ranks = None   # word -> rank, built by find_ranks
+        with open(path, "rb") as compiled:
+            self.data = mmap.mmap(compiled.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.size = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC:
+            raise ValueError("%s is not a compiled lexicon" % path)
+        self.offsets_at = self.HEADER.size
+        self.counts_at = self.offsets_at + 4 * (self.size + 1)
+        self.blob_at = self.counts_at + 8 * self.size
+
+    def word_bytes(self, rank):
+        """
+        Returns the UTF-8 bytes of the word with this rank.
+
+        :param rank: int, 0 <= rank < len(self), rank of word
+        :return: str, UTF-8 encoded word
+        """
+        start, end = struct.unpack_from("<II", self.data, self.offsets_at + 4 * rank)
+        return self.data[self.blob_at + start:self.blob_at + end - 1]
+
+    def words_between(self, start, end):
+        """
+        Returns the words ranked from start up to end.
+
+        :param start: int, rank of first word
+        :param end: int, rank after last word
+        :return: List[unicode], words from start to end
+        """
+        start = max(0, start)
+        end = min(end, self.size)
+        if start >= end:
+            return list()
+
+        first = struct.unpack_from("<I", self.data, self.offsets_at + 4 * start)[0]
+        last = struct.unpack_from("<I", self.data, self.offsets_at + 4 * end)[0]
+        blob = self.data[self.blob_at + first:self.blob_at + last - 1]
+        return blob.decode("utf-8").split(u"\n")
+
+    def find_ranks(self):
+        """
+        Returns the rank of each word in this CompiledLexicon,
+        decoding every word if not done already.
+
+        :return: dict(unicode, int), where...
+            key (unicode) - word in lexicon
+            val (int) - word's rank
+        """
+        if self.ranks is None:
+            self.ranks = dict((word, rank) for rank, word in enumerate(self.words_between(0, self.size)))
+        return self.ranks
+
+    def rank(self, word):
+        """
+        Returns this word's frequency rank in this CompiledLexicon
+        (0 for the most frequent word), or None if absent.
+
+        :param word: unicode, word to rank
+        :return: Optional[int], rank of word
+        """
+        if isinstance(word, str):
+            try:
+                word = word.decode("utf-8")
+            except UnicodeDecodeError:
+                return
+        return self.find_ranks().get(word, None)
+
+    def count(self, word):
+        """
+        Returns the number of times this word was counted,
+        or None if absent or uncounted.
+
+        :param word: unicode, word to count
+        :return: Optional[int], count of word
+        """
+        rank = self.rank(word)
+        if rank is not None:
+            count = struct.unpack_from("<Q", self.data, self.counts_at + 8 * rank)[0]
+            if count != self.NO_COUNT:
+                return count
+
+    def top(self, k):
+        """
+        Returns the k most frequent words in this CompiledLexicon.
+
+        :param k: int, number of words to return
+        :return: List[unicode], k most frequent words
+        """
+        return self.words_between(0, k)
+
+    def counts_between(self, start, end):
+        """
+        Returns the counts of the words ranked from start up to end.
+
+        :param start: int, rank of first word
+        :param end: int, rank after last word
+        :return: List[Optional[int]], count of each word, or None if uncounted
+        """
+        start = max(0, start)
+        end = min(end, self.size)
+        if start >= end:
+            return list()
+
+        counts = struct.unpack_from("<%dQ" % (end - start), self.data, self.counts_at + 8 * start)
+        return [None if count == self.NO_COUNT else count for count in counts]
+
+    def __contains__(self, word):
+        return word in self.find_ranks()
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in xrange(*idx.indices(self.size))]
+        if idx < 0:
+            idx += self.size
+        if not 0 <= idx < self.size:
+            raise IndexError(idx)
+        return self.word_bytes(idx).decode("utf-8")
+
+    def __getslice__(self, start, end):
+        return self.words_between(start, end)
+
+    def __iter__(self):
+        for start in xrange(0, self.size, 4096):
+            for word in self.words_between(start, start + 4096):
+                yield word
+
+    def __len__(self):
+        return self.size
+
+
+def compile_lexicon(source, path):
+    """
+    Compiles the frequency list at source into a CompiledLexicon
+    file at path.
+    ~
+    Each line of source holds a word and optionally its count,
+    separated by a space, from most to least frequent.  Repeated
+    words keep their first rank.
+
+    :param source: str, path of frequency list .txt file
+    :param path: str, path of compiled lexicon file to write
+    :return: None
+    """
+    lexicon = Lexicon()
+    with open(source, 'r') as frequencies:
+        for line in frequencies:
+            fields = line.rstrip("\r\n").split(" ", 1)
+            count = int(fields[1]) if len(fields) == 2 and fields[1].strip() else None
+            lexicon.add(fields[0].decode("utf-8"), count)
+
+    words = [word.encode("utf-8") + "\n" for word in lexicon.words]
+    counts = [CompiledLexicon.NO_COUNT if count is None else count for count in lexicon.counts]
+    offsets = [0]
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:     # made by another process
+            pass
+
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "wb") as compiled:
+        compiled.write(CompiledLexicon.HEADER.pack(CompiledLexicon.MAGIC, len(words)))
+        compiled.write(struct.pack("<%dI" % len(offsets), *offsets))
+        compiled.write(struct.pack("<%dQ" % len(counts), *counts))
+        compiled.write("".join(words))
+    os.rename(temp_path, path)
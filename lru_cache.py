@@ -0,0 +1,109 @@
+# coding: utf-8
+"""
+LRU_CACHE:
+
+    Contains LRUCache class for keeping the most recently
+    used results of a computation in memory.
+"""
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A class for caching up to max_size values in memory,
+    evicting the least recently used value once full.
+    ~
+    Values are kept in an OrderedDict from least to most recently
+    used, so lookups, stores and evictions take constant time.
+    Each cache also holds a stamp of whatever its values were
+    computed from; validating it against a new stamp clears every
+    value computed from stale data.
+    """
+    def __init__(self, max_size=4096):
+        """
+        Initializes this LRUCache to hold up to max_size values.
+
+        :param max_size: int, most values to keep
+        """
+        self.max_size = max_size
+        self.values = OrderedDict()     # key -> value, least recently used first
+        self.stamp = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key, default=None):
+        """
+        Returns the value cached under this key, marking it
+        most recently used, or default if none is cached.
+
+        :param key: X, key of value to look up
+        :param default: Y, value to return if key is not cached
+        :return: Y, cached value of key
+        """
+        try:
+            value = self.values.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.values[key] = value
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        """
+        Caches this value under this key as most recently used,
+        evicting the least recently used values over max_size.
+
+        :param key: X, key of value to cache
+        :param value: Y, value to cache
+        :return: None
+        """
+        self.values.pop(key, None)
+        self.values[key] = value
+        while len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+            self.evictions += 1
+
+    def validate(self, stamp):
+        """
+        Clears this LRUCache if the given stamp differs from the
+        stamp its values were computed under.
+
+        :param stamp: X, stamp of data values are now computed from
+        :return: bool, whether this LRUCache was cleared
+        """
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+        self.values.clear()
+        return True
+
+    def clear(self):
+        """
+        Removes every value from this LRUCache, keeping its statistics.
+
+        :return: None
+        """
+        self.values.clear()
+
+    def stats(self):
+        """
+        Returns this LRUCache's hits, misses, evictions, size
+        and hit rate.
+
+        :return: dict(str, int|float), statistics of cache
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.values),
+                "max_size": self.max_size,
+                "hit_rate": float(self.hits) / lookups if lookups != 0 else 0.0}
+
+    def __contains__(self, key):
+        return key in self.values
+
+    def __len__(self):
+        return len(self.values)
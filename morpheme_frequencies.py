@@ -0,0 +1,121 @@
+# coding: utf-8
+"""
+MORPHEME_FREQUENCIES:
+
+    Contains MorphemeFrequencies class for counting morphemes
+    streamed from entries or corpora, and rank_weights for
+    weighting morphemes by their rank among common morphemes.
+"""
+from collections import Counter
+
+
+def rank_weights(ranked, lim):
+    """
+    Returns the weight of each morpheme in this ranking, its
+    first index in ranked times 100, as a share of lim.
+    ~
+    e.g. rank_weights(["the", "a", "the"], 100) -> {"the": 0.0, "a": 1.0}
+
+    :param ranked: Iterable[str], morphemes from most to least common
+    :param lim: int, number of morphemes ranked
+    :return: dict(str, float), where...
+        key (str) - ranked morpheme
+        val (float) - morpheme's weight
+    """
+    weights = dict()
+    for idx, morpheme in enumerate(ranked):
+        if morpheme not in weights:
+            weights[morpheme] = idx * 100 / float(lim)
+    return weights
+
+
+class MorphemeFrequencies:
+    """
+    A class for counting how often each morpheme occurs,
+    lowercased, in one pass over any stream of morphemes.
+    ~
+    Counts are kept in a Counter, so streams can be counted in
+    parts, as by separate workers, and the parts merged after.
+    """
+    def __init__(self, morphemes=()):
+        """
+        Initializes this MorphemeFrequencies with the counts
+        of the given morphemes.
+
+        :param morphemes: Iterable[str], morphemes to count
+        """
+        self.counts = Counter()
+        self.update(morphemes)
+
+    def add(self, morpheme, count=1):
+        """
+        Adds count occurrences of this morpheme.
+
+        :param morpheme: str, morpheme to count
+        :param count: int, number of occurrences
+        :return: None
+        """
+        self.counts[morpheme.lower()] += count
+
+    def update(self, morphemes):
+        """
+        Adds an occurrence of each of these morphemes,
+        consuming them one at a time.
+
+        :param morphemes: Iterable[str], morphemes to count
+        :return: None
+        """
+        counts = self.counts
+        for morpheme in morphemes:
+            counts[morpheme.lower()] += 1
+
+    def merge(self, other):
+        """
+        Adds other's counts to this MorphemeFrequencies and
+        returns the merged MorphemeFrequencies.
+
+        :param other: MorphemeFrequencies, partial counts to add
+        :return: MorphemeFrequencies, self with other's counts added
+        """
+        self.counts.update(other.counts)
+        return self
+
+    def freqs(self):
+        """
+        Returns a frequency dictionary of these morphemes.
+
+        :return: dict, where...
+            key (str) - lowercased morpheme
+            val (int) - given morpheme's frequency
+        """
+        return dict(self.counts)
+
+    def weighted_freqs(self, weights):
+        """
+        Returns a frequency dictionary of these morphemes, each
+        frequency multiplied by its morpheme's weight in weights
+        (or 1 if it has none) and rounded down.
+
+        :param weights: dict(str, float), weights of morphemes, as from rank_weights
+        :return: dict, where...
+            key (str) - lowercased morpheme
+            val (int) - given morpheme's weighted frequency
+        """
+        return {morpheme: int(freq * weights.get(morpheme, 1))
+                for morpheme, freq in self.counts.iteritems()}
+
+    def most_common(self, n=None):
+        """
+        Returns the n most frequent morphemes with their
+        frequencies, or all of them if n is None.
+
+        :param n: Optional[int], number of morphemes to return
+        :return: List[tuple(str, int)], morphemes & frequencies
+        """
+        return self.counts.most_common(n)
+
+    def __getitem__(self, morpheme):
+        return self.counts[morpheme.lower()]
+
+    def __len__(self):
+        return len(self.counts)
@@ -6,6 +6,9 @@ MORPHEME_PARSER:
     in a given language from Wiktionary.
 """
 from language_parser import *
+from lru_cache import LRUCache
+from trie import Trie
+from morpheme_frequencies import MorphemeFrequencies, rank_weights
 
 
 class MorphemeParser(LanguageParser):
@@ -13,10 +16,14 @@ class MorphemeParser(LanguageParser):
     A class for extracting and analyzing morphemes in a
     given language.
     """
+    SYLLABLE_CACHE_SIZE = 4096  # most syllabifications kept in syllable_cache
+
     def __init__(self, language):
         LanguageParser.__init__(self, language)
         self.affixes = set()
         self.morphemes = set()
+        self.morpheme_trie = None   # Trie of morphemes & common words, built by find_morpheme_trie
+        self.syllable_cache = LRUCache(self.SYLLABLE_CACHE_SIZE)
 
     # MORPHEMES
     # ---------
@@ -24,13 +31,19 @@ class MorphemeParser(LanguageParser):
         """
         Adds all morphemes in this word to this MorphemeParser's
         morphemes.
+        ~
+        Only the word & those of its morphemes already known are
+        learned, not a run of unknown letters left at its end.
 
         :param word: str, word to add morphemes of to morphemes
         :return: None
         """
+        trie = self.find_morpheme_trie()
+        word_morphemes = [morpheme for morpheme in self.strip_affixes(word)
+                          if morpheme == word or morpheme in trie]
         self.morphemes.add(word)
-        word_morphemes = self.strip_affixes(word)
         self.morphemes.update(word_morphemes)
+        self.learn_morphemes([word] + word_morphemes)
 
     def add_words_morphemes(self, words):
         """
@@ -43,6 +56,21 @@ class MorphemeParser(LanguageParser):
         for word in words:
             self.add_word_morphemes(word)
 
+    def morpheme_frequencies(self, morphemes=None, language=None):
+        """
+        Returns the MorphemeFrequencies of these morphemes, counted
+        in one pass, or of every morpheme in this MorphemeParser's
+        language's etymologies if morphemes is None.
+
+        :param morphemes: Optional[Iterable[str]], morphemes to count
+        :param language: str, language of morphemes
+        :return: MorphemeFrequencies, counts of morphemes
+        """
+        language = self.verify_language(language)
+        if morphemes is None:
+            morphemes = self.iter_morphemes(language)
+        return MorphemeFrequencies(morphemes)
+
     def morpheme_freqs(self, morphemes=None, language=None):
         """
         Returns a frequency dictionary of morphemes in this
@@ -54,71 +82,134 @@ class MorphemeParser(LanguageParser):
             key (str) - morpheme in this MP's language
             val (int) - given morpheme's frequency
         """
-        language = self.verify_language(language)
-        if morphemes is None:
-            morphemes = self.all_morphemes(language)
-        morphemes = [morpheme.lower() for morpheme in morphemes]
-        keys = set(morphemes)
-        return {key.lower(): morphemes.count(key.lower()) for key in keys}
+        return self.morpheme_frequencies(morphemes, language).freqs()
 
     def weighted_morpheme_freqs(self, morphemes=None, language=None, lim=10000):
         """
         Returns a frequency dictionary of morphemes in this
-        MorphemeParser's language.
+        MorphemeParser's language, each frequency weighted by
+        its morpheme's rank among the lim most common morphemes.
 
         :return: dict, where...
             key (str) - morpheme in this MP's language
             val (int) - given morpheme's frequency
         """
-        common_morphemes = self.common_morphemes(language, lim=lim)
-        freqs = self.morpheme_freqs(morphemes, language)
-        weighted_freqs = {}
+        weights = rank_weights(self.common_morphemes(language, lim=lim), lim)
+        return self.morpheme_frequencies(morphemes, language).weighted_freqs(weights)
 
-        for morpheme in freqs:
-            try:
-                weighting = common_morphemes.index(morpheme) * 100
-                weight_ratio = weighting / float(lim)
-            except ValueError:
-                weight_ratio = 1
+    def mine_prefixes(self, language=None, min_words=10, max_length=5):
+        """
+        Returns the prefixes of up to max_length letters starting at
+        least min_words words in this language, most productive first,
+        each with its number of words, their total count and the share
+        of that count from words whose stem is also a word.
+
+        :param language: str, language of words
+        :param min_words: int, fewest words a prefix must start
+        :param max_length: int, longest prefix to mine
+        :return: List[tuple(unicode, int, int, float)], prefixes, words, counts & productivities
+        """
+        return self.find_suffix_array(language).mine_prefixes(min_words, max_length)
+
+    def mine_suffixes(self, language=None, min_words=10, max_length=5):
+        """
+        Returns the suffixes of up to max_length letters ending at
+        least min_words words in this language, most productive first,
+        each with its number of words, their total count and the share
+        of that count from words whose stem is also a word.
+
+        :param language: str, language of words
+        :param min_words: int, fewest words a suffix must end
+        :param max_length: int, longest suffix to mine
+        :return: List[tuple(unicode, int, int, float)], suffixes, words, counts & productivities
+        """
+        return self.find_suffix_array(language).mine_suffixes(min_words, max_length)
+
+    def find_morpheme_trie(self):
+        """
+        Returns the Trie of this MorphemeParser's morphemes and
+        its language's 10,000 most common words, building it
+        if not done already.
+
+        :return: Trie, known morphemes
+        """
+        if self.morpheme_trie is None:
+            self.morpheme_trie = Trie()
+            self.learn_morphemes(self.morphemes)
+            self.learn_morphemes(self.common_words(self.language, lim=10000) or [])
+        return self.morpheme_trie
 
-            freq = freqs[morpheme]
-            weighted_freq = int(freq * weight_ratio)
-            weighted_freqs[morpheme] = weighted_freq
+    def learn_morphemes(self, morphemes):
+        """
+        Adds these morphemes to this MorphemeParser's morpheme_trie,
+        if built, so strip_affixes can find them in later words.
 
-        return weighted_freqs
+        :param morphemes: List[str], morphemes to add
+        :return: None
+        """
+        if self.morpheme_trie is not None:
+            for morpheme in morphemes:
+                if len(morpheme) > 1:
+                    self.morpheme_trie.add(morpheme)
 
     def strip_affixes(self, word):
         """
-        Removes all morphemes from this word until none are left,
-        then returns a list of all morphemes in this word.
+        Splits this word into its known morphemes, then returns
+        a list of all morphemes in this word.
         ~
         A different method to obtain a word's morphemes than
         finding its Wiktionary etymologies.
+        ~
+        Known morphemes are those in morpheme_trie other than the
+        word itself.  As in the scan this replaces, a split is kept
+        only if it is made of known morphemes, save for a run of
+        unknown letters at the end after at least two of them;
+        otherwise the word is its own only morpheme.  Of these, the
+        split with the shortest such run, then with the fewest
+        morphemes, is found by dynamic programming over each index
+        of the word.
+        ~
+        e.g. strip_affixes("unhappiness") -> ["un", "happi", "ness"]
+             strip_affixes("hello") -> ["hello"]
 
         :param word: str, word to find morphemes of
         :return: List[str], all morphemes in this word
         """
-        words = self.morphemes.union(self.common_words(self.language, lim=10000))
+        trie = self.find_morpheme_trie()
+        size = len(word)
+        # best[idx] = (morphemes, previous index) for the fewest
+        # known morphemes making up word[:idx], or None if there are none
+        best = [None] * (size + 1)
+        best[0] = (0, None)
+
+        for idx in xrange(size):
+            if best[idx] is None:
+                continue
+            count = best[idx][0] + 1
+            for end, value in trie.matches(word, idx):
+                if end - idx == size:
+                    continue
+                if best[end] is None or count < best[end][0]:
+                    best[end] = (count, idx)
+
+        # (letters left over, morphemes, index where the known morphemes end)
+        splits = [(size - idx, best[idx][0], idx) for idx in xrange(size + 1)
+                  if best[idx] is not None and best[idx][0] > 1]
+        if len(splits) == 0:
+            return [word]
         morphemes = []
-        new_word = word
-        last_morpheme = str()
-
-        while len(new_word) != 0:
-            for morpheme in sorted(words, key=lambda m: len(m), reverse=True):
-                if morpheme != word and len(morpheme) > 1:
-                    if morpheme == new_word[:len(morpheme)] and len(last_morpheme) > 1 and last_morpheme in words:
-                        morphemes.append(last_morpheme)
-                        morphemes.append(morpheme)
-                        new_word = new_word[len(morpheme):]
-                        last_morpheme = str()
-                        break
-            else:
-                last_morpheme += new_word[0]
-                new_word = new_word[1:]
-                if len(new_word) == 0:
-                    morphemes.append(last_morpheme)
+        end = min(splits)[2]
+        if end < size:
+            morphemes.append(word[end:])
+
+        # walk back through the known morphemes ending at end
+        while end > 0:
+            start = best[end][1]
+            morphemes.append(word[start:end])
+            end = start
 
-        return filter(lambda m: m != "", morphemes)
+        morphemes.reverse()
+        return morphemes
 
     # SYLLABIFICATION
     # ---------------
@@ -236,11 +327,9 @@ class MorphemeParser(LanguageParser):
         rhyme = ""
         coda = ""
         pre_rhyme = True
-        next_syllable = syllable
 
-        while len(next_syllable) != 0:
-            next_phoneme, next_syllable = self.next_phoneme(next_syllable)
-            is_vowel = self.is_ipa_vowel(next_phoneme)
+        for start, end, is_vowel in self.ipa_spans(syllable):
+            next_phoneme = syllable[start:end]
             if pre_rhyme:
                 if is_vowel:
                     pre_rhyme = False
@@ -251,7 +340,7 @@ class MorphemeParser(LanguageParser):
                 if is_vowel or self.is_ipa_semivowel(next_phoneme):
                     rhyme += next_phoneme
                 else:
-                    coda += next_phoneme + next_syllable
+                    coda += syllable[start:]
                     break
 
         return (onset, rhyme, coda)
@@ -275,8 +364,9 @@ class MorphemeParser(LanguageParser):
         :return: List[tuple((all unicode) str, str, str)], the given
             syllables' onsets, rhymes, and codas, respectively
         """
-        return [self.break_syllable(syllable)
-                for syllable in self.split_syllables(ipa, use_syllables)]
+        return self.cached_syllables("break_syllables", ipa, use_syllables,
+                                     lambda: [self.break_syllable(syllable) for syllable
+                                              in self.split_syllables(ipa, use_syllables) or []])
 
     def extract_syllable(self, ipa, idx=0, use_syllables=True):
         """
@@ -333,20 +423,64 @@ class MorphemeParser(LanguageParser):
         if len(ipa) == 0:
             return
         else:
-            if use_syllables:
-                subbed_ipa = re.sub(u"[ˈˌ]", u".", ipa)
-                subbed_ipa = subbed_ipa.strip(u".")
-                syllables = subbed_ipa.split(u".")
-                return syllables
-            else:
-                ipa = self.clean_ipa(ipa)
-                syllables = []
+            return self.cached_syllables("split_syllables", ipa, use_syllables,
+                                         lambda: self.find_syllables(ipa, use_syllables))
 
-                while len(ipa) != 0:
-                    syllable, ipa = self.next_syllable(ipa, remove=True)
-                    syllables.append(syllable)
+    def find_syllables(self, ipa, use_syllables=True):
+        """
+        Returns the given IPA word's syllables, as split_syllables
+        but without looking in syllable_cache.
+
+        :param ipa: (unicode) str, non-empty IPA word to break into syllables
+        :param use_syllables: bool, whether to calculate phonemes with ipa's syllables
+        :return: List[(unicode) str], list of given ipa's syllables
+        """
+        if use_syllables:
+            subbed_ipa = re.sub(u"[ˈˌ]", u".", ipa)
+            subbed_ipa = subbed_ipa.strip(u".")
+            syllables = subbed_ipa.split(u".")
+            return syllables
+        else:
+            ipa = self.clean_ipa(ipa)
+            syllables = []
 
-                return syllables
+            while len(ipa) != 0:
+                syllable, ipa = self.next_syllable(ipa, remove=True)
+                syllables.append(syllable)
+
+            return syllables
+
+    def cached_syllables(self, name, ipa, use_syllables, syllabify):
+        """
+        Returns the result of syllabify() for this IPA, as cached
+        in syllable_cache under the given method name, calling
+        syllabify and caching its result if not cached already.
+        ~
+        Learned phonemes change how IPAs are split into phonemes, so
+        syllable_cache is cleared whenever phoneme_trie changes.
+        Only IPAParsers have a phoneme_trie; a plain MorphemeParser
+        stamps its cache with None.
+        Lists are cached as tuples and returned as new lists, so
+        callers may change what they are given.
+
+        :param name: str, name of syllabifying method
+        :param ipa: (unicode) str, IPA word to syllabify
+        :param use_syllables: bool, whether syllabified with ipa's syllables
+        :param syllabify: function, returns ipa's syllabification
+        :return: X, syllabification of ipa
+        """
+        trie = getattr(self, "phoneme_trie", None)
+        self.syllable_cache.validate((trie, getattr(trie, "version", None)))
+        key = (name, self.language, ipa, use_syllables)
+        syllables = self.syllable_cache.lookup(key)
+
+        if syllables is None:
+            syllables = syllabify()
+            if isinstance(syllables, list):
+                syllables = tuple(syllables)
+            self.syllable_cache.store(key, syllables)
+
+        return list(syllables) if isinstance(syllables, tuple) else syllables
 
     def next_syllable(self, ipa, remove=True):
         """
@@ -366,33 +500,23 @@ class MorphemeParser(LanguageParser):
         :return: tuple((both unicode) str, str), ipa's next syllable and rest of IPA
         """
         ipa = self.clean_ipa(ipa)
-        syllable = []
+        spans = self.ipa_spans(ipa)
+        syllable_end = len(ipa)
         pre_vowel = True
 
-        while len(ipa) != 0:
-            phoneme, ipa = self.next_phoneme(ipa, remove=True, use_syllables=False)
-            is_vowel = self.is_ipa_vowel(phoneme)
-
+        for idx, (start, end, is_vowel) in enumerate(spans):
             if pre_vowel:
                 if is_vowel:
                     pre_vowel = False
-                syllable.append(phoneme)
-            else:
-                if is_vowel:
-                    syllable.append(phoneme)
+            elif not is_vowel:
+                # a consonant ends this syllable if the next phoneme is a consonant too
+                if idx + 1 == len(spans) or spans[idx + 1][2] is False:
+                    syllable_end = end
                 else:
-                    if len(ipa) == 0:
-                        syllable.append(phoneme)
-                    else:
-                        new_phoneme, new_ipa = self.next_phoneme(ipa, remove=True, use_syllables=False)
-                        if self.is_ipa_vowel(new_phoneme) is False:
-                            syllable.append(phoneme)
-                        else:
-                            ipa = phoneme + ipa
-                        break
+                    syllable_end = start
+                break
 
-        syllable = "".join(syllable)
-        syllable = (syllable, ipa) if remove else syllable
+        syllable = (ipa[:syllable_end], ipa[syllable_end:]) if remove else ipa[:syllable_end]
         return syllable
 
 
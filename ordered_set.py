@@ -1,16 +1,79 @@
 # coding: utf-8
+from collections import OrderedDict
+from operator import itemgetter
 
 
 class OrderedSet(set):
     """
     A List-Set hybrid class for holding ordered
     sequences of items with no duplicates.
+    ~
+    Items are ranked by how often they were added, most frequent
+    first, with ties in the order items were first added.  Rather
+    than keeping every item ever added, each item keeps its count
+    in frequency_counts and its place in order of first addition,
+    and sits in the bucket of items with its count, an OrderedDict.
+    Adding, removing & checking for an item, and moving it between
+    buckets, take constant time.  The ranking is read off the buckets
+    from highest count to lowest; only buckets an item joined out of
+    order of first addition are sorted by place when it is read.
     """
-    def __init__(self, items=list()):
-        self.items_set = set(items)
-        set.__init__(self.items_set)
-        self.all_items = items
-        self.frequency_counts = {i: items.count(i) for i in self.all_items}
+    def __init__(self, items=()):
+        set.__init__(self)
+        self.frequency_counts = dict()  # item -> number of times added
+        self.firsts = OrderedDict()     # item -> place in order of first addition
+        self.buckets = dict()           # count -> OrderedDict(item -> place) of items with count
+        self.unsorted = set()           # counts whose buckets are out of order of first addition
+        self.next_first = 0
+        self.ranking = None             # items by rank, or None until next needed
+
+        for item in items:
+            if item in self.firsts:
+                self.frequency_counts[item] += 1
+            else:
+                self.firsts[item] = self.next_first
+                self.frequency_counts[item] = 1
+                self.next_first += 1
+        for item, first in self.firsts.iteritems():
+            self.buckets.setdefault(self.frequency_counts[item], OrderedDict())[item] = first
+        set.update(self, self.firsts)
+
+    @property
+    def all_items(self):
+        """
+        Returns a list of every item added to this OrderedSet, each
+        repeated as often as it was added, in order of first addition.
+
+        :return: List[X], list of all items added to this OrderedSet
+        """
+        return [item for item in self.firsts for i in xrange(self.frequency_counts[item])]
+
+    @property
+    def items_set(self):
+        """
+        Returns the set of this OrderedSet's items.
+
+        :return: Set(X), set of this OrderedSet's items
+        """
+        return self.get_items_set()
+
+    def find_ranking(self):
+        """
+        Returns this OrderedSet's items ordered by frequency,
+        reading them off its buckets if not done already.
+        ~
+        Unsorted buckets are sorted by place in order of first
+        addition, & stay sorted until an item joins them out of order.
+
+        :return: List[X], list ordered by frequency
+        """
+        if self.ranking is None:
+            for count in self.unsorted:
+                self.buckets[count] = OrderedDict(sorted(self.buckets[count].iteritems(), key=itemgetter(1)))
+            self.unsorted.clear()
+            self.ranking = [item for count in sorted(self.buckets, reverse=True)
+                            for item in self.buckets[count]]
+        return self.ranking
 
     def items(self):
         """
@@ -18,7 +81,15 @@ class OrderedSet(set):
 
         :return: List[X], list ordered by frequency
         """
-        return self.rank(self.all_items)
+        return list(self.find_ranking())
+
+    def get_items(self):
+        """
+        Returns a list of items ordered by frequency with no duplicates.
+
+        :return: List[X], list ordered by frequency
+        """
+        return self.items()
 
     def get_items_set(self):
         """
@@ -26,7 +97,7 @@ class OrderedSet(set):
 
         :return: Set(X), set of this OrderedSet's items
         """
-        return self.items_set
+        return set(self.firsts)
 
     def get_all_items(self):
         """
@@ -85,9 +156,9 @@ class OrderedSet(set):
 
         :return: OrderedSet(X), ordered set with item removed
         """
-        if len(self.items()) > 0:
+        if len(self) > 0:
             if item is None:
-                self.remove(self.items()[0])
+                self.remove(self.find_ranking()[0])
             else:
                 self.remove(item)
 
@@ -97,23 +168,19 @@ class OrderedSet(set):
         """
         Removes this item from items.
         ~
-        Removes all instances of item from:
+        Removes item and its count from:
         0) items
-        1) all_items
-        2) items_set
-        3) frequency_counts
+        1) frequency_counts
+        2) its bucket
 
-        :param idx: X, item to remove from items
+        :param item: X, item to remove from items
         """
-        try:
-            idx = self.items().index(item)
-        except ValueError:
+        if item not in self.firsts:
             return
-        else:
-            self.all_items = [i for i in self.all_items if i != item]
-            self.items_set.difference_update(set(item))
-            self.frequency_counts.pop(item, "")
-            del self.items()[idx]
+        self.take_from_bucket(item)
+        del self.frequency_counts[item]
+        del self.firsts[item]
+        set.discard(self, item)
 
     def update(self, other):
         """
@@ -122,8 +189,10 @@ class OrderedSet(set):
         :param other: OrderedSet(X), set to update with self
         :return: None
         """
-        if type(other) == type(self):
-            self.add_items(other.get_all_items())
+        if isinstance(other, OrderedSet):
+            for item in other.order_items():
+                if len(item) > 0:
+                    self.inc_frequency(item, other.frequency_counts[item])
         else:
             self.add_items(other)
 
@@ -133,10 +202,10 @@ class OrderedSet(set):
         ~
         e.g. s.rank(['a', 'b', 'b', 'e', 's', 's']) -> ['b', 's', 'a', 'e']
 
-        :return: None
+        :return: List[X], list ordered by frequency
         """
         if items is None:
-            items = self.all_items
+            return self.items()
         items_set = self.remove_duplicates(items)
         return sorted(items_set, key=lambda i: self.frequency_counts[i], reverse=True)
 
@@ -152,68 +221,105 @@ class OrderedSet(set):
         :return: List[X], list ordered by frequency
         """
         if items is None:
-            items = self.all_items
+            return self.items()
         seen = dict()
 
         for item in items:
             seen.setdefault(item, 0)
             seen[item] += 1
-            self.inc_frequency(item)
 
         items_set = self.remove_duplicates(items)
         return sorted(items_set, key=lambda i: seen[i], reverse=True)
 
     def order_items(self, items=None):
         """
-        Orders the given items by frequency, removing duplicates.
+        Orders the given items by first appearance, removing duplicates.
         ~
         Returns the result.
         ~
-        e.g. rank_items(['a', 'b', 'b', 'e', 's', 's']) -> ['b', 's', 'a', 'e']
+        e.g. order_items(['a', 'b', 'b', 'e', 's', 's']) -> ['a', 'b', 'e', 's']
 
         :param items: List[X], list of items
-        :return: List[X], list ordered by frequency
+        :return: List[X], list ordered by first appearance
         """
         if items is None:
-            items = self.all_items
+            return list(self.firsts)
         return self.remove_duplicates(items)
 
-    def inc_frequency(self, item):
+    def take_from_bucket(self, item):
+        """
+        Removes the given item from the bucket of its count.
+
+        :param item: X, item in this OrderedSet
+        :return: None
+        """
+        count = self.frequency_counts[item]
+        bucket = self.buckets[count]
+        del bucket[item]
+        if len(bucket) == 0:
+            del self.buckets[count]
+            self.unsorted.discard(count)
+        self.ranking = None
+
+    def put_in_bucket(self, item):
+        """
+        Adds the given item to the end of the bucket of its count,
+        marking the bucket unsorted if item was first added before
+        the bucket's last item.
+
+        :param item: X, item in this OrderedSet
+        :return: None
+        """
+        count = self.frequency_counts[item]
+        bucket = self.buckets.setdefault(count, OrderedDict())
+        first = self.firsts[item]
+        if len(bucket) != 0 and bucket[next(reversed(bucket))] > first:
+            self.unsorted.add(count)
+        bucket[item] = first
+        self.ranking = None
+
+    def inc_frequency(self, item, count=1):
         """
         Increases the frequency of the given item in
-        frequency_counts by 1.
+        frequency_counts by count, moving it to the
+        bucket of its new count.
         ~
         If this item is not in frequency_counts yet,
         this method adds an entry for this item.
 
         :param item: X, item of same type as others in items
+        :param count: int, number of times item was added
         :return: None
         """
-        self.frequency_counts.setdefault(item, int())
-        self.frequency_counts[item] += 1
+        if item in self.firsts:
+            self.take_from_bucket(item)
+        else:
+            self.firsts[item] = self.next_first
+            self.next_first += 1
+            self.frequency_counts[item] = 0
+            set.add(self, item)
+
+        self.frequency_counts[item] += count
+        self.put_in_bucket(item)
 
     def add(self, item):
         """
         Adds the given item to this OrderedSet.
         ~
-        1) Adds item to list of all items, all_items.
-        2) Adds item to items_set.
-        3) Updates frequency count of item in frequency_counts.
+        1) Adds item to items, if not there already.
+        2) Updates frequency count of item in frequency_counts.
 
         :param item: str, item to add to all_items
         :return: None
         """
         if len(item) > 0:
-            self.all_items.append(item)
-            self.items_set.add(item)
             self.inc_frequency(item)
 
     def add_items(self, items):
         """
         Adds given items to this OrderedSet.
         ~
-        1) Adds each item to all_items,
-        2) Adds each item to items_set,
+        1) Adds each item to items, if not there already.
         2) Updates frequency count of each item in frequency_counts.
 
         :param items: List[str], items to add to all_items
@@ -223,9 +329,10 @@ class OrderedSet(set):
             self.add(item)
 
     def __iter__(self):
-        return iter(self.items())
+        return iter(self.find_ranking())
 
     def __len__(self):
-        return len(self.items())
-
+        return len(self.firsts)
 
+    def __contains__(self, item):
+        return item in self.firsts
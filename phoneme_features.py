@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+PHONEME_FEATURES:
+
+    Contains NumPy arrays encoding the features of every
+    IPALetter, and matrices of the similarity & distance
+    between every pair of IPALetters, for scoring phonemes
+    and IPA strings from one encoding.
+"""
+import numpy as np
+from ipa_symbols import *
+
+SYMBOLS = sorted(IPALETTERS)    # IPALetter symbols, in order of their ids
+SYMBOL_IDS = dict((symbol, idx) for idx, symbol in enumerate(SYMBOLS))
+UNKNOWN = len(SYMBOLS)          # id of a character that is not an IPALetter
+
+# FEATURES
+# --------
+# columns of FEATURES, each 0 where a letter lacks the feature
+IS_VOWEL, IS_CONSONANT, OPENNESS, BACKNESS, ROUNDNESS, LAX, RHOTACIZED, \
+    PLACE, MANNER, VOICED, VELARIZED = range(11)
+
+
+def letter_features(letter):
+    """
+    Returns this IPALetter's features as a row of FEATURES.
+
+    :param letter: IPALetter, letter to encode
+    :return: List[float], features of letter
+    """
+    features = [0.0] * 11
+    if isinstance(letter, IPAVowel):
+        features[IS_VOWEL] = 1.0
+        features[OPENNESS] = letter.get_openness()
+        features[BACKNESS] = letter.get_backness()
+        features[ROUNDNESS] = letter.get_roundness()
+        features[LAX] = letter.lax
+        features[RHOTACIZED] = letter.rhotacized
+    elif isinstance(letter, IPAConsonant):
+        features[IS_CONSONANT] = 1.0
+        features[PLACE] = letter.get_place()
+        features[MANNER] = letter.get_manner()
+        features[VOICED] = letter.voiced
+        features[VELARIZED] = letter.velarized
+    return features
+
+
+FEATURES = np.array([letter_features(IPALETTERS[symbol]) for symbol in SYMBOLS])
+
+
+# SIMILARITIES
+# ------------
+def feature_closeness(column, total):
+    """
+    Returns the matrix of each pair of letters' closeness in
+    this scalar feature, as in IPALetter.compare_openness, etc.
+
+    :param column: int, column of feature in FEATURES
+    :param total: int, number of values the feature takes
+    :return: np.ndarray, closeness of each pair of letters
+    """
+    total = float(total)
+    values = FEATURES[:, column]
+    return total - (np.abs(values[:, None] - values[None, :]) / total)
+
+
+def feature_sameness(column):
+    """
+    Returns the matrix of whether each pair of letters shares
+    this boolean feature, as in IPALetter.compare_voiced, etc.
+
+    :param column: int, column of feature in FEATURES
+    :return: np.ndarray, 1 where a pair shares feature, 0 elsewhere
+    """
+    values = FEATURES[:, column]
+    return (values[:, None] == values[None, :]).astype(float)
+
+
+def similarity_matrix():
+    """
+    Returns the matrix of IPALetter.compare scores between
+    every pair of IPALetters, indexed by SYMBOL_IDS.
+    ~
+    Scores are computed with the same operations, in the same
+    order, as IPALetter.compare_vowels & compare_consonants, so
+    they equal compare's scores exactly.  Pairs of a vowel and
+    a consonant score 0.
+
+    :return: np.ndarray, len(SYMBOLS) x len(SYMBOLS) similarities
+    """
+    o = feature_closeness(OPENNESS, len(IPAVowel.OPENNESS))
+    b = feature_closeness(BACKNESS, len(IPAVowel.BACKNESS))
+    r = feature_closeness(ROUNDNESS, len(IPAVowel.ROUNDNESS))
+    lax = feature_sameness(LAX) / 2.0
+    rho = feature_sameness(RHOTACIZED) / 2.0
+    total = len(IPAVowel.OPENNESS) + len(IPAVowel.BACKNESS) + len(IPAVowel.ROUNDNESS) + 1.0
+    vowels = ((o + b + r + lax + rho) / total - 0.9) * 10
+
+    p = feature_closeness(PLACE, len(IPAConsonant.PLACE))
+    m = feature_closeness(MANNER, len(IPAConsonant.MANNER)) * 1.5
+    voiced = feature_sameness(VOICED) / 2.0
+    velar = feature_sameness(VELARIZED) / 2.0
+    total = len(IPAConsonant.PLACE) + (len(IPAConsonant.MANNER) * 1.5) + 1.0
+    consonants = ((p + m + voiced + velar) / total - 0.9) * 10
+
+    is_vowel = FEATURES[:, IS_VOWEL] == 1
+    is_consonant = FEATURES[:, IS_CONSONANT] == 1
+    both_vowels = is_vowel[:, None] & is_vowel[None, :]
+    both_consonants = is_consonant[:, None] & is_consonant[None, :]
+    return np.where(both_vowels, vowels, np.where(both_consonants, consonants, 0.0))
+
+
+SIMILARITIES = similarity_matrix()
+SIMILARITY_ROWS = SIMILARITIES.tolist()     # SIMILARITIES as lists, for scoring one pair at a time
+
+
+# DISTANCES
+# ---------
+def feature_difference(column, span):
+    """
+    Returns the matrix of each pair of letters' difference in
+    this feature, scaled by the feature's span to between 0 & 1.
+
+    :param column: int, column of feature in FEATURES
+    :param span: int, greatest difference in feature
+    :return: np.ndarray, scaled difference of each pair of letters
+    """
+    values = FEATURES[:, column]
+    return np.abs(values[:, None] - values[None, :]) / float(span)
+
+
+def distance_matrix():
+    """
+    Returns the matrix of feature distances between every pair
+    of IPALetters, indexed by SYMBOL_IDS, from 0 (same features)
+    to 1.
+    ~
+    A pair's distance is the mean of its scaled feature differences,
+    with features weighted as in IPALetter.compare.  Pairs of a vowel
+    and a consonant are 1 apart.
+
+    :return: np.ndarray, len(SYMBOLS) x len(SYMBOLS) distances
+    """
+    vowels = (feature_difference(OPENNESS, len(IPAVowel.OPENNESS) - 1) +
+              feature_difference(BACKNESS, len(IPAVowel.BACKNESS) - 1) +
+              feature_difference(ROUNDNESS, len(IPAVowel.ROUNDNESS) - 1) +
+              feature_difference(LAX, 1) * 0.5 +
+              feature_difference(RHOTACIZED, 1) * 0.5) / 4.0
+    consonants = (feature_difference(PLACE, len(IPAConsonant.PLACE) - 1) +
+                  feature_difference(MANNER, len(IPAConsonant.MANNER) - 1) * 1.5 +
+                  feature_difference(VOICED, 1) * 0.5 +
+                  feature_difference(VELARIZED, 1) * 0.5) / 3.5
+
+    is_vowel = FEATURES[:, IS_VOWEL] == 1
+    is_consonant = FEATURES[:, IS_CONSONANT] == 1
+    both_vowels = is_vowel[:, None] & is_vowel[None, :]
+    both_consonants = is_consonant[:, None] & is_consonant[None, :]
+    return np.where(both_vowels, vowels, np.where(both_consonants, consonants, 1.0))
+
+
+DISTANCES = distance_matrix()
+DISTANCE_ROWS = DISTANCES.tolist()      # DISTANCES as lists, for looking up one pair at a time
+
+
+# IPA STRINGS
+# -----------
+def same_ipas(ipa1, ipa2):
+    """
+    Returns the summed similarity of each pair of characters
+    at the same index in these IPAs, up to the end of the
+    shorter IPA.
+    ~
+    Pairs of IPALetters score their SIMILARITIES, as with
+    IPALetter.compare, and other pairs score 1 if equal
+    and 0 otherwise.  Pairs are scored one at a time from
+    SIMILARITY_ROWS, which is faster than going through
+    NumPy for IPAs of a word's length.
+
+    :param ipa1: unicode, first IPA to compare
+    :param ipa2: unicode, second IPA to compare
+    :return: float, similarity of IPAs
+    """
+    sims = 0.0
+    for char1, char2 in zip(ipa1, ipa2):
+        id1 = SYMBOL_IDS.get(char1, UNKNOWN)
+        id2 = SYMBOL_IDS.get(char2, UNKNOWN)
+        if id1 == UNKNOWN or id2 == UNKNOWN:
+            sims += char1 == char2
+        else:
+            sims += SIMILARITY_ROWS[id1][id2]
+    return sims
@@ -0,0 +1,153 @@
+# coding: utf-8
+"""
+PHONETIC_DISTANCE:
+
+    Contains functions for measuring how different
+    two IPA pronunciations sound.
+"""
+from phoneme_features import SYMBOL_IDS, DISTANCE_ROWS
+
+EPSILON = 0.05          # distance between distinct phonemes with the same features
+LETTER_DISTANCES = dict()   # (phoneme, phoneme) -> distance
+INFINITY = float("inf")
+
+
+def phoneme_id(phoneme):
+    """
+    Returns the SYMBOL_IDS id of this phoneme's IPALetter, or of
+    its first character's if the phoneme has diacritics, or None
+    if neither is an IPALetter.
+
+    :param phoneme: unicode, phoneme to find IPALetter of
+    :return: Optional[int], id of phoneme's IPALetter
+    """
+    idx = SYMBOL_IDS.get(phoneme, None)
+    if idx is None and len(phoneme) != 0:
+        idx = SYMBOL_IDS.get(phoneme[0], None)
+    return idx
+
+
+def letter_distance(phoneme1, phoneme2):
+    """
+    Returns how different these phonemes sound, from 0 (the same
+    phoneme) to 1.
+    ~
+    Distinct phonemes are EPSILON apart plus their feature distance
+    in phoneme_features.DISTANCES scaled to the rest of the range,
+    or 1 apart if either is not an IPALetter.  This is a metric: it
+    is symmetric, 0 only for equal phonemes, and obeys the triangle
+    inequality.
+
+    :param phoneme1: unicode, first phoneme to compare
+    :param phoneme2: unicode, second phoneme to compare
+    :return: float, 0 <= distance <= 1, distance between phonemes
+    """
+    if phoneme1 == phoneme2:
+        return 0.0
+
+    pair = (phoneme1, phoneme2)
+    try:
+        return LETTER_DISTANCES[pair]
+    except KeyError:
+        id1 = phoneme_id(phoneme1)
+        id2 = phoneme_id(phoneme2)
+        if id1 is None or id2 is None:
+            distance = 1.0
+        else:
+            distance = EPSILON + (1 - EPSILON) * DISTANCE_ROWS[id1][id2]
+        LETTER_DISTANCES[pair] = distance
+        LETTER_DISTANCES[(phoneme2, phoneme1)] = distance
+        return distance
+
+
+def phonetic_distance(phonemes1, phonemes2, limit=None):
+    """
+    Returns the weighted edit distance between these sequences
+    of phonemes.
+    ~
+    Inserting or deleting a phoneme costs 1, and substituting one
+    costs their letter_distance.  Since substitutions never cost
+    more than 2 indels, this distance is a metric too.
+    ~
+    If limit is given, returns infinity as soon as the distance
+    is known to exceed limit.  Any alignment straying more than
+    limit phonemes off the diagonal makes that many indels, so
+    only a band of 2*limit+1 cells is filled in each row, and
+    filling stops once a whole row exceeds limit.
+
+    :param phonemes1: Sequence(unicode), first phonemes to compare
+    :param phonemes2: Sequence(unicode), second phonemes to compare
+    :param limit: Optional[float], greatest distance worth computing
+    :return: float, edit distance between phonemes, or infinity if over limit
+    """
+    if phonemes1 == phonemes2:
+        return 0.0
+    if len(phonemes1) < len(phonemes2):
+        phonemes1, phonemes2 = phonemes2, phonemes1
+
+    size = len(phonemes2)
+    if limit is None:
+        band = len(phonemes1)
+    elif len(phonemes1) - size > limit:
+        return INFINITY
+    else:
+        band = int(limit)
+
+    previous = [float(j) if j <= band else INFINITY for j in range(size + 1)]
+    for i, phoneme1 in enumerate(phonemes1):
+        start = max(0, i - band)
+        stop = min(size, i + band + 1)
+        current = [INFINITY] * (size + 1)
+        if start == 0:
+            current[0] = i + 1.0
+        for j in xrange(start, stop):
+            current[j + 1] = min(previous[j + 1] + 1,
+                                 current[j] + 1,
+                                 previous[j] + letter_distance(phoneme1, phonemes2[j]))
+        if limit is not None and min(current) > limit:
+            return INFINITY
+        previous = current
+
+    distance = previous[-1]
+    if limit is not None and distance > limit:
+        return INFINITY
+    return distance
+
+
+def align_phonemes(phonemes1, phonemes2):
+    """
+    Returns the cheapest alignment of these sequences of
+    phonemes under phonetic_distance, as a list of pairs of
+    aligned phonemes, with None opposite an inserted or
+    deleted phoneme.
+    ~
+    e.g. align_phonemes(u"tɑlo", u"tɑlːo")
+         -> [(u"t", u"t"), (u"ɑ", u"ɑ"), (u"l", u"l"), (None, u"ː"), (u"o", u"o")]
+
+    :param phonemes1: Sequence(unicode), first phonemes to align
+    :param phonemes2: Sequence(unicode), second phonemes to align
+    :return: List[tuple(Optional[unicode], Optional[unicode])], aligned phonemes
+    """
+    rows = [[float(j) for j in range(len(phonemes2) + 1)]]
+    for i, phoneme1 in enumerate(phonemes1):
+        current = [i + 1.0]
+        for j, phoneme2 in enumerate(phonemes2):
+            current.append(min(rows[i][j + 1] + 1,
+                               current[j] + 1,
+                               rows[i][j] + letter_distance(phoneme1, phoneme2)))
+        rows.append(current)
+
+    alignment = list()
+    i, j = len(phonemes1), len(phonemes2)
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and rows[i][j] == rows[i - 1][j - 1] + letter_distance(phonemes1[i - 1], phonemes2[j - 1]):
+            i, j = i - 1, j - 1
+            alignment.append((phonemes1[i], phonemes2[j]))
+        elif i > 0 and rows[i][j] == rows[i - 1][j] + 1:
+            i -= 1
+            alignment.append((phonemes1[i], None))
+        else:
+            j -= 1
+            alignment.append((None, phonemes2[j]))
+    alignment.reverse()
+    return alignment
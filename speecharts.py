@@ -7,6 +7,7 @@ SPEECHARTS:
     Designed for (ideally) any language.
 """
 from ipa_parser import IPAParser, OrderedSet
+from dfa import DFA
 from images import *
 from nltk.tokenize import WordPunctTokenizer, PunktSentenceTokenizer
 import string
@@ -82,7 +83,7 @@ class Speechart(Chart):
         self.start_labels = set()
         self.success_states = dict()
         self.state_colours = dict()     # RGBs for each colour combination
-        self.transitions = dict()       # transitions functions for all states
+        self.transitions = DFA()        # transitions functions for all states
 
     def init_fonts(self):
         self.chart_lang = self.language
@@ -161,17 +162,9 @@ class Speechart(Chart):
         Returns a dictionary of all destination states for the given state.
 
         :param state: int, state number to return destinations for
-        :return: dict[int, Set], all destinations for this state
+        :return: dict[int, List], all destinations for this state
         """
-        state_transitions = [t for t in self.transitions if t[0] == state]
-        destinations = dict()
-
-        for statechar in state_transitions:
-            dest = self.transitions[statechar]
-            destinations.setdefault(dest, set())
-            destinations[dest].add(statechar[1])
-
-        return destinations
+        return self.transitions.destinations(state)
 
     def state_labels(self, state):
         """
@@ -242,11 +235,10 @@ class Speechart(Chart):
         :param char: str, character (in alphabet) to transition with
         :return: int, next state
         """
-        try:
-            new_state = self.transitions[(state, char)]
-        except KeyError:
+        new_state = self.transitions.get(state, char)
+        if new_state is None:
             new_state = self.new_state()
-            self.transitions[(state, char)] = new_state
+            self.transitions.add(state, char, new_state)
         return new_state
 
     def transition_all(self, state, chars):
@@ -278,17 +270,13 @@ class Speechart(Chart):
 
         :return: List[str], new state after all chars transitions
         """
-        labels = {}
-
-        for transition in sorted(self.transitions):
-            source, label = transition
-            if state is None or source == state:
-                dest = self.transitions[transition]
-                pair = (source, dest)
-                labels.setdefault(pair, set())
-                labels[pair].add(label)
+        if state is None:
+            sources = self.transitions.states()
+        else:
+            sources = [state]
 
-        return [", ".join(label) for label in labels.values()]
+        return [", ".join(labels) for source in sources
+                for labels in self.transitions.destinations(source).values()]
 
     # TOKENIZERS
     # ----------
@@ -0,0 +1,283 @@
+# coding: utf-8
+"""
+SUFFIX_ARRAY:
+
+    Contains SuffixArray class for finding the words of a
+    lexicon which contain, start or end with a substring,
+    and for mining the lexicon's most productive affixes.
+"""
+import numpy as np
+
+BEGIN = u"\x01"     # marks the start of each word in a SuffixArray's text
+END = u"\x00"       # marks the end of each word in a SuffixArray's text
+
+
+class SuffixArray:
+    """
+    A suffix array over the words of a lexicon, for finding
+    every word containing, starting or ending with a substring
+    in time logarithmic in the lexicon's size.
+    ~
+    Each word is written into one text as BEGIN + word + END, so a
+    word starting with s holds BEGIN + s, and one ending with s holds
+    s + END.  The suffix array lists every position of the text in
+    order of the suffix starting there, sorted by prefix doubling
+    with each END ranked apart, so no suffix is compared past the
+    end of its word.  Every suffix holding a substring is then in one
+    range of the suffix array, found by binary search.
+    ~
+    lcp holds the length of the common prefix of each suffix and the
+    one before it, up to the end of their words.  Runs of suffixes
+    sharing a long enough prefix are the words sharing an affix, which
+    mine_prefixes & mine_suffixes count without reading the words.
+    """
+    def __init__(self, words, counts=None):
+        """
+        Initializes this SuffixArray over the given words.
+
+        :param words: List[unicode], words of lexicon, each once
+        :param counts: Optional[List[Optional[int]]], count of each word, None counting as 1
+        """
+        self.words = list(words)
+        self.ids = dict((word, idx) for idx, word in enumerate(self.words))
+        if counts is None:
+            counts = [None] * len(self.words)
+        self.counts = np.array([1 if count is None else count for count in counts], dtype=np.float64)
+
+        self.text = u"".join(BEGIN + word + END for word in self.words)
+        self.codes = np.frombuffer(self.text.encode("utf-32-le"), dtype="<u4").astype(np.int64)
+        is_end = self.codes == ord(END)
+        self.starts = np.flatnonzero(self.codes == ord(BEGIN))     # position of each word's BEGIN
+        self.ends = np.flatnonzero(is_end)                          # position of each word's END
+        self.word_ids = np.cumsum(self.codes == ord(BEGIN)) - 1     # word at each position
+        # distance from each position to its word's END
+        self.to_end = self.ends[self.word_ids] - np.arange(len(self.codes))
+
+        self.array = self.sort_suffixes(is_end)
+        self.lcp = self.find_lcp()
+
+    def sort_suffixes(self, is_end):
+        """
+        Returns every position of this SuffixArray's text, in
+        order of the suffixes starting there.
+
+        :param is_end: np.ndarray, whether each position is an END
+        :return: np.ndarray, positions of text in suffix order
+        """
+        size = len(self.codes)
+        if size == 0:
+            return np.empty(0, dtype=np.intp)
+
+        # each END ranks below every character & apart from every other END
+        ends = int(is_end.sum())
+        rank = self.codes + ends
+        rank[is_end] = np.arange(ends)
+        step = 1
+
+        while True:
+            # sort by each suffix's rank, then the rank step positions on
+            following = np.zeros(size, dtype=np.int64)
+            following[:size - step] = rank[step:] + 1
+            keys = rank * (rank.max() + 2) + following
+            order = np.argsort(keys)
+            keys = keys[order]
+            changed = np.empty(size, dtype=bool)
+            changed[0] = True
+            changed[1:] = keys[1:] != keys[:-1]
+            rank = np.empty(size, dtype=np.int64)
+            rank[order] = np.cumsum(changed) - 1
+            if changed.all():
+                return order
+            step *= 2
+
+    def find_lcp(self):
+        """
+        Returns the length of the common prefix of each suffix in
+        this SuffixArray and the suffix before it, up to the end of
+        their words (0 for the first suffix).
+
+        :return: np.ndarray, common prefix length of each suffix
+        """
+        size = len(self.array)
+        lcp = np.zeros(size, dtype=np.int64)
+        if size < 2:
+            return lcp
+
+        first = self.array[:-1]
+        second = self.array[1:]
+        length = np.minimum(self.to_end[first], self.to_end[second])
+        matching = np.flatnonzero(length > 0)   # pairs matching so far
+        offset = 0
+
+        while len(matching) != 0:
+            matching = matching[self.codes[first[matching] + offset] == self.codes[second[matching] + offset]]
+            lcp[matching + 1] += 1
+            offset += 1
+            matching = matching[length[matching] > offset]
+
+        return lcp
+
+    def find_range(self, pattern):
+        """
+        Returns the range of this SuffixArray's suffixes
+        which start with this pattern.
+
+        :param pattern: unicode, substring to look up
+        :return: tuple(int, int), first & after last suffix starting with pattern
+        """
+        size = len(pattern)
+        lo, hi = 0, len(self.array)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.array[mid]
+            if self.text[start:start + size] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        first = lo
+        hi = len(self.array)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.array[mid]
+            if self.text[start:start + size] <= pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return first, lo
+
+    def pattern_words(self, pattern):
+        """
+        Returns the words holding this pattern in this
+        SuffixArray's text, from first to last in the lexicon.
+
+        :param pattern: unicode, substring to look up
+        :return: List[unicode], words holding pattern
+        """
+        start, end = self.find_range(pattern)
+        ids = np.unique(self.word_ids[self.array[start:end]])
+        return [self.words[idx] for idx in ids]
+
+    def containing(self, substring):
+        """
+        Returns the words in this SuffixArray containing this substring.
+
+        :param substring: unicode, substring to look up
+        :return: List[unicode], words containing substring
+        """
+        return self.pattern_words(substring)
+
+    def starting_with(self, prefix):
+        """
+        Returns the words in this SuffixArray starting with this prefix.
+
+        :param prefix: unicode, prefix to look up
+        :return: List[unicode], words starting with prefix
+        """
+        return self.pattern_words(BEGIN + prefix)
+
+    def ending_with(self, suffix):
+        """
+        Returns the words in this SuffixArray ending with this suffix.
+
+        :param suffix: unicode, suffix to look up
+        :return: List[unicode], words ending with suffix
+        """
+        return self.pattern_words(suffix + END)
+
+    # AFFIXES
+    # -------
+    def affix_stats(self, affix, ids, stems):
+        """
+        Returns this affix's number of words, their total count and
+        its productivity: the share of that count from words whose
+        stem is also a word in this SuffixArray.
+
+        :param affix: unicode, affix shared by words
+        :param ids: np.ndarray, ids of words with affix
+        :param stems: List[unicode], stem of each word once affix is removed
+        :return: tuple(unicode, int, int, float), affix, words, count & productivity
+        """
+        counts = self.counts[ids]
+        total = counts.sum()
+        based = sum(count for count, stem in zip(counts, stems) if stem in self.ids)
+        return affix, len(ids), int(total), based / total if total else 0.0
+
+    def mine_prefixes(self, min_words=10, max_length=5):
+        """
+        Returns every prefix of 1 to max_length characters starting
+        at least min_words longer words in this SuffixArray, with its
+        number of words, their total count and its productivity, most
+        productive (by productivity times number of words) first.
+        ~
+        Words starting with a prefix are runs of BEGIN suffixes
+        whose lcp exceeds the prefix's length.
+
+        :param min_words: int, fewest words a prefix must start
+        :param max_length: int, longest prefix to mine
+        :return: List[tuple(unicode, int, int, float)], prefixes, words, counts & productivities
+        """
+        start, end = self.find_range(BEGIN)
+        positions = self.array[start:end]
+        lcp = self.lcp[start:end]
+        lengths = self.to_end[positions] - 1
+        affixes = list()
+
+        for length in xrange(1, max_length + 1):
+            breaks = np.flatnonzero(lcp <= length)      # runs sharing BEGIN + length characters
+            bounds = np.union1d(breaks, [0, len(positions)])
+            for first, last in zip(bounds[:-1], bounds[1:]):
+                longer = first + np.flatnonzero(lengths[first:last] > length)
+                if len(longer) < min_words:
+                    continue
+                ids = self.word_ids[positions[longer]]
+                prefix = self.words[ids[0]][:length]
+                stems = [self.words[idx][length:] for idx in ids]
+                affixes.append(self.affix_stats(prefix, ids, stems))
+
+        affixes.sort(key=lambda stats: -stats[1] * stats[3])
+        return affixes
+
+    def mine_suffixes(self, min_words=10, max_length=5):
+        """
+        Returns every suffix of 1 to max_length characters ending
+        at least min_words longer words in this SuffixArray, with its
+        number of words, their total count and its productivity, most
+        productive (by productivity times number of words) first.
+        ~
+        Words ending with a suffix are runs of suffixes of that length
+        up to END whose lcp is the whole suffix.
+
+        :param min_words: int, fewest words a suffix must end
+        :param max_length: int, longest suffix to mine
+        :return: List[tuple(unicode, int, int, float)], suffixes, words, counts & productivities
+        """
+        lengths = self.to_end[self.array]
+        same = np.zeros(len(self.array), dtype=bool)
+        same[1:] = (self.lcp[1:] == lengths[1:]) & (lengths[1:] == lengths[:-1])
+        runs = np.cumsum(~same) - 1
+        # suffixes of 1 to max_length characters, not starting at a BEGIN or a whole word
+        candidates = (lengths >= 1) & (lengths <= max_length)
+        candidates &= self.codes[self.array] != ord(BEGIN)
+        candidates &= self.codes[self.array - 1] != ord(BEGIN)
+        positions = np.flatnonzero(candidates)
+        affixes = list()
+
+        # candidates are in suffix order, so each run's are together
+        bounds = np.union1d(np.flatnonzero(np.diff(runs[positions])) + 1, [0, len(positions)])
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            if last - first < min_words:
+                continue
+            members = positions[first:last]
+            ids = self.word_ids[self.array[members]]
+            length = int(lengths[members[0]])
+            suffix = self.words[ids[0]][-length:]
+            stems = [self.words[idx][:-length] for idx in ids]
+            affixes.append(self.affix_stats(suffix, ids, stems))
+
+        affixes.sort(key=lambda stats: -stats[1] * stats[3])
+        return affixes
+
+    def __len__(self):
+        return len(self.words)
@@ -5,7 +5,93 @@ TEST:
     Testing suite for IPAParser and derived classes.
 """
 from ipa_parser import *
+import os
+import json
+import time
+import random
+import shutil
+import tempfile
+import threading
 import unittest
+import BaseHTTPServer
+import SocketServer
+from wiktionary_fetcher import RateLimiter, FetchError
+from wiktionary_pipeline import ParsePipeline
+from lexicon import Lexicon, CompiledLexicon, compile_lexicon
+from entry_index import InflectionIndex, IPAIndex
+from phonetic_distance import letter_distance, phonetic_distance, align_phonemes
+from homophone_index import VPTree, NgramIndex, HomophoneIndex
+import phoneme_features
+from homophone_job import HomophoneJob
+from trie import Trie
+from lru_cache import LRUCache
+from morpheme_frequencies import MorphemeFrequencies, rank_weights
+from suffix_array import SuffixArray
+from dfa import DFA
+
+
+class TempDirParser:
+    """
+    A mixin for parsers built by their own constructor without the
+    repository's resources: their entries, caches, indexes & compiled
+    lexica are kept in the given directory.
+    """
+    ENTRY_STORE = JSONEntryStore
+
+    def use_directory(self, directory, entries=None):
+        self.directory = directory
+        self.seed_entries = entries or dict()
+        self.CACHE_PATH = os.path.join(directory, "pages")
+        self.NEGATIVE_PATH = os.path.join(directory, "missing.json")
+        self.INDEX_PATH = os.path.join(directory, "indexes")
+        self.LEXICA_PATH = os.path.join(directory, "lexica")
+
+    def fetch_wiktionary_entries(self):
+        store = self.ENTRY_STORE(os.path.join(self.directory, "entries"))
+        for word, entry in self.seed_entries.iteritems():
+            store[word] = entry
+        return store
+
+
+class TempWiktionaryParser(TempDirParser, WiktionaryParser):
+    """
+    A WiktionaryParser keeping its entries, caches & indexes
+    in the given directory.
+    """
+    def __init__(self, directory, entries=None):
+        self.use_directory(directory, entries)
+        WiktionaryParser.__init__(self)
+
+
+class OfflineWiktionaryParser(TempWiktionaryParser):
+    """
+    A TempWiktionaryParser serving pages only from its empty page cache.
+    """
+    OFFLINE = True
+
+
+class OfflineMorphemeParser(TempDirParser, MorphemeParser):
+    """
+    A MorphemeParser kept in the given directory, serving pages
+    only from its empty page cache.
+    """
+    OFFLINE = True
+
+    def __init__(self, directory, language="Finnish", entries=None):
+        self.use_directory(directory, entries)
+        MorphemeParser.__init__(self, language)
+
+
+class OfflineIPAParser(TempDirParser, IPAParser):
+    """
+    An IPAParser kept in the given directory, serving pages
+    only from its empty page cache.
+    """
+    OFFLINE = True
+
+    def __init__(self, directory, language="Finnish", entries=None):
+        self.use_directory(directory, entries)
+        IPAParser.__init__(self, language)
 
 
 class TestIPAWord(unittest.TestCase):
@@ -142,6 +228,788 @@ class TestIPAWord(unittest.TestCase):
         self.assertEqual(self.ipa_word.find_ipa_consonants(self.ipa), ans)
 
 
+class TestOrderedSet(unittest.TestCase):
+    def test_ranking(self):
+        ordered = OrderedSet(['a', 'b', 'b', 'e', 's', 's'])
+        self.assertEqual(ordered.items(), ['b', 's', 'a', 'e'])
+        self.assertEqual(ordered.order_items(), ['a', 'b', 'e', 's'])
+        self.assertEqual((len(ordered), 'e' in ordered, 'x' in ordered), (4, True, False))
+        ordered.add('e')
+        ordered.add('e')
+        self.assertEqual(list(ordered), ['e', 'b', 's', 'a'])
+        ordered.remove('b')
+        self.assertEqual(ordered.get_items(), ['e', 's', 'a'])
+        self.assertEqual(ordered.all_items, ['a', 'e', 'e', 'e', 's', 's'])
+        ordered.update(OrderedSet(['z', 'a', 'a']))
+        self.assertEqual(ordered.pop().items(), ['e', 's', 'z'])
+        self.assertEqual(ordered.items_set, {'e', 's', 'z'})
+
+    def test_random_ranking(self):
+        rand = random.Random(0)
+        ordered = OrderedSet()
+        added = list()
+        for i in range(2000):
+            item = rand.choice('abcdefghijklmnop')
+            if rand.random() < 0.1:
+                ordered.remove(item)
+                added = [other for other in added if other != item]
+            else:
+                ordered.add(item)
+                added.append(item)
+            if i % 50 == 0:
+                self.assertEqual(ordered.items(), ordered.rank_items(added))
+
+
+class TestLexicon(unittest.TestCase):
+    def test_lookups(self):
+        lexicon = Lexicon([u"on", u"ei", u"ja", u"ei"], [2995751, 1617449, 1494653, 1])
+        self.assertIn(u"ja", lexicon)
+        self.assertNotIn(u"talo", lexicon)
+        self.assertEqual(lexicon.rank(u"ei"), 1)
+        self.assertEqual(lexicon.count(u"ei"), 1617449)
+        self.assertEqual(lexicon.top(2), [u"on", u"ei"])
+        self.assertEqual(lexicon[:2], lexicon.top(2))
+        self.assertEqual(len(lexicon), 3)
+
+    def test_compiled(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            source = os.path.join(tempdir, "fi_50k.txt")
+            open(source, 'w').write(u"on 2995751\nei 1617449\nhän 1494653\nei 12\nja\n".encode("utf-8"))
+            compile_lexicon(source, os.path.join(tempdir, "fi_50k.lex"))
+            lexicon = CompiledLexicon(os.path.join(tempdir, "fi_50k.lex"))
+            self.assertEqual(len(lexicon), 4)
+            self.assertEqual(lexicon.top(3), [u"on", u"ei", u"hän"])
+            self.assertEqual(list(lexicon), [u"on", u"ei", u"hän", u"ja"])
+            self.assertEqual(lexicon[-1], u"ja")
+            self.assertEqual(lexicon.rank(u"hän"), 2)
+            self.assertEqual(lexicon.rank(u"hän".encode("utf-8")), 2)
+            self.assertEqual([lexicon.rank(word) for word in lexicon], range(4))
+            self.assertEqual((lexicon.rank(u"a"), lexicon.rank(u"ö"), lexicon.rank(u"")), (None, None, None))
+            self.assertEqual(lexicon.count(u"ei"), 1617449)
+            self.assertIsNone(lexicon.count(u"ja"))
+            self.assertNotIn(u"talo", lexicon)
+        finally:
+            shutil.rmtree(tempdir)
+
+
+class TestEntryStore(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "entries")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def fill(self, store):
+        store[u"talo"] = {u"Finnish": {u"Pronunciation": [u"tɑlo"]}}
+        store["kissa"] = {u"Finnish": {u"Pronunciation": [u"kisːɑ"]}, u"Ingrian": {}}
+        store[u"puuttuva"] = {}
+
+    def test_dict_interface(self):
+        for store in [JSONEntryStore(self.path), SQLiteEntryStore(self.path)]:
+            self.fill(store)
+            self.assertEqual(store[u"kissa"][u"Finnish"], {u"Pronunciation": [u"kisːɑ"]})
+            self.assertIn("talo", store)
+            self.assertNotIn(u"koira", store)
+            self.assertRaises(KeyError, lambda: store[u"koira"])
+            self.assertIsNone(store.get(u"koira"))
+            self.assertEqual(store.setdefault(u"koira", {}), {})
+            self.assertEqual(sorted(store), [u"kissa", u"koira", u"puuttuva", u"talo"])
+            self.assertEqual(sorted(word for word, entry in store.iter_language(u"Finnish")), [u"kissa", u"talo"])
+
+    def test_reload(self):
+        for cls in [JSONEntryStore, SQLiteEntryStore]:
+            store = cls(self.path)
+            self.fill(store)
+            store.persist()
+            self.assertEqual(store.dirty, set())
+            reloaded = cls(self.path)
+            self.assertEqual(reloaded[u"talo"], {u"Finnish": {u"Pronunciation": [u"tɑlo"]}})
+            self.assertEqual(reloaded[u"puuttuva"], {})
+            self.assertEqual(sorted(reloaded.iter_language(u"Ingrian")), [(u"kissa", {})])
+
+    def test_migrate(self):
+        store = JSONEntryStore(self.path)
+        self.fill(store)
+        store.persist()
+        store.compact()
+        migrated = SQLiteEntryStore(self.path)
+        self.assertEqual(sorted(migrated), [u"kissa", u"puuttuva", u"talo"])
+        self.assertEqual(migrated[u"kissa"], store[u"kissa"])
+        self.assertEqual(migrated[u"puuttuva"], {})
+
+    def test_interrupted_migrate(self):
+        store = JSONEntryStore(self.path)
+        self.fill(store)
+        store.compact()
+
+        def write_entry(word, entry):
+            raise IOError("interrupted")
+        interrupted = SQLiteEntryStore(self.path)
+        interrupted.write_entry = write_entry
+        self.assertRaises(IOError, interrupted.connect)
+        self.assertFalse(os.path.exists(interrupted.path))
+        self.assertEqual(sorted(SQLiteEntryStore(self.path)), [u"kissa", u"puuttuva", u"talo"])
+
+    def journal_words(self, store):
+        with open(store.journal_path) as journal:
+            return [json.loads(line)[0] for line in journal]
+
+    def test_dirty_persist(self):
+        store = JSONEntryStore(self.path)
+        self.fill(store)
+        store.persist()
+        store[u"talo"][u"Finnish"][u"Pronunciation"] = [u"ˈtɑlo"]     # not marked dirty
+        store[u"koira"] = {u"Finnish": {}}
+        store.persist()
+        self.assertEqual(self.journal_words(store)[3:], [u"koira"])
+        store.persist()
+        self.assertEqual(len(self.journal_words(store)), 4)
+
+    def test_truncated_journal(self):
+        store = JSONEntryStore(self.path)
+        self.fill(store)
+        store.persist()
+        with open(store.journal_path, "a") as journal:
+            journal.write('["koira", {"Finn')                         # crash mid-write
+        store = JSONEntryStore(self.path)
+        self.assertNotIn(u"koira", store)
+        store[u"koira"] = {u"Finnish": {}}
+        store.persist()
+        reloaded = JSONEntryStore(self.path)
+        self.assertEqual(reloaded[u"koira"], {u"Finnish": {}})
+        self.assertEqual(reloaded.journal_size, 4)
+
+    def test_compact(self):
+        store = JSONEntryStore(self.path)
+        store.COMPACT_SIZE = 4
+        self.fill(store)
+        store.persist()
+        self.assertFalse(os.path.exists(store.path))
+        store[u"koira"] = {u"Finnish": {}}
+        store.persist()
+        self.assertEqual(os.path.getsize(store.journal_path), 0)
+        self.assertEqual(json.load(open(store.path))[u"koira"], {u"Finnish": {}})
+        self.assertEqual(sorted(JSONEntryStore(self.path)), [u"kissa", u"koira", u"puuttuva", u"talo"])
+
+
+class TestEntryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.parser = OfflineWiktionaryParser(self.tempdir, {
+            u"talo": {u"Finnish": {u"Declension": [u"talo", u"talon", u"taloa"]}}})
+        self.store = self.parser.wiktionary_entries
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_lookup(self):
+        self.assertEqual(self.parser.inflection_index.lookup(u"talon", u"Finnish"), [u"talo"])
+        self.assertEqual(self.parser.inflection_index.lookup(u"talon", u"Ingrian"), [])
+
+    def test_reindex(self):
+        index = self.parser.inflection_index
+        index.find_index(u"Finnish")
+        self.parser.merge_wiktionary_entry(u"talo", {u"Finnish": {u"Declension": [u"talo", u"talot"]}}, u"Finnish")
+        self.parser.edit_wiktionary_entry(u"talo", u"Finnish", u"Declension", [u"taloja"])
+        self.assertEqual(index.lookup(u"talon", u"Finnish"), [])
+        self.assertEqual(index.lookup(u"talot", u"Finnish"), [u"talo"])
+        self.assertEqual(index.lookup(u"taloja", u"Finnish"), [u"talo"])
+
+        self.parser.refresh_wiktionary_entries()
+        reloaded = InflectionIndex(index.path, JSONEntryStore(self.store.path[:-len(".json")]))
+        self.assertEqual(reloaded.find_index(u"Finnish"), index.find_index(u"Finnish"))
+        self.assertEqual(reloaded.changed, set())
+
+    def test_stale_index(self):
+        for cls in [JSONEntryStore, SQLiteEntryStore]:
+            path = os.path.join(self.tempdir, cls.__name__)
+            store = cls(path)
+            store[u"talo"] = {u"Finnish": {u"Declension": [u"talo", u"talon"]}}
+            store.persist()
+            index = InflectionIndex(os.path.join(path, "indexes"), store)
+            index.find_index(u"Finnish")
+            index.persist()
+
+            # entries saved but the index not, as after a crash between the two
+            store[u"kala"] = {u"Finnish": {u"Declension": [u"kala", u"kalan"]}}
+            store.persist()
+            reloaded = InflectionIndex(index.path, cls(path))
+            self.assertEqual(reloaded.lookup(u"kalan", u"Finnish"), [u"kala"])
+            self.assertEqual(reloaded.changed, {u"Finnish"})
+            reloaded.persist()
+            fresh = InflectionIndex(index.path, cls(path))
+            self.assertEqual(fresh.lookup(u"kalan", u"Finnish"), [u"kala"])
+            self.assertEqual(fresh.changed, set())
+
+    def test_ipa_rows(self):
+        self.store[u"tali"] = {u"Finnish": {u"Pronunciation": [u"ˈtɑli", u"ˈtɑlːi"]}}
+        index = self.parser.ipa_index
+        self.assertEqual(index.rows(u"Finnish"), [(u"tali", u"tɑli", (u"t", u"ɑ", u"l", u"i"))])
+        self.parser.merge_wiktionary_entry(u"talo", {u"Finnish": {u"Pronunciation": [u"ˈt̪ɑlo"]}}, u"Finnish")
+        self.assertEqual(sorted(index.rows(u"Finnish"))[-1], (u"talo", u"tɑlo", (u"t", u"ɑ", u"l", u"o")))
+        self.assertEqual(index.lookup(u"tɑlo", u"Finnish"), [u"talo"])
+
+
+class TestEtymologyIndex(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.parser = OfflineWiktionaryParser(self.tempdir, {
+            u"undeniable": {u"English": {u"Etymology": [u"un-", u"deniable"]}},
+            u"deniable": {u"English": {u"Etymology": [u"deny", u"-able"]}},
+            u"deny": {u"English": {u"Etymology": [u"denier"]}},
+            u"denier": {u"English": {u"Etymology": [u"Deny"]}}})     # cites deny back
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_closure(self):
+        index = self.parser.etymology_index
+        self.assertEqual(index.closure(u"undeniable", u"English"),
+                         (u"undeniable", u"un-", u"deniable", u"deny", u"denier", u"Deny", u"-able"))
+        self.assertEqual(index.closure(u"deny", u"English"), (u"deny", u"denier", u"Deny"))
+        self.assertEqual(index.closure(u"-able", u"English"), (u"-able",))
+
+    def test_reindex(self):
+        index = self.parser.etymology_index
+        index.closure(u"undeniable", u"English")
+        index.closure(u"un-", u"English")
+        self.parser.edit_wiktionary_entry(u"deny", u"English", u"Etymology", [u"denegare"])
+        self.assertNotIn(u"undeniable", index.closures[u"English"])
+        self.assertIn(u"un-", index.closures[u"English"])
+        self.assertEqual(index.closure(u"undeniable", u"English"),
+                         (u"undeniable", u"un-", u"deniable", u"deny", u"denier", u"Deny", u"denegare", u"-able"))
+
+
+class TestSuffixArray(unittest.TestCase):
+    def setUp(self):
+        words = [u"cat", u"cats", u"dog", u"dogs", u"undo", u"redo", u"do", u"unable", u"able", u"s"]
+        self.array = SuffixArray(words, [5, 3, 4, 2, 1, 1, 6, 1, 2, None])
+
+    def test_lookups(self):
+        self.assertEqual(self.array.containing(u"do"), [u"dog", u"dogs", u"undo", u"redo", u"do"])
+        self.assertEqual(self.array.starting_with(u"un"), [u"undo", u"unable"])
+        self.assertEqual(self.array.ending_with(u"s"), [u"cats", u"dogs", u"s"])
+        self.assertEqual(self.array.ending_with(u"ca"), [])
+
+    def test_affixes(self):
+        self.assertEqual(self.array.mine_suffixes(2, 3)[0], (u"s", 2, 5, 1.0))
+        self.assertEqual(self.array.mine_prefixes(2, 3)[0], (u"un", 2, 2, 1.0))
+
+
+class TestDFA(unittest.TestCase):
+    def test_edges(self):
+        dfa = DFA()
+        dfa.add(0, u"c", 1)
+        dfa.add(0, u"k", 1)
+        dfa.add(1, u"a", 2)
+        dfa[(0, u"a")] = 3
+        dfa.add(0, u"a", 2)     # replaces 0 -a-> 3
+        self.assertEqual(dfa.get(0, u"k"), 1)
+        self.assertEqual(dfa.get(2, u"a"), None)
+        self.assertEqual(dfa.destinations(0), {1: [u"c", u"k"], 2: [u"a"]})
+        self.assertEqual(dfa.sources(2), {0: [u"a"], 1: [u"a"]})
+        self.assertEqual(dfa.sources(3), {})
+        self.assertEqual(list(dfa), [(0, u"c"), (0, u"k"), (0, u"a"), (1, u"a")])
+        self.assertEqual(len(dfa), 4)
+        self.assertEqual(dfa.labels, [u"c", u"k", u"a"])
+
+
+class TestHomophoneIndex(unittest.TestCase):
+    def test_distance(self):
+        self.assertEqual(phonetic_distance(u"tɑlo", u"tɑlo"), 0)
+        self.assertLess(letter_distance(u"p", u"b"), letter_distance(u"p", u"m"))
+        self.assertLess(phonetic_distance(u"tɑlo", u"tɑli"), phonetic_distance(u"tɑlo", u"tɑ"))
+        self.assertAlmostEqual(phonetic_distance(u"tɑlo", u"tɑli"), phonetic_distance(u"tɑli", u"tɑlo"))
+
+    def test_banded(self):
+        rand = random.Random(0)
+        for i in range(500):
+            phonemes1 = u"".join(rand.choice(u"ptkmnlaeiou") for j in range(rand.randint(0, 8)))
+            phonemes2 = u"".join(rand.choice(u"ptkmnlaeiou") for j in range(rand.randint(0, 8)))
+            limit = rand.choice([0, 0.5, 1, 2.5, 4])
+            dist = phonetic_distance(phonemes1, phonemes2)
+            expected = dist if dist <= limit else float("inf")
+            self.assertEqual(phonetic_distance(phonemes1, phonemes2, limit), expected)
+
+    def test_alignment(self):
+        self.assertEqual(align_phonemes(u"tɑlo", u"tɑlːo"),
+                         [(u"t", u"t"), (u"ɑ", u"ɑ"), (u"l", u"l"), (None, u"ː"), (u"o", u"o")])
+        self.assertEqual(align_phonemes(u"ki", u"kiː"), [(u"k", u"k"), (u"i", u"i"), (None, u"ː")])
+        self.assertEqual(align_phonemes(u"", u"ab"), [(None, u"a"), (None, u"b")])
+
+    def test_nearest_row(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            parser = OfflineIPAParser(tempdir)
+            rows = [(u"kala", u"kɑlɑ", tuple(u"kɑlɑ")),
+                    (u"tali", u"tɑli", tuple(u"tɑli")),
+                    (u"talo", u"tɑlo", tuple(u"tɑlo"))]
+            self.assertEqual(parser.nearest_row(tuple(u"tɑlo"), rows), u"talo")
+            self.assertEqual(parser.nearest_row(tuple(u"tɑle"), rows), u"tali")
+            self.assertEqual(parser.nearest_row(tuple(u"tɑlo"), list()), None)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_nearest(self):
+        rand = random.Random(0)
+        phonemes = u"ptkbdgmnlsaeiou"
+        points = list(set(u"".join(rand.choice(phonemes) for i in range(rand.randint(1, 6)))
+                          for j in range(300)))
+        tree = VPTree(points, phonetic_distance)
+        for query in [u"pato", u"ki", u"mbalse", u""]:
+            brute = sorted(phonetic_distance(query, point) for point in points)[:7]
+            nearest = [dist for dist, point in tree.nearest(query, 7)]
+            self.assertEqual([round(dist, 9) for dist in nearest], [round(dist, 9) for dist in brute])
+
+    def test_homophones(self):
+        rows = [(u"talo", u"tɑlo", (u"t", u"ɑ", u"l", u"o")),
+                (u"tali", u"tɑli", (u"t", u"ɑ", u"l", u"i")),
+                (u"talli", u"tɑlːi", (u"t", u"ɑ", u"lː", u"i")),
+                (u"kala", u"kɑlɑ", (u"k", u"ɑ", u"l", u"ɑ"))]
+        index = HomophoneIndex(rows)
+        nearest = index.nearest((u"t", u"ɑ", u"l", u"o"), 2)
+        self.assertEqual([word for dist, word in nearest], [u"talo", u"tali"])
+        self.assertEqual(index.nearest((u"t", u"ɑ", u"l", u"o"), 2, candidates=2), nearest)
+
+    def test_candidates(self):
+        points = [tuple(u"tɑlo"), tuple(u"tɑli"), tuple(u"kɑlɑ"), tuple(u"mu")]
+        index = NgramIndex(points)
+        self.assertEqual(list(index.candidates(tuple(u"tɑlo"), 2)), [0, 1])
+        self.assertEqual(list(index.candidates(tuple(u"mu"), 5)), [3])
+        self.assertEqual(list(index.candidates(tuple(u"xy"), 5)), [])
+
+        rand = random.Random(0)
+        points = list(set(tuple(rand.choice(u"ptkmnlaeiou") for i in range(rand.randint(1, 6)))
+                          for j in range(300)))
+        index = HomophoneIndex([(u"".join(point), u"".join(point), point) for point in points])
+        for query in points[:20]:
+            self.assertEqual(index.nearest(query, 1, candidates=10), [(0, u"".join(query))])
+            exact = index.nearest(query, 5)
+            approximate = index.nearest(query, 5, candidates=len(points))
+            for (dist, word), (exact_dist, exact_word) in zip(approximate, exact):
+                self.assertGreaterEqual(dist, exact_dist)
+
+
+class TestHomophoneJob(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.parser = OfflineIPAParser(self.tempdir, u"Finnish", {
+            u"talo": {u"Finnish": {u"Pronunciation": [u"ˈtɑlo"]}},
+            u"kala": {u"Finnish": {u"Pronunciation": [u"ˈkɑlɑ"]}},
+            u"tala": {u"English": {u"Pronunciation": [u"ˈtɑlə"]}},
+            u"collar": {u"English": {u"Pronunciation": [u"ˈkɑlɚ"]}}})
+        self.path = os.path.join(self.tempdir, "homophones.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def results(self):
+        with open(self.path) as output:
+            return dict((result["word"], result) for result in map(json.loads, output))
+
+    def test_run(self):
+        job = HomophoneJob(self.parser, u"English", self.path, processes=1, chunk_size=1)
+        self.assertEqual(job.run([u"talo", u"kala"]), 2)
+        results = self.results()
+        self.assertEqual(results[u"talo"]["homophone"], u"tala")
+        self.assertEqual(results[u"kala"]["homophone"], u"collar")
+        self.assertEqual(results[u"kala"]["homophone_ipa"], u"kɑlɚ")
+
+    def test_order(self):
+        job = HomophoneJob(self.parser, u"English", self.path, processes=2, chunk_size=1)
+        self.assertEqual(job.run([u"talo", u"puuttuva", u"kala"]), 3)
+        with open(self.path) as output:
+            results = map(json.loads, output)
+        self.assertEqual([result["word"] for result in results], [u"talo", u"puuttuva", u"kala"])
+        self.assertEqual((results[1]["ipa"], results[1]["homophone"], results[1]["distance"]), (None, None, None))
+
+    def test_resume(self):
+        job = HomophoneJob(self.parser, u"English", self.path, processes=1)
+        job.run([u"talo"])
+        with open(self.path, "a") as output:
+            output.write('{"word": "ka')    # interrupted mid-line
+        self.assertEqual(job.run([u"talo", u"kala"]), 1)
+        self.assertEqual(sorted(self.results()), [u"kala", u"talo"])
+        self.assertEqual(job.run([u"talo", u"kala"]), 0)
+
+
+class TestPhonemeFeatures(unittest.TestCase):
+    def test_similarities(self):
+        for i, symbol1 in enumerate(phoneme_features.SYMBOLS):
+            for j, symbol2 in enumerate(phoneme_features.SYMBOLS):
+                self.assertEqual(phoneme_features.SIMILARITIES[i, j],
+                                 IPALETTERS[symbol1].compare(IPALETTERS[symbol2]))
+
+    def test_distances(self):
+        distances = phoneme_features.DISTANCES
+        ids = phoneme_features.SYMBOL_IDS
+        self.assertTrue((distances == distances.T).all())
+        self.assertTrue((distances.diagonal() == 0).all())
+        self.assertEqual(distances[ids[u"p"], ids[u"a"]], 1.0)
+        self.assertLess(distances[ids[u"p"], ids[u"b"]], distances[ids[u"p"], ids[u"m"]])
+        self.assertEqual(letter_distance(u"pʰ", u"b"), letter_distance(u"p", u"b"))
+
+    def test_same_ipas(self):
+        ipas = [u"tɑlo", u"ˈtɑli", u"dɑːl", u"", u"xyz", u"tɑlːoja"]
+        for ipa in ipas:
+            expected = 0.0
+            for char1, char2 in zip(u"tɑlo", ipa):
+                if char1 in IPALETTERS and char2 in IPALETTERS:
+                    expected += IPALETTERS[char1].compare(IPALETTERS[char2])
+                else:
+                    expected += char1 == char2
+            self.assertAlmostEqual(phoneme_features.same_ipas(u"tɑlo", ipa), expected)
+
+
+class TestPhonemeTrie(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.parser = OfflineIPAParser(self.tempdir, "Finnish")
+        self.parser.syllable_cache = LRUCache(2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_trie(self):
+        trie = Trie([(u"t", 1), (u"ts", 2)])
+        self.assertEqual(trie.longest_match(u"atsa", 1), (3, 2))
+        self.assertEqual(trie.longest_match(u"atsa", 1, 2), (2, 1))
+        self.assertEqual(trie.longest_match(u"atsa", 0), (0, None))
+        self.assertIn(u"ts", trie)
+        self.assertNotIn(u"s", trie)
+        version = trie.version
+        trie.add(u"ts", 2)
+        self.assertEqual(trie.version, version)
+        trie.add(u"tsa", 3)
+        self.assertEqual((len(trie), trie.version), (3, version + 1))
+
+    def test_ipa_phonemes(self):
+        self.assertEqual(self.parser.ipa_phonemes(u"ˈnɑːpuri"), [u"n", u"ɑː", u"p", u"u", u"r", u"i"])
+        self.assertEqual(self.parser.ipa_phonemes(u"ɔˈba.lat͡ɕ"), [u"ɔ", u"b", u"a", u"l", u"a", u"t͡ɕ"])
+        self.assertEqual(self.parser.next_phoneme(u"ˈnɑːpuri"), (u"n", u"ɑːpuri"))
+        self.parser.learn_phoneme(u"ks")
+        self.parser.learn_phoneme(u"ak")    # mixes a vowel & a consonant
+        self.assertEqual(self.parser.ipa_phonemes(u"taksi"), [u"t", u"a", u"ks", u"i"])
+
+    def test_syllables(self):
+        self.assertEqual(self.parser.next_syllable(u"ˈtɑk.si"), (u"tɑk", u"si"))
+        self.assertEqual(self.parser.break_syllable(u"lat͡ɕ"), (u"l", u"a", u"t͡ɕ"))
+
+    def test_syllable_cache(self):
+        cache = self.parser.syllable_cache
+        syllables = self.parser.split_syllables(u"taksi", use_syllables=False)
+        self.assertEqual(syllables, [u"tak", u"si"])
+        syllables.pop()
+        self.assertEqual(self.parser.split_syllables(u"taksi", use_syllables=False), [u"tak", u"si"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.parser.learn_phoneme(u"ks")
+        self.assertEqual(self.parser.split_syllables(u"taksi", use_syllables=False), [u"ta", u"ksi"])
+        self.parser.split_syllables(u"talo", use_syllables=False)
+        self.parser.split_syllables(u"kala", use_syllables=False)
+        self.assertNotIn(("split_syllables", "Finnish", u"taksi", False), cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_words_phonemes(self):
+        self.assertEqual(self.parser.split_syllables(u"taksi", use_syllables=False), [u"tak", u"si"])
+        other = OfflineIPAParser(os.path.join(self.tempdir, "other"))
+        ipa_word = IPAWord(u"x", "Finnish", parser=other)
+        ipa_word.ipa, ipa_word.difficulty = u"ks", 0
+        self.parser.ipa_words_phonemes([ipa_word])
+        self.assertTrue(self.parser.is_ipa_phoneme(u"ks"))
+        self.assertIn(u"ks", self.parser.phoneme_trie)
+        self.assertEqual(self.parser.ipa_phonemes(u"taksi"), [u"t", u"a", u"ks", u"i"])
+        self.assertEqual(self.parser.split_syllables(u"taksi", use_syllables=False), [u"ta", u"ksi"])
+
+    def test_morpheme_parser_syllables(self):
+        parser = OfflineMorphemeParser(self.tempdir)
+        self.assertEqual(parser.split_syllables(u"ɔˈba.lat͡ɕ"), [u"ɔ", u"ba", u"lat͡ɕ"])
+        self.assertEqual(parser.split_syllables(u"ɔˈba.lat͡ɕ"), [u"ɔ", u"ba", u"lat͡ɕ"])
+        self.assertEqual(parser.syllable_cache.hits, 1)
+
+
+class TestMorphemes(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.parser = OfflineIPAParser(self.tempdir)
+        self.parser.morpheme_trie = Trie()
+        self.parser.learn_morphemes(["un", "happi", "happy", "ness", "ha"])
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_strip_affixes(self):
+        self.assertEqual(self.parser.strip_affixes("unhappiness"), ["un", "happi", "ness"])
+        self.assertEqual(self.parser.strip_affixes("unhappyxy"), ["un", "happy", "xy"])
+        self.assertEqual(self.parser.strip_affixes("unxness"), ["unxness"])
+        self.assertEqual(self.parser.strip_affixes("happy"), ["happy"])
+        self.assertEqual(self.parser.strip_affixes("xyz"), ["xyz"])
+        self.parser.learn_morphemes(["he", "at", "on", "key"])
+        self.assertEqual(self.parser.strip_affixes("hello"), ["hello"])
+        self.assertEqual(self.parser.strip_affixes("station"), ["station"])
+        self.assertEqual(self.parser.strip_affixes("monkey"), ["monkey"])
+        self.parser.add_word_morphemes("redo")
+        self.assertEqual(self.parser.strip_affixes("redoness"), ["redo", "ness"])
+        self.parser.add_word_morphemes("unhappyxy")
+        self.assertNotIn("xy", self.parser.morpheme_trie)
+
+    def test_frequencies(self):
+        freqs = MorphemeFrequencies(iter(["Un", "un", "ness", "happy"]))
+        freqs.merge(MorphemeFrequencies(["ness", "re"]))
+        self.assertEqual(freqs.freqs(), {"un": 2, "ness": 2, "happy": 1, "re": 1})
+        weights = rank_weights(["re", "un", "re", "ness"], 100)
+        self.assertEqual(weights, {"re": 0.0, "un": 1.0, "ness": 3.0})
+        self.assertEqual(freqs.weighted_freqs(weights), {"un": 2, "ness": 6, "happy": 1, "re": 0})
+
+
+class TestWiktionaryPage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.mkdtemp()
+        cls.parser = OfflineWiktionaryParser(cls.tempdir)
+        cls.html = open(cls.parser.PATH + "/resources/fixtures/pages/talo.html").read().decode("utf-8")
+        cls.wikt_page = WiktionaryPage(None, parser=cls.parser, page=BeautifulSoup(""))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tempdir)
+
+    def test_page_entries(self):
+        entries = self.wikt_page.page_entries(BeautifulSoup(self.html), u"Finnish")
+        self.assertEqual(entries[u"Finnish"][u"Etymology"], [u"tal", u"-o"])
+        self.assertEqual(entries[u"Finnish"][u"Pronunciation"], [u"tɑlo", u"t̪ɑlo"])
+        self.assertEqual(entries[u"Finnish"][u"Noun"][-1], (u"plural of tal", u"tal"))
+
+    def test_single_pass(self):
+        directory = self.parser.PATH + "/resources/fixtures/pages"
+        for filename in sorted(os.listdir(directory)):
+            html = open(os.path.join(directory, filename)).read().decode("utf-8")
+            for language in [None, u"Finnish", u"Ingrian", u"Danish"]:
+                sections = self.wikt_page.page_sections(BeautifulSoup(html), language)
+                soupified = self.wikt_page.soupified_sections(BeautifulSoup(html), language)
+                self.assertEqual([(lang, header) for lang, header, section in sections],
+                                 [(lang, header) for lang, header, section in soupified])
+                self.assertEqual(self.wikt_page.page_entries(BeautifulSoup(html), language),
+                                 self.wikt_page.page_entries(BeautifulSoup(html), language, single_pass=False))
+
+    def test_layouts(self):
+        page = lambda word: BeautifulSoup(open(self.parser.PATH + "/resources/fixtures/pages/%s.html" % word).read())
+        sections = self.wikt_page.page_sections(page("kuusi"), u"Finnish")
+        self.assertEqual([header for lang, header, section in sections],
+                         [u"Etymology 1", u"Pronunciation", u"Noun", u"Declension",
+                          u"Etymology 2", u"Pronunciation", u"Numeral", u"Declension"])
+        entries = self.wikt_page.page_entries(page("kala"))
+        self.assertEqual(sorted(entries), [u"Estonian", u"Finnish", u"Ingrian", u"Votic"])
+        self.assertEqual(entries[u"Estonian"][u"Declension"], [u"kala", u"kalad", u"kalade"])
+        self.assertEqual(self.wikt_page.page_sections(page("hus"), u"Finnish"), [])
+        self.assertEqual(self.wikt_page.page_entries(page("hus"), u"Finnish"), {})
+
+    def test_language_boundary(self):
+        html = u"""<div>
+<h2><span class="mw-headline" id="Finnish">Finnish</span></h2>
+<h3><span class="mw-headline" id="Pronunciation">Pronunciation</span></h3>
+<ul><li>IPA: <span class="IPA">/ˈtɑlo/</span></li></ul>
+<h2><span class="mw-headline" id="Ingrian">Ingrian</span></h2>
+<ul><li>IPA: <span class="IPA">/ˈtɑlːo/</span></li></ul>
+<h3><span class="mw-headline" id="Noun">Noun</span></h3>
+<p><strong>talo</strong></p>
+</div>"""
+        # a section ends at the next language's h2, where the soupified path ran on to the next h3
+        entries = self.wikt_page.page_entries(BeautifulSoup(html), u"Finnish")
+        self.assertEqual(entries[u"Finnish"][u"Pronunciation"], [u"tɑlo"])
+        entries = self.wikt_page.page_entries(BeautifulSoup(html), u"Finnish", single_pass=False)
+        self.assertEqual(entries[u"Finnish"][u"Pronunciation"], [u"tɑlo", u"tɑlːo"])
+
+    def test_table_headers(self):
+        cell = lambda word: u'<td><a href="/wiki/%s#Finnish">%s</a></td>' % (word, word)
+        html = (u'<table><tr><th rowspan="2">case</th><th>singular</th><th>plural</th></tr>'
+                u'<tr><th>number</th><th>number</th></tr>'
+                u'<tr><th>nominative</th>%s%s</tr>'
+                u'<tr><th>genitive</th>%s%s</tr></table>') % (cell(u"talo"), cell(u"talot"),
+                                                              cell(u"talon"), cell(u"talojen"))
+        table = WiktionaryTable(BeautifulSoup(html), u"Finnish", self.wikt_page)
+        self.assertEqual(table.cell_rows((3, 2)), (u"genitive",))
+        self.assertEqual(table.cell_cols((3, 2)), (u"plural", u"number"))
+        self.assertEqual(table.get_declension()[u"plural > number"],
+                         {u"nominative": [u"talot"], u"genitive": [u"talojen"]})
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Serves canned Wiktionary pages from the server's pages dict.
+    """
+    def do_GET(self):
+        word = self.path.split("/wiki/", 1)[-1].split("#", 1)[0]
+        html = self.server.pages.get(word, None)
+        self.server.requested.append(word)
+        if word in self.server.statuses:
+            self.send_response(self.server.statuses[word])
+            self.end_headers()
+        elif html is None:
+            self.send_response(404)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(html.encode("utf-8"))
+
+    def log_message(self, *args):
+        return
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class UppercaseIPAParser(TempWiktionaryParser):
+    """
+    A TempWiktionaryParser uppercasing the IPAs it parses, so pages
+    parsed by it can be told apart.
+    """
+    def page_ipas(self, page):
+        return [ipa.upper() for ipa in WiktionaryParser.page_ipas(self, page)]
+
+
+class TestBulkFetcher(unittest.TestCase):
+    PAGE = u"""<html><body>
+<h2><span class="mw-headline" id="Finnish">Finnish</span></h2>
+<h3><span class="mw-headline" id="Pronunciation">Pronunciation</span></h3>
+<ul><li>IPA: <span class="IPA">/%s/</span></li></ul>
+</body></html>"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer(("127.0.0.1", 0), StandInHandler)
+        cls.server.pages = {"talo": cls.PAGE % u"ˈtɑlo",
+                            "kissa": cls.PAGE % u"ˈkisːɑ",
+                            "koira": cls.PAGE % u"ˈkoirɑ"}
+        cls.server.statuses = {"ruuhka": 503}
+        cls.server.requested = list()
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.parser = self.stand_in_parser(TempWiktionaryParser)
+
+    def stand_in_parser(self, parser_class):
+        parser = parser_class(self.tempdir)
+        parser.BASE_URL = "http://127.0.0.1:%d/wiki/%%s#%%s" % self.server.server_address[1]
+        return parser
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_ordered_entries(self):
+        words = [u"koira", u"puuttuva", u"talo", u"kissa"]
+        fetcher = BulkFetcher(self.parser, workers=3)
+        results = list(fetcher.fetch_entries(words, "Finnish"))
+        self.assertEqual([word for word, entries in results], words)
+        self.assertEqual(results[1][1], dict())
+        self.assertEqual(results[2][1][u"Finnish"][u"Pronunciation"], [u"tɑlo"])
+
+    def test_add_wiktionary_entries(self):
+        self.parser.add_wiktionary_entries([u"talo", u"kissa"], "Finnish", workers=2, rate=50)
+        self.assertEqual(self.parser.lookup_wiktionary_subentry(u"kissa", u"Finnish", u"Pronunciation"),
+                         [u"kisːɑ"])
+        self.assertEqual(self.parser.wiktionary_entries.dirty, {u"talo", u"kissa"})
+
+    def test_offline_replay(self):
+        self.parser.add_wiktionary_entries([u"koira"], "Finnish", workers=1)
+        self.parser.wiktionary_entries = JSONEntryStore(os.path.join(self.tempdir, "offline"))
+        self.parser.offline = True
+        requested = len(self.server.requested)
+        self.parser.add_wiktionary_entries([u"koira", u"talo"], "Finnish", workers=2)
+        self.assertEqual(len(self.server.requested), requested)
+        self.assertEqual(self.parser.lookup_wiktionary_subentry(u"koira", u"Finnish", u"Pronunciation"),
+                         [u"koirɑ"])
+        self.assertNotIn(u"talo", self.parser.wiktionary_entries)
+
+    def test_negative_cache(self):
+        self.parser.find_wiktionary_entry(u"puuttuva", u"Finnish")
+        requested = len(self.server.requested)
+        self.assertIsNone(self.parser.find_wiktionary_entry(u"puuttuva", u"Finnish"))
+        self.assertEqual(len(self.server.requested), requested)
+        self.assertEqual(self.parser.negative_cache.stats()["hits"], 1)
+        self.parser.refresh_wiktionary_entries()
+        self.assertTrue(NegativeCache(self.parser.negative_cache.path).lookup(u"puuttuva", u"Finnish"))
+
+    def test_failed_fetch(self):
+        self.assertRaises(requests.HTTPError, self.parser.find_wiktionary_entry, u"ruuhka", u"Finnish")
+        self.assertFalse(self.parser.negative_cache.lookup(u"ruuhka", u"Finnish"))
+        self.assertIsNone(self.parser.page_cache.lookup(self.parser.word_url(u"ruuhka")))
+
+    def test_fetch_errors(self):
+        for processes in [None, 2]:
+            self.parser.wiktionary_entries = JSONEntryStore(os.path.join(self.tempdir, "entries%s" % processes))
+            with self.assertRaises(FetchError) as raised:
+                self.parser.add_wiktionary_entries([u"talo", u"ruuhka", u"kissa"], "Finnish",
+                                                   workers=2, processes=processes)
+            self.assertEqual(list(raised.exception.errors), [u"ruuhka"])
+            self.assertEqual(sorted(self.parser.wiktionary_entries), [u"kissa", u"talo"])
+            self.assertFalse(self.parser.negative_cache.lookup(u"ruuhka", u"Finnish"))
+
+    def test_pipeline(self):
+        words = [u"koira", u"puuttuva", u"talo", u"kissa"]
+        fetched = list(BulkFetcher(self.parser, workers=2).fetch_entries(words, "Finnish"))
+        pipeline = ParsePipeline(self.parser, workers=2, processes=2)
+        self.assertEqual(list(pipeline.fetch_entries(words, "Finnish")), fetched)
+
+    def test_pipeline_parser_class(self):
+        parser = self.stand_in_parser(UppercaseIPAParser)
+        entries = dict(ParsePipeline(parser, workers=2, processes=2).fetch_entries([u"talo"], "Finnish"))
+        self.assertEqual(entries[u"talo"], {u"Finnish": {u"Pronunciation": [u"tɑlo".upper()]}})
+        parser.HEADER_NAMES = {u"Etymology"}
+        entries = dict(ParsePipeline(parser, workers=2, processes=2).fetch_entries([u"talo"], "Finnish"))
+        self.assertNotIn(u"Pronunciation", entries[u"talo"].get(u"Finnish", {}))
+
+    def test_reparse(self):
+        self.parser.add_wiktionary_entries([u"talo", u"kissa"], "Finnish", workers=2)
+        self.parser.wiktionary_entries = JSONEntryStore(os.path.join(self.tempdir, "reparsed"))
+        requested = len(self.server.requested)
+        self.parser.reparse_wiktionary_entries([u"talo", u"kissa", u"koira"], "Finnish", processes=2)
+        self.assertEqual(len(self.server.requested), requested)
+        self.assertEqual(sorted(self.parser.wiktionary_entries.words()), [u"kissa", u"talo"])
+
+    def test_reparse_expired(self):
+        self.parser.page_cache.ttl = 60
+        self.parser.add_wiktionary_entries([u"talo"], "Finnish", workers=1)
+        for path in self.parser.page_cache.cached_files():
+            expired = time.time() - 3600
+            os.utime(path, (expired, expired))
+        self.assertIsNone(self.parser.page_cache.lookup(self.parser.word_url(u"talo")))
+        self.parser.wiktionary_entries = JSONEntryStore(os.path.join(self.tempdir, "reparsed"))
+        self.parser.reparse_wiktionary_entries([u"talo"], "Finnish", processes=2)
+        self.assertEqual(self.parser.lookup_wiktionary_subentry(u"talo", u"Finnish", u"Pronunciation"),
+                         [u"tɑlo"])
+
+    def test_page_cache(self):
+        cache = PageCache(os.path.join(self.tempdir, "cache"))
+        cache.store(u"http://127.0.0.1/wiki/talo#Finnish", u"<html>tɑlo</html>")
+        self.assertEqual(cache.lookup(u"http://127.0.0.1/wiki/talo#Ingrian"), u"<html>tɑlo</html>")
+        self.assertIsNone(cache.lookup(u"http://127.0.0.1/wiki/kala#Finnish"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache = PageCache(os.path.join(self.tempdir, "cache"))
+        cache.store(u"http://127.0.0.1/wiki/talo", u"<html>tɑlo</html>")
+        cache.store(u"http://127.0.0.1/wiki/talo", u"<html>tɑlo</html>")
+        self.assertEqual(cache.size, cache.disk_size())
+
+    def test_rate_limit(self):
+        limiter = RateLimiter(rate=20)
+        start = time.time()
+        for i in range(5):
+            limiter.wait("http://127.0.0.1/wiki/talo")
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+TRIE:
+
+    Contains Trie class for finding the keys (or the
+    longest key) at the start of strings.
+"""
+
+
+class Trie:
+    """
+    A class for mapping string keys to values, which finds the
+    longest key starting at any position of a string in time
+    proportional to that key's length.
+    ~
+    Each node is a dict from a character to the next node, holding
+    its key's value under END if a key ends there.  The version
+    counts changes to this Trie's keys & values, so results
+    computed from it can tell when they are stale.
+    """
+    END = None  # node key holding the value of the key ending at that node
+
+    def __init__(self, items=None):
+        """
+        Initializes this Trie with the given keys & values.
+
+        :param items: Optional[Iterable[tuple(unicode, X)]], keys & values to add
+        """
+        self.root = dict()
+        self.size = 0
+        self.version = 0
+        if items is not None:
+            for key, value in items:
+                self.add(key, value)
+
+    def add(self, key, value=True):
+        """
+        Adds this key to this Trie with the given value,
+        replacing any value it had.
+
+        :param key: unicode, non-empty key to add
+        :param value: X, value of key
+        :return: None
+        """
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, dict())
+
+        if self.END not in node:
+            self.size += 1
+        elif node[self.END] == value:
+            return
+        node[self.END] = value
+        self.version += 1
+
+    def find_node(self, key):
+        """
+        Returns the node this key leads to, or None if
+        no key in this Trie starts with it.
+
+        :param key: unicode, key to look up
+        :return: Optional[dict], node of key
+        """
+        node = self.root
+        for char in key:
+            node = node.get(char, None)
+            if node is None:
+                break
+        return node
+
+    def get(self, key, default=None):
+        """
+        Returns this key's value, or default if not in this Trie.
+
+        :param key: unicode, key to look up
+        :param default: X, value to return if key is absent
+        :return: X, value of key
+        """
+        node = self.find_node(key)
+        if node is None:
+            return default
+        return node.get(self.END, default)
+
+    def longest_match(self, text, start=0, stop=None):
+        """
+        Returns the end of the longest key in this Trie found
+        in text at start, and that key's value.
+        ~
+        e.g. Trie([(u"t", 1), (u"ts", 2)]).longest_match(u"atsa", 1) -> (3, 2)
+
+        :param text: unicode, text to find key in
+        :param start: int, index of text where key must start
+        :param stop: Optional[int], index of text where key must end by
+        :return: tuple(int, X), end of longest key & its value, or (start, None) if none
+        """
+        if stop is None:
+            stop = len(text)
+        node = self.root
+        end, value = start, None
+
+        for idx in xrange(start, stop):
+            node = node.get(text[idx], None)
+            if node is None:
+                break
+            if self.END in node:
+                end, value = idx + 1, node[self.END]
+
+        return end, value
+
+    def matches(self, text, start=0, stop=None):
+        """
+        Returns the end of every key in this Trie found in
+        text at start, with each key's value, shortest first.
+        ~
+        e.g. Trie([(u"t", 1), (u"ts", 2)]).matches(u"atsa", 1) -> [(2, 1), (3, 2)]
+
+        :param text: unicode, text to find keys in
+        :param start: int, index of text where keys must start
+        :param stop: Optional[int], index of text where keys must end by
+        :return: List[tuple(int, X)], ends of keys & their values
+        """
+        if stop is None:
+            stop = len(text)
+        node = self.root
+        found = list()
+
+        for idx in xrange(start, stop):
+            node = node.get(text[idx], None)
+            if node is None:
+                break
+            if self.END in node:
+                found.append((idx + 1, node[self.END]))
+
+        return found
+
+    def __contains__(self, key):
+        node = self.find_node(key)
+        return node is not None and self.END in node
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,269 @@
+# coding: utf-8
+"""
+WIKTIONARY_CACHE:
+
+    Contains PageCache class for keeping fetched Wiktionary
+    pages on disk, and NegativeCache class for remembering
+    words without Wiktionary entries.
+"""
+import os
+import time
+import gzip
+import json
+import hashlib
+import threading
+
+
+class PageCache:
+    """
+    A class for caching the HTML of fetched pages on disk.
+    ~
+    Each page is gzipped into a file named by the SHA-1 of its URL,
+    less any fragment, under a subdirectory named by the hash's
+    first 2 characters.  URLs differing only in their fragment (e.g.
+    a word's page for different languages) share a file.
+    ~
+    Pages older than ttl seconds are treated as missing, unless
+    looked up with ignore_ttl.  Once the cache grows past max_size
+    bytes, the least recently read pages are deleted until it is
+    back under 90% of max_size.
+    """
+    def __init__(self, path, ttl=None, max_size=None):
+        """
+        Initializes this PageCache in the directory at path.
+
+        :param path: str, directory to keep cached pages in
+        :param ttl: Optional[float], seconds before a cached page expires
+        :param max_size: Optional[int], most bytes to keep on disk
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.size = None    # bytes on disk, counted on first store
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def url_path(self, url):
+        """
+        Returns the path of the cache file for this URL.
+
+        :param url: str, URL of cached page
+        :return: str, path of cached page's file
+        """
+        url = url.split("#", 1)[0]
+        if isinstance(url, unicode):
+            url = url.encode("utf-8")
+        key = hashlib.sha1(url).hexdigest()
+        return os.path.join(self.path, key[:2], key + ".html.gz")
+
+    def lookup(self, url, ignore_ttl=False):
+        """
+        Returns the cached HTML for this URL, or None if
+        no unexpired page is cached.
+        ~
+        If ignore_ttl, expired pages are returned as well, for
+        when there is no fetching a fresher page instead.
+
+        :param url: str, URL of page to look up
+        :param ignore_ttl: bool, whether to return expired pages
+        :return: Optional[unicode], cached HTML for URL
+        """
+        html = self.read(url, ignore_ttl)
+        with self.lock:     # lookups come from many fetcher threads
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return html
+
+    def read(self, url, ignore_ttl=False):
+        """
+        Returns the cached HTML for this URL, as lookup does,
+        without counting a hit or miss.
+
+        :param url: str, URL of page to read
+        :param ignore_ttl: bool, whether to return expired pages
+        :return: Optional[unicode], cached HTML for URL
+        """
+        path = self.url_path(url)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+
+        if self.ttl is not None and not ignore_ttl and time.time() - mtime > self.ttl:
+            return
+
+        try:
+            with gzip.open(path) as cached:
+                html = cached.read().decode("utf-8")
+            os.utime(path, (time.time(), mtime))   # atime orders eviction, mtime expiry
+        except (IOError, EOFError, OSError):    # evicted meanwhile, or partly written
+            return
+        return html
+
+    def store(self, url, html):
+        """
+        Caches this HTML for this URL.
+
+        :param url: str, URL of page to cache
+        :param html: unicode, HTML of page to cache
+        :return: None
+        """
+        path = self.url_path(url)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:     # made by another thread
+                pass
+
+        temp_path = "%s.%d.tmp" % (path, threading.current_thread().ident)
+        with gzip.open(temp_path, "wb") as cached:
+            cached.write(html.encode("utf-8"))
+
+        with self.lock:
+            if self.size is None:
+                self.size = self.disk_size()
+            if os.path.exists(path):    # counted already, & replaced below
+                self.size -= os.path.getsize(path)
+            os.rename(temp_path, path)
+            self.size += os.path.getsize(path)
+
+            if self.max_size is not None and self.size > self.max_size:
+                self.evict(int(self.max_size * 0.9))
+
+    def cached_files(self):
+        """
+        Returns the paths of all pages in this PageCache.
+
+        :return: List[str], paths of cached pages' files
+        """
+        paths = list()
+        for directory, subdirectories, filenames in os.walk(self.path):
+            paths += [os.path.join(directory, filename) for filename in filenames
+                      if filename.endswith(".html.gz")]
+        return paths
+
+    def disk_size(self):
+        """
+        Returns the number of bytes this PageCache takes up on disk.
+
+        :return: int, bytes of cached pages
+        """
+        return sum(os.path.getsize(path) for path in self.cached_files())
+
+    def evict(self, size):
+        """
+        Deletes the least recently read pages in this PageCache
+        until it takes up no more than size bytes.
+
+        :param size: int, most bytes to keep on disk
+        :return: None
+        """
+        paths = sorted(self.cached_files(), key=lambda p: os.path.getatime(p))
+
+        for path in paths:
+            if self.size <= size:
+                break
+            self.size -= os.path.getsize(path)
+            os.remove(path)
+
+
+class NegativeCache:
+    """
+    A class for remembering which words have no Wiktionary
+    entry in a language, so their pages need not be fetched
+    again until ttl seconds have passed.
+    ~
+    Counts its hits (lookups of words known to be missing)
+    and misses (all other lookups).
+    """
+    def __init__(self, path, ttl=None):
+        """
+        Initializes this NegativeCache from the JSON file at path.
+
+        :param path: str, path of .json file to keep missing words in
+        :param ttl: Optional[float], seconds before a missing word is retried
+        """
+        self.path = path
+        self.ttl = ttl
+        self.changed = False
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            self.missing = json.load(open(path))
+        else:
+            self.missing = dict()   # language -> word -> time found missing
+
+    def lookup(self, word, language):
+        """
+        Returns True if this word is known to have no entry
+        in this language, False otherwise.
+
+        :param word: str, word to look up
+        :param language: str, language of entry
+        :return: bool, whether word has no entry in language
+        """
+        try:
+            found = self.missing[language][word]
+        except KeyError:
+            self.misses += 1
+            return False
+
+        if self.ttl is not None and time.time() - found > self.ttl:
+            self.discard(word, language)
+            self.misses += 1
+            return False
+        else:
+            self.hits += 1
+            return True
+
+    def add(self, word, language):
+        """
+        Remembers that this word has no entry in this language.
+
+        :param word: str, word without entry
+        :param language: str, language of entry
+        :return: None
+        """
+        self.missing.setdefault(language, dict())[word] = time.time()
+        self.changed = True
+
+    def discard(self, word, language):
+        """
+        Forgets that this word had no entry in this language.
+
+        :param word: str, word to forget
+        :param language: str, language of entry
+        :return: None
+        """
+        if self.missing.get(language, dict()).pop(word, None) is not None:
+            self.changed = True
+
+    def stats(self):
+        """
+        Returns this NegativeCache's hit & miss counts and
+        its number of missing words.
+
+        :return: dict(str, int), counts for "hits", "misses" & "size"
+        """
+        size = sum(len(words) for words in self.missing.values())
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def persist(self):
+        """
+        Saves this NegativeCache's missing words to its JSON
+        file if any changed.
+
+        :return: None
+        """
+        if not self.changed:
+            return
+
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        json.dump(self.missing, open(self.path, 'w'), encoding='utf-8')
+        self.changed = False
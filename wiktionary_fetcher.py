@@ -0,0 +1,165 @@
+# coding: utf-8
+"""
+WIKTIONARY_FETCHER:
+
+    Contains BulkFetcher class for fetching many Wiktionary
+    entries at once over a pool of threads.
+"""
+import time
+import urlparse
+import threading
+from Queue import Queue
+import requests
+
+
+class FetchError(Exception):
+    """
+    Raised once a bulk fetch is done if any words' pages
+    could not be fetched, with each word's error in errors.
+    """
+    def __init__(self, errors):
+        Exception.__init__(self, "could not fetch %d words: %s" % (len(errors), ", ".join(sorted(errors))))
+        self.errors = errors
+
+
+class RateLimiter:
+    """
+    A class for spacing out requests to each host
+    so that no host receives more than rate requests
+    per second.
+    """
+    def __init__(self, rate=None):
+        self.interval = 0.0 if rate is None else 1.0 / rate
+        self.next_times = dict()    # host -> earliest time of next request
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        """
+        Blocks until a request to this URL's host is allowed.
+
+        :param url: str, URL about to be requested
+        :return: None
+        """
+        host = urlparse.urlparse(url).netloc
+        with self.lock:
+            now = time.time()
+            start = max(now, self.next_times.get(host, now))
+            self.next_times[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class RateLimitedSession(requests.Session):
+    """
+    A requests Session which waits on a RateLimiter
+    before each request it sends.
+    """
+    def __init__(self, limiter):
+        requests.Session.__init__(self)
+        self.limiter = limiter
+
+    def request(self, method, url, *args, **kwargs):
+        self.limiter.wait(url)
+        return requests.Session.request(self, method, url, *args, **kwargs)
+
+
+class BulkFetcher:
+    """
+    A class for fetching Wiktionary entries for many words
+    concurrently, with a bounded pool of worker threads.
+    ~
+    Each worker has its own Session, and every Session shares
+    one RateLimiter, so the rate limit holds per host across
+    the whole pool.  Entries are yielded in the order their
+    words were given, whatever order their pages arrive in.
+    """
+    def __init__(self, parser, workers=8, rate=None):
+        """
+        Initializes this BulkFetcher for the given parser.
+
+        :param parser: WiktionaryParser, parser to fetch & parse pages with
+        :param workers: int, number of pages to fetch at once
+        :param rate: Optional[float], most requests per second to any one host
+        """
+        self.parser = parser
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.window = workers * 4   # most results fetched but not yet yielded
+        self.errors = dict()        # word -> exception raised fetching it
+
+    def work(self, tasks, results, language):
+        """
+        Fetches entries for the words on tasks and puts them on results
+        until tasks yields None.
+
+        :param tasks: Queue, (index, word) pairs to fetch
+        :param results: Queue, (index, word, entries) triples fetched
+        :param language: str, language of entries to fetch
+        :return: None
+        """
+        session = RateLimitedSession(self.limiter)
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            idx, word = task
+            try:
+                entries = self.parser.fetch_wiktionary_entry(word, language, session)
+            except Exception as e:  # a bad page must not stall the whole pool
+                self.errors[word] = e
+                entries = None
+            results.put((idx, word, entries))
+
+    def feed(self, words, tasks, window):
+        """
+        Puts each of these words on tasks, keeping no more than
+        this BulkFetcher's window of words in flight.
+
+        :param words: List[str], words to fetch
+        :param tasks: Queue, queue to put (index, word) pairs on
+        :param window: threading.Semaphore, released as results are yielded
+        :return: None
+        """
+        for idx, word in enumerate(words):
+            window.acquire()
+            tasks.put((idx, word))
+        for i in range(self.workers):
+            tasks.put(None)
+
+    def fetch_entries(self, words, language=None):
+        """
+        Yields each of these words with its Wiktionary entries,
+        in the order of the given words.
+        ~
+        Words whose pages could not be fetched are yielded with
+        None for entries, and their errors kept in self.errors.
+
+        :param words: List[str], words to fetch entries for
+        :param language: Optional[str], language of entries to fetch
+        :return: Iterator[tuple(str, dict)], words & their entries
+        """
+        language = self.parser.verify_language(language)
+        words = list(words)
+        tasks = Queue()
+        results = Queue()
+        window = threading.Semaphore(self.window)
+
+        threads = [threading.Thread(target=self.feed, args=(words, tasks, window))]
+        threads += [threading.Thread(target=self.work, args=(tasks, results, language))
+                    for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        pending = dict()
+        next_idx = 0
+
+        while next_idx < len(words):
+            idx, word, entries = results.get()
+            pending[idx] = (word, entries)
+            while next_idx in pending:
+                yield pending.pop(next_idx)
+                window.release()
+                next_idx += 1
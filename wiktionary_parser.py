@@ -9,8 +9,14 @@ import re
 import string
 import json
 import requests
-from BeautifulSoup import BeautifulSoup
+from BeautifulSoup import BeautifulSoup, SoupStrainer, Tag, Comment
 from ordered_set import OrderedSet
+from entry_store import *
+from entry_index import InflectionIndex, IPAIndex
+from etymology_index import EtymologyIndex
+from wiktionary_fetcher import BulkFetcher, FetchError
+from wiktionary_pipeline import ParsePipeline
+from wiktionary_cache import PageCache, NegativeCache
 from ipa_symbols import *
 
 
@@ -92,20 +98,51 @@ class WiktionaryParser:
     HEADER_NAMES = PARTS_OF_SPEECH.union({"Pronunciation",
                                           "Etymology",
                                           "Declension"})
+    ENTRY_STORE = SQLiteEntryStore  # or JSONEntryStore, to keep entries in memory
+    CACHE_PATH = PATH + "/resources/cache/pages"
+    CACHE_TTL = 90 * 24 * 60 * 60   # seconds before a cached page is fetched again
+    CACHE_SIZE = 2 ** 30            # bytes of cached pages to keep on disk
+    OFFLINE = False                 # whether to serve pages only from the cache
+    NEGATIVE_PATH = PATH + "/resources/cache/missing_entries.json"
+    NEGATIVE_TTL = 30 * 24 * 60 * 60   # seconds before a missing entry is fetched again
+    INDEX_PATH = PATH + "/resources/cache/indexes"
 
     def __init__(self):
         self.session = requests.session()
         self.url = self.WIKI_URL + self.END_URL
         self.language = None
         self.wiktionary_entries = self.fetch_wiktionary_entries()
+        self.page_cache = PageCache(self.CACHE_PATH, self.CACHE_TTL, self.CACHE_SIZE)
+        self.offline = self.OFFLINE
+        self.negative_cache = NegativeCache(self.NEGATIVE_PATH, self.NEGATIVE_TTL)
+        self.init_entry_indexes()
+        self.init_patterns()
 
-        # REGEXES
+    def init_patterns(self):
+        """
+        Compiles the regexes this WiktionaryParser cleans
+        page text with.
+
+        :return: None
+        """
         self.html_pattern = re.compile("(<.+?>|\n)") # used to include |\d
         self.quote_pattern = re.compile("\"[^\+]*?\"")
         self.paren_pattern = re.compile("\([^\(]*?\)")
         self.deriv_pattern = re.compile('(\S+ ?([("]+.+[")]+)? ?\+\S* ?)+[^.]+ ?(\".+?\")?')
         self.space_pattern = re.compile("( )+")
 
+    def parse_settings(self):
+        """
+        Returns the attributes a copy of this WiktionaryParser
+        needs to parse pages as it does: its language and any
+        class-level options set on it alone.
+
+        :return: dict(str, X), attribute names & values
+        """
+        settings = {name: value for name, value in vars(self).iteritems() if name.isupper()}
+        settings["language"] = self.language
+        return settings
+
     def verify_language(self, language):
         """
         If given language is None, returns self.language.
@@ -168,22 +205,65 @@ class WiktionaryParser:
 
     def fetch_wiktionary_entries(self):
         """
-        Returns a dictionary of memoized Wiktionary pages.
+        Returns an EntryStore of memoized Wiktionary pages.
+        ~
+        The store is of this WiktionaryParser's ENTRY_STORE class
+        and reads entries from disk only as they are looked up.
 
-        :return: dict(str, dict), where str is a word and dict is...
+        :return: EntryStore(str, dict), where str is a word and dict is...
             key (str) - language of word entry
             val (dict) - language's entry under word
         """
-        return self.fetch_json("wiktionary_entries")
+        return self.ENTRY_STORE(self.PATH + "/resources/data/wiktionary_entries")
 
     def refresh_wiktionary_entries(self):
         """
-        Dumps this WiktionaryParser's wiktionary_entries data to
-        wiktionary_entries.json.
+        Saves the wiktionary_entries changed since the last refresh
+        to this WiktionaryParser's EntryStore on disk, along with
+        the words known to have no entries and the entry indexes.
 
         :return: None
         """
-        self.dump_json(self.wiktionary_entries, "wiktionary_entries")
+        self.wiktionary_entries.persist()
+        self.negative_cache.persist()
+        for index in self.entry_indexes():
+            index.persist()
+
+    def init_entry_indexes(self):
+        """
+        Initializes this WiktionaryParser's entry indexes over
+        its wiktionary_entries, kept in INDEX_PATH.
+
+        :return: None
+        """
+        self.inflection_index = InflectionIndex(self.INDEX_PATH, self.wiktionary_entries)
+        self.ipa_index = IPAIndex(self.INDEX_PATH, self.wiktionary_entries,
+                                  lambda ipa: self.clean_ipa(ipa, scrub=True))
+        self.etymology_index = EtymologyIndex(self.wiktionary_entries,
+                                              lambda word: not self.contains_punct(word))
+
+    def entry_indexes(self):
+        """
+        Returns every EntryIndex kept up to date with this
+        WiktionaryParser's wiktionary_entries.
+
+        :return: List[EntryIndex], indexes of wiktionary_entries
+        """
+        return [self.inflection_index, self.ipa_index, self.etymology_index]
+
+    def reindex_wiktionary_entry(self, word, language, old_entry, new_entry):
+        """
+        Updates every entry index for this word's language entry
+        changing from old_entry to new_entry.
+
+        :param word: str, word of changed entry
+        :param language: str, language of changed entry
+        :param old_entry: Optional[dict], language entry before change
+        :param new_entry: Optional[dict], language entry after change
+        :return: None
+        """
+        for index in self.entry_indexes():
+            index.reindex(word, language, old_entry, new_entry)
 
     # WIKTIONARY PAGES
     # ----------------
@@ -209,25 +289,82 @@ class WiktionaryParser:
 
         return word
 
-    def add_wiktionary_entries(self, words, language=None):
+    def add_wiktionary_entries(self, words, language=None, workers=None, rate=None, processes=None):
         """
         Adds Wiktionary entries for these words to this
         WiktionaryParser's wiktionary_entries.
+        ~
+        If workers is given, fetches up to that many pages at once
+        with a BulkFetcher, sending no more than rate requests per
+        second to Wiktionary.  If processes is also given, pages are
+        parsed on that many processes with a ParsePipeline instead.
+        Entries are still added in the order of the given words.
+        ~
+        Words whose pages could not be fetched are skipped, and once
+        every other word is added, a FetchError is raised holding
+        each skipped word's error, so they can be retried.
 
         :param words: List[str], words of Wiktionary entries to add
         :param language: str, language of entries to add
+        :param workers: Optional[int], number of pages to fetch at once
+        :param rate: Optional[float], most requests per second to send
+        :param processes: Optional[int], number of processes to parse pages on
         :return: dict(str, dict), where str is language and dict is...
             key (str) - title of subentry heading (e.g. Etymology)
             val (list) - value(s) associated with subentry
         """
         language = self.verify_language(language)
-        for word in words:
-            if word not in self.wiktionary_entries:
-                print word
-                print self.find_wiktionary_entry(word, language)
-                print
+
+        if workers is None:
+            for word in words:
+                if word not in self.wiktionary_entries:
+                    print word
+                    print self.find_wiktionary_entry(word, language)
+                    print
+        else:
+            words = [word for word in words if word not in self.wiktionary_entries]
+            if processes is None:
+                fetcher = BulkFetcher(self, workers, rate)
+            else:
+                fetcher = ParsePipeline(self, workers, processes, rate)
+            for word, entries in fetcher.fetch_entries(words, language):
+                if entries is not None:
+                    self.merge_wiktionary_entry(word, entries, language)
+            if len(fetcher.errors) != 0:
+                raise FetchError(fetcher.errors)
+
         return self.wiktionary_entries
 
+    def reparse_wiktionary_entries(self, words=None, language=None, processes=None):
+        """
+        Parses these words' cached Wiktionary pages again and
+        replaces their entries in wiktionary_entries.
+        ~
+        Pages are read only from the page cache, on a ParsePipeline
+        with the given number of processes (default: all cores), so
+        entries can be rebuilt after the parser changes without
+        fetching anything.  If words is None, reparses every word
+        in wiktionary_entries.
+
+        :param words: Optional[List[str]], words of entries to reparse
+        :param language: str, language of entries to reparse
+        :param processes: Optional[int], number of processes to parse pages on
+        :return: None
+        """
+        language = self.verify_language(language)
+        if words is None:
+            words = self.wiktionary_entries.words()
+
+        offline = self.offline
+        self.offline = True
+        try:
+            pipeline = ParsePipeline(self, processes=processes)
+            for word, entries in pipeline.fetch_entries(words, language):
+                if entries is not None:
+                    self.merge_wiktionary_entry(word, entries, language)
+        finally:
+            self.offline = offline
+
     def add_wiktionary_entry(self, word, language=None):
         """
         Adds a Wiktionary entry corresponding to the given word
@@ -241,13 +378,63 @@ class WiktionaryParser:
         """
         word = self.unicodize(word)
         language = self.verify_language(language)
-        wikt_page = WiktionaryPage(word, language=language, parser=self)
-        entries = wikt_page.entries
-        word = self.entry_word(word, language)
-        self.wiktionary_entries.setdefault(word, dict())
-        self.wiktionary_entries[word].update(entries)
+        entries = self.fetch_wiktionary_entry(word, language)
+        self.merge_wiktionary_entry(word, entries, language)
         return entries.get(language, entries)
 
+    def fetch_wiktionary_entry(self, word, language=None, session=None):
+        """
+        Returns the entries parsed from this word's Wiktionary page,
+        without adding them to wiktionary_entries.
+
+        :param word: str, word of Wiktionary page to fetch
+        :param language: str, language of entries to fetch
+        :param session: Optional[requests.Session], session to fetch page with
+        :return: dict(str, dict), where str is language and dict is...
+            key (str) - title of subentry heading (e.g. Etymology)
+            val (list) - value(s) associated with subentry
+        """
+        word = self.unicodize(word)
+        language = self.verify_language(language)
+        wikt_page = WiktionaryPage(word, language=language, parser=self, session=session)
+        return wikt_page.entries
+
+    def merge_wiktionary_entry(self, word, entries, language=None):
+        """
+        Adds these entries for this word to this
+        WiktionaryParser's wiktionary_entries.
+        ~
+        If the entries lack this language, the word is added to
+        this WiktionaryParser's negative_cache.
+        ~
+        When offline, empty entries are not added, since they
+        only mean the word's page was not in the cache.
+
+        :param word: str, word of entries to add
+        :param entries: dict(str, dict), where str is language and dict is language entry
+        :param language: str, language of entries to add
+        :return: None
+        """
+        if self.offline and len(entries) == 0:
+            return  # page not cached, so nothing is known about this word
+
+        word = self.unicodize(word)
+        language = self.verify_language(language)
+        if language is not None:
+            if language in entries:
+                self.negative_cache.discard(word, language)
+            else:
+                self.negative_cache.add(word, language)
+
+        word = self.entry_word(word, language)
+        word_entry = self.wiktionary_entries.setdefault(word, dict())
+        old_entries = {lang: word_entry.get(lang, None) for lang in entries}
+        word_entry.update(entries)
+        self.wiktionary_entries.mark_dirty(word)
+
+        for lang in entries:
+            self.reindex_wiktionary_entry(word, lang, old_entries[lang], entries[lang])
+
     def edit_wiktionary_entry(self, word, language=None, heading=None, content=None):
         """
         Edits the Wiktionary entry for this word by adding this content
@@ -269,8 +456,11 @@ class WiktionaryParser:
         except KeyError:
             return
         else:
-            entry = self.wiktionary_entries[word][language][heading]
-            self.wiktionary_entries[word][language][heading] = OrderedSet(entry + content).items()
+            lang_entry = self.wiktionary_entries[word][language]
+            old_entry = {heading: lang_entry[heading]}
+            lang_entry[heading] = OrderedSet(lang_entry[heading] + content).items()
+            self.wiktionary_entries.mark_dirty(word)
+            self.reindex_wiktionary_entry(word, language, old_entry, lang_entry)
 
     def contains_punct(self, word):
         """
@@ -292,6 +482,9 @@ class WiktionaryParser:
         exists, returns the memoized page.  Otherwise, retrieves new
         Wiktionary page data for word and adds new entry to this
         WiktionaryParser's wiktionary_entries.
+        ~
+        Returns None without fetching if the word is in the
+        negative_cache for this language.
 
         :param word: str, word of Wiktionary page to lookup
         :param language: str, language of entry to lookup
@@ -306,6 +499,8 @@ class WiktionaryParser:
             entry = self.wiktionary_entries.get(word, dict())
             entry = entry.get(language, None)
             if entry is None and word is not None and not self.contains_punct(word):
+                if self.negative_cache.lookup(self.unicodize(word), self.verify_language(language)):
+                    return
                 entry = self.add_wiktionary_entry(word, language)
             return entry
 
@@ -477,27 +672,59 @@ class WiktionaryParser:
         """
         return self.BASE_URL % (word, self.language)
 
-    def url_page(self, url):
+    def url_html(self, url, session=None):
+        """
+        Returns the HTML at the given URL.
+        ~
+        Serves the HTML from this WiktionaryParser's page_cache if
+        it holds the URL, and otherwise fetches and caches it.
+        When offline, serves expired pages too, and returns None
+        for URLs not in the cache.
+        ~
+        Raises requests.HTTPError for any failed fetch but a 404,
+        since an outage or rate limit says nothing about the page.
+
+        :param url: str, URL to fetch HTML from
+        :param session: Optional[requests.Session], session to fetch with
+        :return: Optional[unicode], HTML at given URL
+        """
+        html = self.page_cache.lookup(url, ignore_ttl=self.offline)
+        if html is not None or self.offline:
+            return html
+
+        if session is None:
+            session = self.session
+        response = session.get(url)
+        if response.status_code != 404:
+            response.raise_for_status()
+        html = response.text
+        self.page_cache.store(url, html)
+        return html
+
+    def url_page(self, url, session=None):
         """
         Parses given URL string to a BeautifulSoup Tag.
 
         :param url: str, URL to parse to tags
-        :return: Tag, parsed URL
+        :param session: Optional[requests.Session], session to fetch with
+        :return: Optional[Tag], parsed URL
         """
-        response = self.session.get(url)
-        html = response.text
+        html = self.url_html(url, session)
+        if html is None:
+            return
         parsed = BeautifulSoup(html)
         return parsed
 
-    def word_page(self, word):
+    def word_page(self, word, session=None):
         """
         Returns a BeautifulSoup Tag corresponding to the Wiktionary
         page for the given word.
 
         :param word: str, word to retrieve page for
+        :param session: Optional[requests.Session], session to fetch with
         :return: Tag, BeautifulSoup tag matching given word's page
         """
-        return self.url_page(self.word_url(word))
+        return self.url_page(self.word_url(word), session)
 
     def valid_word_page(self, word, language=None):
         """
@@ -527,8 +754,11 @@ class WiktionaryParser:
         :param page: Tag, HTML Wiktionary page for an entry
         :return: bool, whether page is valid
         """
-        if language is None:
-            return page.find("h2").getText()[:10] != "Navigation"
+        if page is None:
+            return False
+        elif language is None:
+            header = page.find("h2")
+            return header is not None and header.getText()[:10] != "Navigation"
         else:
             return self.find_page_language(page, language) is not None
 
@@ -870,40 +1100,48 @@ class WiktionaryPage:
     """
     A class for parsing Wiktionary pages into language data.
     """
-    def __init__(self, word, language=None, parser=None):
+    def __init__(self, word, language=None, parser=None, session=None, page=None):
         if parser is None:
             self.parser = WiktionaryParser()
         else:
             self.parser = parser
-        self.page = self.word_page(word, language)
+        if page is None:
+            self.page = self.word_page(word, language, session)
+        else:
+            self.page = page
         self.entries = self.page_entries(self.page, language)
 
-    def word_page(self, word, language):
+    def word_page(self, word, language, session=None):
         """
         Returns a BeautifulSoup Tag corresponding to the Wiktionary
         page for the given word.
 
         :param word: str, word to retrieve page for
+        :param session: Optional[requests.Session], session to fetch with
         :return: Tag, BeautifulSoup tag matching given word's page
         """
         language = self.parser.verify_language(language)
         nuwords = [word, word.lower(), word.title()]
 
         for nuword in nuwords:
-            page = self.parser.word_page(nuword)
+            page = self.parser.word_page(nuword, session)
             if self.parser.valid_page(page, language):
                 return page
 
     def desired_header(self, header):
         return header.split(u"_", 1)[0] in self.parser.HEADER_NAMES
 
-    def page_entries(self, page, language=None):
+    def page_entries(self, page, language=None, single_pass=True):
         """
         Returns all language entries on the given Wiktionary page
         for a word.
+        ~
+        If single_pass is False, finds the page's sections the old way,
+        re-parsing each section's HTML (see soupified_sections).
 
         :param page: Tag, HTML Wiktionary page to extract entries from
         :param language: str, language of page entries to retrieve
+        :param single_pass: bool, whether to find sections in one walk
         :return: dict(str, dict), where str is entry language and dict is...
             key (str) - entry heading
             val (dict) - entry description
@@ -912,6 +1150,87 @@ class WiktionaryPage:
         if page is None:
             return entries
 
+        if single_pass:
+            sections = self.page_sections(page, language)
+        else:
+            sections = self.soupified_sections(page, language)
+
+        for lang, header_name, heading in sections:
+            heading_entry = self.heading_entry(heading, header_name, lang)
+
+            if heading_entry is not None and len(heading_entry) != 0:
+                entries.setdefault(lang, dict())
+                entries[lang].setdefault(header_name, list())
+                subentry = entries[lang][header_name] + heading_entry
+                new_entry = OrderedSet(subentry).order_items()
+                entries[lang][header_name] = new_entry
+
+        return entries
+
+    def page_sections(self, page, language=None):
+        """
+        Returns the desired sections on the given Wiktionary page
+        in this language, found in one walk over the page's content.
+        ~
+        A language begins at each h2 header, and a section runs from
+        each h3, h4 or h5 header up to the next header or comment.
+        Unlike in soupified_sections, the next language's h2 also
+        ends a section, so no section runs on into the content at
+        the top of the following language.  Sections are TagGroups of the page's own nodes, so none of
+        the page is copied or parsed again.
+
+        :param page: Tag, HTML Wiktionary page to split into sections
+        :param language: str, language of sections to retrieve
+        :return: List[tuple(str, str, TagGroup)], language, header name & content of each section
+        """
+        sections = list()
+        headline = page.find("span", attrs={"class": "mw-headline"})
+        if headline is None:
+            return sections
+
+        entry_headers = {"h3", "h4", "h5"}
+        header = headline.findParent(["h2"] + sorted(entry_headers))
+        lang = ""
+        section = None
+
+        for node in header.parent.contents:
+            name = getattr(node, 'name', None)
+            if name == "h2":
+                lang = self.header_text(node)
+                section = None
+                if lang[:10] == "Navigation":
+                    break
+            elif name in entry_headers:
+                section = None
+                span = node.find("span", attrs={"class": "mw-headline"})
+                if (span is not None and lang != "" and self.desired_header(span.get("id", u"")) and
+                        (language is None or lang == language)):
+                    section = TagGroup(list())
+                    header_name = self.rename_header(self.header_text(node))
+                    sections.append((lang, header_name, section))
+            elif section is not None:
+                if isinstance(node, Comment):
+                    section = None
+                else:
+                    section.contents.append(node)
+
+        return sections
+
+    def soupified_sections(self, page, language=None):
+        """
+        Returns the desired sections on the given Wiktionary page
+        in this language, each re-parsed into its own BeautifulSoup.
+        ~
+        Slower than page_sections, since it searches back for each
+        section's language and re-parses each section; kept for
+        comparing the two.  A section here runs on past the next
+        h2 to the next h3, h4 or h5 header.
+
+        :param page: Tag, HTML Wiktionary page to split into sections
+        :param language: str, language of sections to retrieve
+        :return: List[tuple(str, str, Tag)], language, header name & content of each section
+        """
+        sections = list()
         entry_headers = {"h3", "h4", "h5"}
         tags = page.findAll("span", attrs={"class": "mw-headline",
                                            "id": lambda i: self.desired_header(i)})
@@ -928,17 +1247,9 @@ class WiktionaryPage:
 
                 if heading is not None:
                     header_name = self.rename_header(self.header_text(tag))
-                    heading_entry = self.heading_entry(heading, header_name, lang)
-
-                    if heading_entry is not None and len(heading_entry) != 0:
-                        entries.setdefault(lang, dict())
-                        entries[lang].setdefault(header_name, list())
-                        subentry = entries[lang][header_name] + heading_entry
-                        #print subentry
-                        new_entry = OrderedSet(subentry).order_items()
-                        entries[lang][header_name] = new_entry
+                    sections.append((lang, header_name, heading))
 
-        return entries
+        return sections
 
     def rename_header(self, header):
         """
@@ -1090,22 +1401,97 @@ class WiktionaryPage:
         return entry
 
 
+class TagGroup:
+    """
+    A class for treating a run of sibling nodes from a
+    BeautifulSoup page as a single Tag, without copying them.
+    ~
+    Supports the parts of the Tag interface used on page
+    sections: findAll, find, getText and child tags as
+    attributes (e.g. group.sup).  Nodes since extracted or
+    decomposed from the page are skipped.
+    """
+    def __init__(self, contents):
+        self.contents = contents
+
+    def nodes(self):
+        """
+        Returns this TagGroup's nodes still in the page.
+
+        :return: List[PageElement], nodes in this TagGroup
+        """
+        return [node for node in self.contents if node.parent is not None]
+
+    def findAll(self, name=None, attrs={}, recursive=True, text=None, limit=None, **kwargs):
+        """
+        Returns all nodes in this TagGroup (and, if recursive, their
+        descendants) matching the given arguments, as in Tag.findAll.
+
+        :return: List[PageElement], matching nodes in page order
+        """
+        if isinstance(name, SoupStrainer):
+            strainer = name
+        else:
+            strainer = SoupStrainer(name, attrs, text, **kwargs)
+        found = list()
+
+        for node in self.nodes():
+            if limit is not None and len(found) >= limit:
+                break
+            if strainer.search(node):
+                found.append(node)
+            if recursive and isinstance(node, Tag):
+                sublimit = None if limit is None else limit - len(found)
+                if sublimit is None or sublimit > 0:
+                    found += node.findAll(strainer, limit=sublimit)
+
+        return found
+
+    def find(self, name=None, attrs={}, recursive=True, text=None, **kwargs):
+        found = self.findAll(name, attrs, recursive, text, 1, **kwargs)
+        if len(found) != 0:
+            return found[0]
+
+    def getText(self, separator=u""):
+        return separator.join([node.strip() for node in self.findAll(text=True)])
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "contents":
+            raise AttributeError(name)
+        return self.find(name)
+
+
 class WiktionaryTable:
     """
     A class for parsing Wiktionary pages into language data.
+    ~
+    The table is laid out once into a grid of cells, with each
+    rowspan/colspan cell repeated over every coordinate it spans.
+    Each cell's text and header/content flags are computed once,
+    and each coordinate's row & column headers are found in one
+    pass along its row & column.
     """
     def __init__(self, table, language, wikt_page):
         self.language = language
-        self.table = self.tag_table(table, self.language)
         self.wikt_page = wikt_page
+        self.texts = dict()     # cell -> text
+        self.headers = dict()   # cell -> whether header
+        self.contents = dict()  # cell -> whether content
+        self.table = self.tag_table(table, self.language)
         self.rows = self.table_rows(self.table)
         self.num_rows = len(self.rows)
         self.num_cols = self.count_cols(self.table)
+        self.grid = None
+        self.row_headers = None
+        self.col_headers = None
         self.declension = None
 
     def get_simple_declension(self):
         """
         Returns a list of all words in this WiktionaryTable's table.
+        ~
+        Reads every content cell in the table, rather than only those
+        in its grid, since parse_table clips rows wider than the first.
 
         :return: List[str], words in this WT's table
         """
@@ -1113,7 +1499,7 @@ class WiktionaryTable:
         table_cells = self.table_content(self.table)
 
         for cell in table_cells:
-            contents += self.cell_content(cell)
+            contents += self.cell_entry(cell)
         return contents
 
     def get_declension(self):
@@ -1134,7 +1520,117 @@ class WiktionaryTable:
         :return: None
         """
         if self.declension is None:
-            self.declension = self.parse_declension(self.table)
+            self.init_grid()
+            self.declension = self.parse_declension()
+
+    def init_grid(self):
+        """
+        Initializes this WiktionaryTable's grid and the row & column
+        headers of each coordinate in it, if not done already.
+
+        :return: None
+        """
+        if self.grid is None:
+            self.grid = self.table_grid(self.parse_table(self.table))
+            self.row_headers = self.grid_row_headers(self.grid)
+            self.col_headers = self.grid_col_headers(self.grid)
+
+    # GRID
+    # ----
+    def table_grid(self, table_dict):
+        """
+        Returns the given table_dict as a 2-D grid of cells.
+        ~
+        Coordinates missing from table_dict are None in the grid.
+
+        :param table_dict: dict[tuple, Tag], where...
+            key (Tuple[int, int]) - table's row and column number
+            val (Tag) - cell for row and column
+        :return: List[List[Tag]], cells by row then column
+        """
+        if len(table_dict) == 0:
+            return list()
+
+        height = max(r for r, c in table_dict) + 1
+        width = max(c for r, c in table_dict) + 1
+        grid = [[None] * width for r in range(height)]
+
+        for (r, c), cell in table_dict.iteritems():
+            grid[r][c] = cell
+
+        return grid
+
+    def grid_row_headers(self, grid):
+        """
+        Returns the row names of each coordinate in the given grid.
+        ~
+        A coordinate's row names are the closest run of headers
+        before it in its row, ignoring repeated names.  Each row
+        is walked once from left to right, carrying the current
+        run of headers and the last complete run.
+
+        :param grid: List[List[Tag]], cells by row then column
+        :return: dict[tuple, tuple], where...
+            key (Tuple[int, int]) - grid's row and column number
+            val (Tuple(str)) - row names for row and column
+        """
+        row_headers = dict()
+        last_row = len(grid) - 1
+
+        for r, row in enumerate(grid):
+            run = tuple()       # headers since last non-header
+            headers = tuple()   # closest run of headers so far
+
+            for c, cell in enumerate(row):
+                if cell is None:
+                    continue
+                row_headers[r, c] = headers
+
+                if self.is_header(cell):
+                    text = self.cell_text(cell)
+                    if self.cell_rowspan(cell) <= last_row and len(text) != 0:
+                        run = tuple(t for t in run if t != text) + (text,)
+                        headers = run
+                else:
+                    run = tuple()
+
+        return row_headers
+
+    def grid_col_headers(self, grid):
+        """
+        Returns the column names of each coordinate in the given grid.
+        ~
+        A coordinate's column names are the closest run of headers
+        above it in its column.  Each column is walked once from
+        top to bottom, as in grid_row_headers.
+
+        :param grid: List[List[Tag]], cells by row then column
+        :return: dict[tuple, tuple], where...
+            key (Tuple[int, int]) - grid's row and column number
+            val (Tuple(str)) - column names for row and column
+        """
+        col_headers = dict()
+        width = len(grid[0]) if len(grid) != 0 else 0
+
+        for c in range(width):
+            run = tuple()
+            headers = tuple()
+
+            for r in range(len(grid)):
+                cell = grid[r][c]
+                if cell is None:
+                    continue
+                col_headers[r, c] = headers
+
+                if self.is_header(cell):
+                    text = self.cell_text(cell)
+                    if self.cell_colspan(cell) < self.num_cols and len(text) != 0:
+                        run += (text,)
+                        headers = run
+                else:
+                    run = tuple()
+
+        return col_headers
 
     def is_header(self, cell):
         """
@@ -1144,16 +1640,22 @@ class WiktionaryTable:
         :param cell: Tag, BeautifulSoup cell in table to check if header
         :return: bool, whether given cell is a (row or column) header
         """
+        if cell in self.headers:
+            return self.headers[cell]
+
+        header = False
         if cell is not None:
             if cell.name == "th" or cell.name == "td":
                 cell_link = cell.find("a")
                 if cell_link is None:
-                    return True
+                    header = True
                 else:
                     href = cell_link.get("href")
                     if href is not None:
-                        return href[-len(self.language):] != self.language and href[-9:] != "redlink=1"
-        return False
+                        header = href[-len(self.language):] != self.language and href[-9:] != "redlink=1"
+
+        self.headers[cell] = header
+        return header
 
     def is_content(self, cell):
         """
@@ -1163,13 +1665,18 @@ class WiktionaryTable:
         :param cell: Tag, BeautifulSoup cell in table to check if content
         :return: bool, whether given cell contains content
         """
+        if cell in self.contents:
+            return self.contents[cell]
+
+        content = False
         if cell is not None:
             if cell.name == "td":
-                return self.valid_content(cell)
+                content = self.valid_content(cell)
             elif cell.name == "th":
-                return self.contains_content(cell)
+                content = self.contains_content(cell)
 
-        return False
+        self.contents[cell] = content
+        return content
 
     def valid_content(self, cell):
         """
@@ -1267,6 +1774,9 @@ class WiktionaryTable:
         :param cell: Tag, BeautifulSoup tag for cell in HTML table
         :return: str, given cell's text
         """
+        if cell in self.texts:
+            return self.texts[cell]
+
         try:
             self.wikt_page.parser.remove_sublists(cell)
             spans = cell.findAll("span")
@@ -1276,10 +1786,11 @@ class WiktionaryTable:
             else:
                 text = self.content_text(spans)
 
-            return text
-
         except AttributeError:
-            return ""
+            text = ""
+
+        self.texts[cell] = text
+        return text
 
     def cell_content(self, cell):
         if self.is_content(cell):
@@ -1301,69 +1812,27 @@ class WiktionaryTable:
         else:
             return list()
 
-    def cell_rows(self, coord, table_dict):
+    def cell_rows(self, coord):
         """
         Returns a tuple of the given coordinate
-        from the given table_dict's row names.
+        from this WiktionaryTable's row names.
 
         :param coord: Tuple(int, int), coordinate to get row names for
-        :param table_dict: dict[tuple, Tag], where...
-            key (Tuple[int, int]) - table_dict's row and column number
-            val (Tag) - cell for row and column
         :return: Tuple(str), given cell's row names
         """
-        row_num, col_num = coord
-        sorted_dict = sorted(table_dict)
-        prev_rows = [c for c in sorted_dict if c[0] == row_num
-                     and c[1] < col_num]
-        num_rows, num_cols = sorted_dict[-1]
-        rows = []
-        header_yet = False
-
-        # iterate over previous rows to find closest set of headers
-        for row_coord in reversed(prev_rows):
-            cell = table_dict[row_coord]
-            if self.is_header(cell):
-                text = self.cell_text(cell)
-                if self.cell_rowspan(cell) <= num_rows and len(text) != 0:
-                    if text not in rows:
-                        header_yet = True
-                        rows.insert(0, text)
-            elif header_yet:
-                break
-
-        return tuple(rows)
+        self.init_grid()
+        return self.row_headers.get(coord, tuple())
 
-    def cell_cols(self, coord, table_dict):
+    def cell_cols(self, coord):
         """
         Returns a tuple of the given coordinate
-        from the given table_dict's column names.
+        from this WiktionaryTable's column names.
 
-        :param coord: Tuple(int, int), coordinate to get row names for
-        :param table_dict: dict[tuple, Tag], where...
-            key (Tuple[int, int]) - given table's row and column number
-            val (Tag) - cell for given row and column
+        :param coord: Tuple(int, int), coordinate to get column names for
         :return: Tuple(str), given cell's column names
         """
-        row_num, col_num = coord
-        sorted_dict = sorted(table_dict)
-        prev_cols = [c for c in sorted_dict if c[1] == col_num
-                     and c[0] < row_num]
-        cols = []
-        header_yet = False
-
-        # iterate over previous columns to find closest set of headers
-        for col_coord in reversed(prev_cols):
-            cell = table_dict[col_coord]
-            text = self.cell_text(cell)
-            if self.is_header(cell):
-                if self.cell_colspan(cell) < self.num_cols and len(text) != 0:
-                    header_yet = True
-                    cols.insert(0, text)
-            elif header_yet:
-                break
-
-        return tuple(cols)
+        self.init_grid()
+        return self.col_headers.get(coord, tuple())
 
     def is_table_declension(self, table, language):
         """
@@ -1542,30 +2011,29 @@ class WiktionaryTable:
 
         return table_dict
 
-    def parse_declension(self, table):
+    def parse_declension(self):
         """
-        Returns a declension dictionary for the given table.
+        Returns a declension dictionary for this WiktionaryTable's grid.
         ~
         If table has multiple columns or rows, this method adds
         all column/row names in a tuple.
 
-        :param table: Tag, BeautifulSoup table
         :return: dict(str, dict), where...
             key (str) - declension column (i.e., plural or sing.)
             val (dict[str, list]) - declension row (e.g., nominative) &
                 list of words for given row & column
         """
-        coords = self.parse_table(table)
-        sorted_coords = sorted(coords)
+        self.init_grid()
         declension = dict()
         line_text = lambda line: " > ".join([l.lower().replace(" ", "_") for l in line
                                              if len(line) > 0 and u"—" not in l])
 
-        for coord in sorted_coords:
-            cell = coords[coord]
+        for r, c in sorted(self.row_headers):
+            coord = r, c
+            cell = self.grid[r][c]
             if self.is_content(cell) and self.cell_colspan(cell) <= self.num_cols:
-                row = self.cell_rows(coord, coords)
-                col = self.cell_cols(coord, coords)
+                row = self.cell_rows(coord)
+                col = self.cell_cols(coord)
                 row_text = line_text(row)
                 col_text = line_text(col)
                 entry = self.cell_entry(cell)
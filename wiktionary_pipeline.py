@@ -0,0 +1,216 @@
+# coding: utf-8
+"""
+WIKTIONARY_PIPELINE:
+
+    Contains ParsePipeline class for fetching Wiktionary pages
+    on threads while parsing them on a pool of processes.
+"""
+import types
+import threading
+import multiprocessing
+from Queue import Queue
+from BeautifulSoup import BeautifulSoup
+from wiktionary_fetcher import RateLimiter, RateLimitedSession
+
+worker_page = None  # each pool process's WiktionaryPage, set by init_worker
+
+
+def init_worker(parser_class, settings):
+    """
+    Gives this pool process its own parser of the given class
+    to parse pages with.
+    ~
+    The parser is not built by its constructor, which opens the
+    session, entry store, caches & indexes that parsing never uses.
+    It is given only the calling parser's parse_settings and regexes.
+
+    :param parser_class: classobj, class of the calling WiktionaryParser
+    :param settings: dict(str, X), the calling parser's parse_settings
+    :return: None
+    """
+    global worker_page
+    from wiktionary_parser import WiktionaryPage
+    parser = types.InstanceType(parser_class, dict(settings))
+    parser.init_patterns()
+    worker_page = WiktionaryPage(None, parser=parser, page=BeautifulSoup(""))
+
+
+def parse_html(task):
+    """
+    Returns the entries parsed from the HTML in this task.
+    ~
+    Entries are None if the HTML is not a valid page in the task's
+    language.  Errors are returned rather than raised, since a pool
+    in Python 2 never reports a failed task to its callback.
+
+    :param task: tuple(int, int, unicode, str), index, candidate, HTML & language
+    :return: tuple(int, int, dict, str), index, candidate, entries & error
+    """
+    idx, candidate, html, language = task
+    try:
+        page = BeautifulSoup(html)
+        if worker_page.parser.valid_page(page, language):
+            entries = worker_page.page_entries(page, language)
+        else:
+            entries = None
+    except Exception as e:
+        return idx, candidate, None, repr(e)
+    return idx, candidate, entries, None
+
+
+class ParsePipeline:
+    """
+    A class for fetching & parsing Wiktionary entries for many words,
+    with fetching and parsing running as separate stages.
+    ~
+    Threads fetch each word's HTML (from the parser's page cache
+    if held there) and hand it to a pool of processes which parse
+    it, so parsing is not held up by the network nor the network
+    by parsing.  Entries are yielded in the order their words were
+    given, as with BulkFetcher.
+    ~
+    No more than window words are in flight at once, so each queue
+    between stages is bounded, and no more than 2 pages per process
+    wait to be parsed, so memory stays bounded however many words
+    are given.
+    """
+    def __init__(self, parser, workers=8, processes=None, rate=None):
+        """
+        Initializes this ParsePipeline for the given parser.
+
+        :param parser: WiktionaryParser, parser to fetch pages with
+        :param workers: int, number of pages to fetch at once
+        :param processes: Optional[int], number of processes to parse with (default: all cores)
+        :param rate: Optional[float], most requests per second to any one host
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.parser = parser
+        self.workers = workers
+        self.processes = processes
+        self.limiter = RateLimiter(rate)
+        self.window = (workers + processes) * 4   # most words in flight
+        self.errors = dict()                        # word -> error fetching or parsing it
+
+    def candidates(self, word):
+        """
+        Returns the spellings of this word whose pages are tried,
+        in the order they are tried.
+
+        :param word: unicode, word to find page for
+        :return: List[unicode], distinct spellings of word
+        """
+        candidates = list()
+        for nuword in [word, word.lower(), word.title()]:
+            if nuword not in candidates:
+                candidates.append(nuword)
+        return candidates
+
+    def fetch(self, tasks, results, pool, parsing, language):
+        """
+        Fetches the HTML for the words on tasks and sends it to
+        the pool to be parsed, until tasks yields None.
+
+        :param tasks: Queue, (index, word, candidate) triples to fetch
+        :param results: Queue, (index, candidate, entries, error) results
+        :param pool: multiprocessing.Pool, pool to parse pages on
+        :param parsing: threading.Semaphore, released as pages are parsed
+        :param language: str, language of entries to parse
+        :return: None
+        """
+        session = RateLimitedSession(self.limiter)
+
+        def parsed(result):
+            parsing.release()
+            results.put(result)
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            idx, word, candidate = task
+            nuword = self.candidates(word)[candidate]
+            try:
+                html = self.parser.url_html(self.parser.word_url(nuword), session)
+            except Exception as e:
+                results.put((idx, candidate, None, repr(e)))
+                continue
+
+            if html is None:    # not cached while offline
+                results.put((idx, candidate, None, None))
+            else:
+                parsing.acquire()
+                pool.apply_async(parse_html, [(idx, candidate, html, language)],
+                                 callback=parsed)
+
+    def feed(self, words, tasks, window):
+        """
+        Puts each of these words on tasks, keeping no more than
+        this ParsePipeline's window of words in flight.
+
+        :param words: List[unicode], words to fetch
+        :param tasks: Queue, queue to put (index, word, candidate) triples on
+        :param window: threading.Semaphore, released as results are yielded
+        :return: None
+        """
+        for idx, word in enumerate(words):
+            window.acquire()
+            tasks.put((idx, word, 0))
+
+    def fetch_entries(self, words, language=None):
+        """
+        Yields each of these words with its Wiktionary entries,
+        in the order of the given words.
+        ~
+        As with WiktionaryPage, a word's lowercase & titlecase pages
+        are tried in turn until one has an entry in this language.
+        Words whose pages could not be fetched or parsed are yielded
+        with None for entries, and their errors kept in self.errors.
+
+        :param words: List[str], words to fetch entries for
+        :param language: Optional[str], language of entries to fetch
+        :return: Iterator[tuple(unicode, dict)], words & their entries
+        """
+        language = self.parser.verify_language(language)
+        words = [self.parser.unicodize(word) for word in words]
+        tasks = Queue(self.window + self.workers)   # room for retries & stop signals
+        results = Queue(self.window)
+        window = threading.Semaphore(self.window)
+        parsing = threading.Semaphore(self.processes * 2)
+        pool = multiprocessing.Pool(self.processes, init_worker,
+                                    (self.parser.__class__, self.parser.parse_settings()))
+
+        threads = [threading.Thread(target=self.feed, args=(words, tasks, window))]
+        threads += [threading.Thread(target=self.fetch, args=(tasks, results, pool, parsing, language))
+                    for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        pending = dict()
+        next_idx = 0
+
+        try:
+            while next_idx < len(words):
+                idx, candidate, entries, error = results.get()
+                word = words[idx]
+
+                if error is not None:
+                    self.errors[word] = error
+                    pending[idx] = (word, None)
+                elif entries is not None:
+                    pending[idx] = (word, entries)
+                elif candidate + 1 < len(self.candidates(word)):
+                    tasks.put((idx, word, candidate + 1))
+                else:
+                    pending[idx] = (word, dict())
+
+                while next_idx in pending:
+                    yield pending.pop(next_idx)
+                    window.release()
+                    next_idx += 1
+        finally:
+            for i in range(self.workers):
+                tasks.put(None)
+            pool.terminate()